@@ -1,5 +1,6 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin
+from core.paginators import EstimatedCountPaginator
 from .models import User, StudentProfile, TutorProfile, ProviderProfile, Course, Department
 
 # Helper for fieldsets
@@ -50,6 +51,9 @@ class CustomUserAdmin(UserAdmin):
     list_filter = ['user_type', 'is_active', 'is_verified', 'date_joined']
     search_fields = ['username', 'email', 'first_name', 'last_name']
     ordering = ['-date_joined']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['mark_verified', 'activate_users', 'deactivate_users']
     
     fieldsets = (
         (None, {'fields': ('username', 'password')}),
@@ -65,23 +69,62 @@ class CustomUserAdmin(UserAdmin):
         }),
     )
 
+    @admin.action(description='Mark selected users as verified')
+    def mark_verified(self, request, queryset):
+        updated = self._save_each(queryset.filter(is_verified=False), is_verified=True)
+        self.message_user(request, f'{updated} users marked as verified.', messages.SUCCESS)
+
+    @admin.action(description='Activate selected users')
+    def activate_users(self, request, queryset):
+        updated = self._save_each(queryset.filter(is_active=False), is_active=True)
+        self.message_user(request, f'{updated} users activated.', messages.SUCCESS)
+
+    @admin.action(description='Deactivate selected users')
+    def deactivate_users(self, request, queryset):
+        # Never lock the acting admin out of their own account
+        updated = self._save_each(queryset.filter(is_active=True).exclude(pk=request.user.pk), is_active=False)
+        self.message_user(request, f'{updated} users deactivated.', messages.SUCCESS)
+
+    @staticmethod
+    def _save_each(queryset, **values):
+        """
+        Set `values` on each user and save it, so post_save retires their
+        cached identity and the cached dropdown choices. Not in one
+        transaction: each save must be committed before its identity is
+        retired, or a concurrent request could cache the old row again.
+        """
+        users = list(queryset)
+        for user in users:
+            for field, value in values.items():
+                setattr(user, field, value)
+            user.save(update_fields=list(values))
+        return len(users)
+
 @admin.register(StudentProfile)
 class StudentProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'student_id', 'course', 'year', 'cgpa', 'tutor']
     list_filter = ['course', 'year', 'tutor']
+    list_select_related = ['user', 'course', 'tutor__user', 'tutor__department']
     search_fields = ['user__username', 'user__first_name', 'user__last_name', 'student_id']
     ordering = ['user__first_name']
+    autocomplete_fields = ['user', 'course', 'tutor']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 @admin.register(TutorProfile)
 class TutorProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'employee_id', 'department', 'designation', 'office_location']
     list_filter = ['department', 'designation']
+    list_select_related = ['user', 'department']
     search_fields = ['user__username', 'user__first_name', 'user__last_name', 'employee_id']
     ordering = ['user__first_name']
+    autocomplete_fields = ['user', 'department']
 
 @admin.register(ProviderProfile)
 class ProviderProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'company_name', 'contact_person', 'industry']
     list_filter = ['industry']
+    list_select_related = ['user']
     search_fields = ['company_name', 'contact_person', 'user__username']
     ordering = ['company_name']
+    autocomplete_fields = ['user']
@@ -0,0 +1,75 @@
+"""
+Cached dropdown choices for profile and lookup selects
+
+Each choices list is built with a single joined values_list() query and
+kept in the SHARED_CACHE_ALIAS cache, so an invalidation reaches every
+process, until a relevant User, profile, Course or Department is saved or
+deleted (see accounts.signals). Forms keep their querysets for validation
+and only take the rendered options from here.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .models import Course, Department, TutorProfile, ProviderProfile
+
+CACHE_KEY_PREFIX = 'accounts:choices'
+
+def _full_name(first_name, last_name):
+    # Same as User.get_full_name()
+    return f"{first_name} {last_name}".strip()
+
+def _build_provider_choices():
+    rows = ProviderProfile.objects.filter(user__is_active=True).values_list(
+        'pk', 'user__first_name', 'user__last_name'
+    )
+    return [(pk, _full_name(first, last)) for pk, first, last in rows]
+
+def _build_tutor_choices():
+    rows = TutorProfile.objects.filter(user__is_active=True).values_list(
+        'pk', 'user__first_name', 'user__last_name', 'department__code', 'department__name'
+    )
+    return [
+        (pk, f"{_full_name(first, last)} - {code} - {name}")
+        for pk, first, last, code, name in rows
+    ]
+
+def _build_course_choices():
+    return [(pk, f"{code} - {name}") for pk, code, name in
+            Course.objects.filter(is_active=True).values_list('pk', 'code', 'name')]
+
+def _build_department_choices():
+    return [(pk, f"{code} - {name}") for pk, code, name in
+            Department.objects.filter(is_active=True).values_list('pk', 'code', 'name')]
+
+BUILDERS = {
+    'providers': _build_provider_choices,
+    'tutors': _build_tutor_choices,
+    'courses': _build_course_choices,
+    'departments': _build_department_choices,
+}
+
+def _cache():
+    return caches[getattr(settings, 'SHARED_CACHE_ALIAS', 'default')]
+
+def get_choices(name):
+    """[(pk, label), ...] for one of BUILDERS, from the cache when possible"""
+    cache = _cache()
+    key = f'{CACHE_KEY_PREFIX}:{name}'
+    choices = cache.get(key)
+    if choices is None:
+        choices = BUILDERS[name]()
+        cache.set(key, choices, getattr(settings, 'CHOICES_CACHE_TIMEOUT', 3600))
+    return choices
+
+def invalidate_choices(*names):
+    """Drop the cached lists once the current transaction commits, so none is rebuilt from rows about to change"""
+    keys = [f'{CACHE_KEY_PREFIX}:{name}' for name in names or BUILDERS]
+    transaction.on_commit(lambda: _cache().delete_many(keys))
+
+def apply_choices(field, name):
+    """Render a ModelChoiceField from cached choices instead of its queryset"""
+    choices = list(get_choices(name))
+    if field.empty_label is not None:
+        choices.insert(0, ('', field.empty_label))
+    field.choices = choices
@@ -3,6 +3,7 @@ from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.core.exceptions import ValidationError
 from .models import User, StudentProfile, TutorProfile, ProviderProfile, Course, Department
 from core.validators import validate_strong_password
+from .choices import apply_choices
 import logging
 
 logger = logging.getLogger(__name__)
@@ -186,6 +187,9 @@ class StudentRegistrationForm(BaseRegistrationForm):
         self.fields['course'].queryset = Course.objects.filter(is_active=True)
         # Filter active tutors
         self.fields['tutor'].queryset = TutorProfile.objects.filter(user__is_active=True)
+        # Render options from the cached choices; the querysets still validate
+        apply_choices(self.fields['course'], 'courses')
+        apply_choices(self.fields['tutor'], 'tutors')
     
     def clean_student_id(self):
         """Validate student ID uniqueness"""
@@ -249,6 +253,10 @@ class TutorRegistrationForm(BaseRegistrationForm):
         })
     )
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        apply_choices(self.fields['department'], 'departments')
+    
     def clean_employee_id(self):
         """Validate employee ID uniqueness"""
         employee_id = self.cleaned_data.get('employee_id')
@@ -0,0 +1,99 @@
+"""
+Process-wide read-through cache for the Course and Department tables
+
+Both tables are small and rarely change, so each process keeps every row
+in memory and resolves foreign keys by id without a query. Saving or
+deleting a row bumps a version key in the SHARED_CACHE_ALIAS cache once the
+transaction commits (accounts.signals);
+every process compares its copy against that version at most once per
+LOOKUP_CACHE_CHECK_INTERVAL seconds and reloads when it has moved on.
+"""
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+def _shared_cache():
+    # Must be visible to every process, unlike the per-process default cache
+    return caches[getattr(settings, 'SHARED_CACHE_ALIAS', 'default')]
+
+class LookupTable:
+    def __init__(self, model_label):
+        self.model_label = model_label
+        self.version_key = f'accounts:lookup:{model_label.lower()}:version'
+        self._rows = None
+        self._version = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    def _shared_version(self):
+        cache = _shared_cache()
+        version = cache.get(self.version_key)
+        if version is None:
+            # Seed from the clock so a lost key never matches an old copy
+            cache.add(self.version_key, time.time_ns(), None)
+            version = cache.get(self.version_key)
+        return version
+
+    def _rows_by_id(self):
+        now = time.monotonic()
+        interval = getattr(settings, 'LOOKUP_CACHE_CHECK_INTERVAL', 5)
+        rows = self._rows
+        if rows is not None and now - self._checked_at < interval:
+            return rows
+        with self._lock:
+            if self._rows is None or now - self._checked_at >= interval:
+                version = self._shared_version()
+                if self._rows is None or version != self._version:
+                    self._rows = {row.pk: row for row in self.model.objects.all()}
+                    self._version = version
+                self._checked_at = now
+            return self._rows
+
+    def get(self, pk):
+        """The row with this id, or None (also for pk=None)"""
+        if pk is None:
+            return None
+        row = self._rows_by_id().get(pk)
+        if row is None:
+            # Created in another process since our last check
+            self.reload()
+            row = self._rows_by_id().get(pk)
+        return row
+
+    def name(self, pk):
+        row = self.get(pk)
+        return row.name if row else None
+
+    def all(self):
+        return list(self._rows_by_id().values())
+
+    def reload(self):
+        with self._lock:
+            self._rows = None
+
+    def invalidate(self):
+        """
+        Make every process reload once the current transaction commits;
+        called when a row is saved or deleted. Bumping earlier would let
+        another process cache the old rows under the new version for good.
+        """
+        transaction.on_commit(self._bump_version)
+
+    def _bump_version(self):
+        cache = _shared_cache()
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            cache.add(self.version_key, time.time_ns(), None)
+        self.reload()
+
+COURSES = LookupTable('accounts.Course')
+DEPARTMENTS = LookupTable('accounts.Department')
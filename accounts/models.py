@@ -2,6 +2,7 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.core.exceptions import ValidationError
 from core.validators import validate_phone_number, validate_student_id, validate_employee_id, validate_strong_password
+from .lookups import DEPARTMENTS
 import logging
 
 logger = logging.getLogger(__name__)
@@ -117,7 +118,8 @@ class TutorProfile(models.Model):
     office_location = models.CharField(max_length=100, blank=True)
     
     def __str__(self):
-        return f"{self.user.get_full_name()} - {self.department}"
+        # Department comes from the in-process lookup cache, not another query
+        return f"{self.user.get_full_name()} - {DEPARTMENTS.get(self.department_id)}"
 
 class ProviderProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -0,0 +1,41 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .choices import invalidate_choices
+from .lookups import COURSES, DEPARTMENTS
+from .models import User, Course, Department, TutorProfile, ProviderProfile
+
+# Which cached choice lists each model's rows appear in
+CHOICES_BY_MODEL = {
+    User: ('providers', 'tutors'),
+    ProviderProfile: ('providers',),
+    TutorProfile: ('tutors',),
+    Course: ('courses',),
+    Department: ('departments', 'tutors'),
+}
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_cached_choices(sender, instance, **kwargs):
+    """Drop cached dropdown choices when a row they are built from changes"""
+    names = CHOICES_BY_MODEL.get(sender)
+    if not names:
+        return
+    update_fields = kwargs.get('update_fields')
+    if sender is User and update_fields and set(update_fields) <= {'last_login'}:
+        # Logins only touch last_login, which no choice label shows
+        return
+    invalidate_choices(*names)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_course_lookup(sender, instance, **kwargs):
+    COURSES.invalidate()
+
+
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def invalidate_department_lookup(sender, instance, **kwargs):
+    DEPARTMENTS.invalidate()
@@ -0,0 +1,236 @@
+"""
+Concurrency per worker: WSGI threads versus the ASGI entry point
+
+Every database query is delayed by --io-latency seconds, standing in for
+a database (or any other backend) on the far side of a network. Requests
+are then served two ways from one process:
+
+    wsgi   the Django test client (the WSGI request path) on a pool of
+           --threads threads, like one gthread worker
+    asgi   placement_management.asgi driven with --concurrency requests in
+           flight at once, like one uvicorn worker
+
+For each endpoint the report gives throughput, latency percentiles and the
+peak number of live threads. The sync DRF endpoints are included as the
+baseline the async ones (placements.async_views) replace.
+
+Usage:
+    python -m benchmarks.asgi_concurrency --io-latency 0.02 --requests 400
+    python -m benchmarks.asgi_concurrency --only async_dashboard --output asgi.json
+"""
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import threading
+import time
+
+from .notifications import percentiles
+from .run import git_revision, role_users, seed, setup_django
+
+# name: (path, async view)
+ENDPOINTS = {
+    'drf_unread_count': ('/api/v1/messages/unread_count/', False),
+    'async_unread_count': ('/api/v1/async/messages/unread_count/', True),
+    'drf_inbox': ('/api/v1/messages/inbox/', False),
+    'async_inbox': ('/api/v1/async/messages/inbox/', True),
+    'drf_conversations': ('/api/v1/conversations/', False),
+    'tutor_dashboard': ('/tutors/dashboard/', False),
+    'async_dashboard': ('/api/v1/async/dashboard/', True),
+}
+
+class SlowIO:
+    """Execute wrapper that makes every query wait `latency` seconds first"""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def __call__(self, execute, sql, params, many, context):
+        time.sleep(self.latency)
+        return execute(sql, params, many, context)
+
+def install_slow_io(latency):
+    from django.db.backends.signals import connection_created
+
+    def add_wrapper(sender, connection, **kwargs):
+        if not any(isinstance(wrapper, SlowIO) for wrapper in connection.execute_wrappers):
+            # At the front: connection_created can fire inside an execute_wrapper()
+            # block, which pops the last wrapper on exit
+            connection.execute_wrappers.insert(0, SlowIO(latency))
+
+    # Every thread opens its own connection; each one gets the delay
+    connection_created.connect(add_wrapper, weak=False)
+
+class ThreadPeak:
+    """Samples threading.active_count() in the background"""
+
+    def __enter__(self):
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(0.005):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+def session_cookie(user):
+    from django.conf import settings
+    from django.test import Client
+
+    client = Client()
+    client.force_login(user)
+    return settings.SESSION_COOKIE_NAME, client.cookies[settings.SESSION_COOKIE_NAME].value
+
+def run_wsgi(path, cookie, requests, threads):
+    from django.test import Client
+
+    local = threading.local()
+
+    def one(_):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = Client()
+            client.cookies[cookie[0]] = cookie[1]
+        started = time.perf_counter()
+        response = client.get(path)
+        if response.status_code != 200:
+            raise RuntimeError(f'{path} returned {response.status_code}')
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(threads) as pool:
+        return list(pool.map(one, range(requests)))
+
+async def asgi_get(application, path, cookie):
+    """One GET through the ASGI application; returns (status, seconds)"""
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+        'query_string': b'', 'root_path': '',
+        'headers': [(b'host', b'testserver'), (b'cookie', f'{cookie[0]}={cookie[1]}'.encode())],
+        'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+    }
+    done = asyncio.Event()
+    status = None
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await done.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif message['type'] == 'http.response.body' and not message.get('more_body'):
+            done.set()
+
+    started = time.perf_counter()
+    await application(scope, receive, send)
+    return status, time.perf_counter() - started
+
+def run_asgi(application, path, cookie, requests, concurrency):
+    async def main():
+        limit = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with limit:
+                status, seconds = await asgi_get(application, path, cookie)
+            if status != 200:
+                raise RuntimeError(f'{path} returned {status}')
+            return seconds
+
+        return await asyncio.gather(*(one() for _ in range(requests)))
+
+    return asyncio.run(main())
+
+def measure(mode, run):
+    with ThreadPeak() as threads:
+        started = time.perf_counter()
+        timings = run()
+        elapsed = time.perf_counter() - started
+    result = percentiles(timings)
+    result.update({
+        'mode': mode,
+        'requests_per_second': round(len(timings) / elapsed, 1),
+        'peak_threads': threads.peak,
+    })
+    return result
+
+def run(args):
+    from django.core.asgi import get_asgi_application
+    import django
+
+    tutor = role_users()['tutor']
+    cookie = session_cookie(tutor)
+    application = get_asgi_application()
+    install_slow_io(args.io_latency)
+
+    results = {}
+    for name, (path, is_async) in ENDPOINTS.items():
+        if args.only and name not in args.only:
+            continue
+        # Warm up caches, connections and URL resolution
+        run_wsgi(path, cookie, 2, 1)
+        results[name] = {
+            'wsgi': measure('wsgi', lambda: run_wsgi(path, cookie, args.requests, args.threads)),
+            'asgi': measure('asgi', lambda: run_asgi(application, path, cookie, args.requests, args.concurrency)),
+        }
+        for result in results[name].values():
+            print(f"  {name:<20} {result['mode']:<5} {result['requests_per_second']:>8.1f} req/s "
+                  f"p50 {result['p50_ms']:>8.1f} ms  p95 {result['p95_ms']:>8.1f} ms  "
+                  f"{result['peak_threads']:>4} threads")
+
+    return {
+        'meta': {
+            'scale': args.scale,
+            'io_latency': args.io_latency,
+            'requests': args.requests,
+            'threads': args.threads,
+            'concurrency': args.concurrency,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        },
+        'endpoints': results,
+    }
+
+def main(argv=None):
+    from .scenarios import SCALES
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='1k')
+    parser.add_argument('--io-latency', type=float, default=0.02, help='Seconds added to every query')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint and mode')
+    parser.add_argument('--threads', type=int, default=8, help='WSGI worker threads')
+    parser.add_argument('--concurrency', type=int, default=64, help='ASGI requests in flight')
+    parser.add_argument('--only', nargs='*', choices=sorted(ENDPOINTS), help='Run only these endpoints')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    parser.add_argument('--reseed', action='store_true', help='Rebuild the benchmark database')
+    args = parser.parse_args(argv)
+
+    setup_django(args.scale, args.reseed)
+    seed(args.scale)
+    print(f'Serving {args.requests} requests per endpoint with {args.io_latency * 1000:.0f} ms per query:')
+    report = run(args)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f'Report written to {args.output}')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
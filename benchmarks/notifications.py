@@ -0,0 +1,415 @@
+"""
+Throughput and latency harness for the placement notification pipeline
+
+Runs an in-process SMTP sink with configurable per-message latency and
+failure injection, points the SMTP email backend at it and drives storms
+of placement creations and status changes through the real views and
+signals while task workers (core.tasks) send the resulting emails.
+
+Reports:
+    request latency   per phase, against a control pass with the
+                      notification signals disconnected
+    sends/sec         emails accepted by the sink over the delivery span
+    retries           task attempts beyond the first, and failed tasks
+    delivery lag      queued notification -> accepted by the sink
+
+Usage:
+    python -m benchmarks.notifications --placements 200 --latency 0.02
+    python -m benchmarks.notifications --failure-rate 0.1 --output notify.json
+    python -m benchmarks.notifications --eager   # send inside the request
+
+Storm placements and the tasks they queue are deleted afterwards, so the
+shared benchmark database (see benchmarks.run) stays as seeded.
+"""
+from pathlib import Path
+import argparse
+import json
+import platform
+import random
+import socketserver
+import sys
+import threading
+import time
+
+from .run import git_revision, seed, setup_django
+
+STORM_JOB_TITLE = 'Notification storm'
+
+# SMTP sink
+
+class SMTPSink:
+    """
+    Minimal SMTP server that accepts every message after `latency` (plus up
+    to `jitter`) seconds, or rejects it with a 451 at `failure_rate`.
+    Accepted messages are recorded as (time, recipients, size).
+    """
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.received = []
+        self.rejected = 0
+        self.connections = 0
+        self.server = None
+
+    def start(self):
+        sink = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                with sink.lock:
+                    sink.connections += 1
+                self.reply('220 sink ESMTP')
+                recipients = []
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command = line.decode('latin-1').strip()
+                    verb = command[:4].upper()
+                    if verb == 'EHLO':
+                        self.reply('250-sink', '250 8BITMIME')
+                    elif verb in ('HELO', 'MAIL', 'NOOP'):
+                        self.reply('250 OK')
+                    elif verb == 'RCPT':
+                        recipients.append(command.partition('<')[2].rstrip('>'))
+                        self.reply('250 OK')
+                    elif verb == 'RSET':
+                        recipients = []
+                        self.reply('250 OK')
+                    elif verb == 'DATA':
+                        self.reply('354 End data with <CR><LF>.<CR><LF>')
+                        size = self.read_data()
+                        self.reply(sink.deliver(recipients, size))
+                        recipients = []
+                    elif verb == 'QUIT':
+                        self.reply('221 Bye')
+                        return
+                    else:
+                        self.reply('502 Command not implemented')
+
+            def read_data(self):
+                size = 0
+                for line in self.rfile:
+                    if line in (b'.\r\n', b'.\n'):
+                        break
+                    size += len(line)
+                return size
+
+            def reply(self, *lines):
+                self.wfile.write(''.join(f'{line}\r\n' for line in lines).encode())
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name='smtp-sink', daemon=True).start()
+        return self.server.server_address
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def deliver(self, recipients, size):
+        with self.lock:
+            delay = self.latency + self.random.uniform(0, self.jitter)
+            fail = self.random.random() < self.failure_rate
+        time.sleep(delay)
+        with self.lock:
+            if fail:
+                self.rejected += 1
+                return '451 4.3.0 Injected failure'
+            self.received.append((time.time(), list(recipients), size))
+        return '250 OK queued'
+
+# Storm
+
+def percentiles(values):
+    if not values:
+        return {'count': 0}
+    values = sorted(values)
+    pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+    return {
+        'count': len(values),
+        'p50_ms': round(pick(0.50) * 1000, 2),
+        'p95_ms': round(pick(0.95) * 1000, 2),
+        'p99_ms': round(pick(0.99) * 1000, 2),
+        'max_ms': round(values[-1] * 1000, 2),
+    }
+
+def create_placements(count, rng):
+    """Storm placements for random synthetic students, each with a provider and tutor"""
+    from datetime import date, timedelta
+    from accounts.models import ProviderProfile, StudentProfile, TutorProfile
+    from placements.models import PlacementRequest
+
+    students = list(StudentProfile.objects.filter(user__username__startswith='syn_').values_list('pk', flat=True))
+    providers = list(ProviderProfile.objects.filter(user__username__startswith='syn_').values_list('pk', flat=True))
+    tutors = list(TutorProfile.objects.filter(user__username__startswith='syn_').values_list('pk', flat=True))
+    start = date.today() + timedelta(days=30)
+
+    timings = []
+    placements = []
+    for n in range(count):
+        started = time.perf_counter()
+        placements.append(PlacementRequest.objects.create(
+            student_id=rng.choice(students), provider_id=rng.choice(providers), tutor_id=rng.choice(tutors),
+            company_name=f'Storm Co {n}', job_title=STORM_JOB_TITLE, job_description='Benchmark placement',
+            start_date=start, end_date=start + timedelta(days=90), location='Leeds',
+        ))
+        timings.append(time.perf_counter() - started)
+    return placements, timings
+
+def post_all(placements, url_name, user_for):
+    """POST action=approve for each placement as its user; returns request timings"""
+    from django.test import Client
+    from django.urls import reverse
+
+    clients = {}
+    timings = []
+    for placement in placements:
+        user = user_for(placement)
+        client = clients.get(user.pk)
+        if client is None:
+            client = clients[user.pk] = Client()
+            client.force_login(user)
+        started = time.perf_counter()
+        response = client.post(reverse(url_name, args=[placement.pk]), {'action': 'approve'})
+        timings.append(time.perf_counter() - started)
+        if response.status_code != 302:
+            raise RuntimeError(f'{url_name} returned {response.status_code} for placement {placement.pk}')
+    return timings
+
+def storm(count, rng):
+    """Create, provider-approve and tutor-approve `count` placements; {phase: [seconds]}"""
+    placements, created = create_placements(count, rng)
+    provider_approved = post_all(placements, 'providers:review_placement', lambda p: p.provider.user)
+    tutor_approved = post_all(placements, 'tutors:approve_placement', lambda p: p.tutor.user)
+    return {'create': created, 'provider_approve': provider_approved, 'tutor_approve': tutor_approved}
+
+def control_storm(count, rng):
+    """The same storm with the notification signals disconnected"""
+    from django.db.models.signals import post_save
+    from placements import signals
+    from placements.models import PlacementRequest
+
+    post_save.disconnect(signals.notify_placement_request_status_change, sender=PlacementRequest)
+    try:
+        return storm(count, rng)
+    finally:
+        post_save.connect(signals.notify_placement_request_status_change, sender=PlacementRequest)
+
+def wait_for_delivery(since, timeout):
+    """Block until every storm notification is sent or `timeout` passes; returns pending count"""
+    from core.models import Task
+    from placements.models import QueuedNotification
+
+    pending = QueuedNotification.objects.filter(
+        placement_request__job_title=STORM_JOB_TITLE, sent_at__isnull=True,
+    )
+    active = Task.objects.filter(created_at__gte=since, status__in=(Task.QUEUED, Task.RUNNING))
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not pending.exists() and not active.exists():
+            return 0
+        time.sleep(0.1)
+    return pending.count()
+
+def delivery_lags(sink):
+    """Seconds from each storm notification being queued to its email reaching the sink"""
+    from placements.models import QueuedNotification
+
+    receipts = {}
+    for received_at, recipients, _ in sink.received:
+        for recipient in recipients:
+            receipts.setdefault(recipient.lower(), []).append(received_at)
+
+    lags = []
+    notifications = QueuedNotification.objects.filter(
+        placement_request__job_title=STORM_JOB_TITLE, sent_at__isnull=False,
+    ).values_list('created_at', 'recipient__email')
+    for created_at, email in notifications:
+        queued = created_at.timestamp()
+        # The first email to the recipient after queueing carries the notification
+        received = [moment for moment in receipts.get(email.lower(), ()) if moment >= queued]
+        if received:
+            lags.append(min(received) - queued)
+    return lags
+
+def cleanup(since):
+    from core.models import Task
+    from placements.models import PlacementRequest
+
+    PlacementRequest.objects.filter(job_title=STORM_JOB_TITLE).delete()
+    Task.objects.filter(created_at__gte=since, name='placements.tasks.send_due_notifications').delete()
+
+# Runner
+
+def configure(sink_address, args):
+    from django.conf import settings
+    from placements.tasks import send_due_notifications
+
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+    settings.EMAIL_HOST, settings.EMAIL_PORT = sink_address
+    settings.EMAIL_USE_TLS = settings.EMAIL_USE_SSL = False
+    settings.EMAIL_HOST_USER = settings.EMAIL_HOST_PASSWORD = ''
+    settings.EMAIL_TIMEOUT = 10
+    settings.TASKS_RUN_EAGERLY = args.eager
+    # Eager sends only see notifications that are already due
+    settings.NOTIFICATION_COALESCE_SECONDS = 0 if args.eager else args.window
+    settings.NOTIFICATION_BATCH_SIZE = args.batch_size
+    send_due_notifications.retry_delay = args.retry_delay
+
+def start_workers(count, poll):
+    from django.conf import settings
+    from core.management.commands.run_workers import worker_loop
+
+    stop = threading.Event()
+    limits = getattr(settings, 'TASK_QUEUE_LIMITS', {})
+    workers = [
+        threading.Thread(
+            target=worker_loop, args=(f'bench:{n}', ['notifications'], limits, poll, stop),
+            name=f'bench-worker-{n}', daemon=True,
+        )
+        for n in range(count)
+    ]
+    for worker in workers:
+        worker.start()
+    return stop, workers
+
+def run(args):
+    from django.db.models import Sum
+    from django.utils import timezone
+    import django
+    from core.models import Task
+    from placements.models import QueuedNotification
+
+    rng = random.Random(args.seed)
+    sink = SMTPSink(args.latency, args.jitter, args.failure_rate, seed=args.seed)
+    configure(sink.start(), args)
+    since = timezone.now()
+
+    stop, workers = None, []
+    try:
+        print(f'Control storm of {args.placements} placements without notifications...')
+        control = control_storm(args.placements, rng)
+        cleanup(since)
+
+        if not args.eager:
+            stop, workers = start_workers(args.workers, args.poll)
+        print(f'Notification storm of {args.placements} placements...')
+        storm_started = time.time()
+        timings = storm(args.placements, rng)
+        storm_seconds = time.time() - storm_started
+
+        pending = 0 if args.eager else wait_for_delivery(since, args.drain_timeout)
+        if stop is not None:
+            stop.set()
+            for worker in workers:
+                worker.join()
+
+        notifications = QueuedNotification.objects.filter(placement_request__job_title=STORM_JOB_TITLE)
+        tasks = Task.objects.filter(created_at__gte=since, name='placements.tasks.send_due_notifications')
+        task_count = tasks.count()
+        task_attempts = tasks.aggregate(total=Sum('attempts'))['total'] or 0
+        tasks_failed = tasks.filter(status=Task.FAILED).count()
+        notification_count = notifications.count()
+        lags = delivery_lags(sink)
+        receipts = [received_at for received_at, _, _ in sink.received]
+        span = max(receipts) - min(receipts) if len(receipts) > 1 else 0
+    finally:
+        if stop is not None:
+            stop.set()
+        sink.stop()
+        cleanup(since)
+
+    latency = {}
+    for phase, phase_timings in timings.items():
+        latency[phase] = percentiles(phase_timings)
+        baseline = percentiles(control[phase])
+        latency[phase]['control_p50_ms'] = baseline['p50_ms']
+        latency[phase]['impact_p50_ms'] = round(latency[phase]['p50_ms'] - baseline['p50_ms'], 2)
+
+    return {
+        'meta': {
+            'scale': args.scale,
+            'placements': args.placements,
+            'mode': 'eager' if args.eager else f'{args.workers} workers',
+            'window_seconds': 0 if args.eager else args.window,
+            'smtp_latency': args.latency,
+            'smtp_jitter': args.jitter,
+            'failure_rate': args.failure_rate,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        },
+        'request_latency': latency,
+        'delivery': {
+            'storm_seconds': round(storm_seconds, 2),
+            'notifications': notification_count,
+            'emails_sent': len(receipts),
+            'emails_rejected': sink.rejected,
+            'smtp_connections': sink.connections,
+            'sends_per_second': round(len(receipts) / span, 1) if span else None,
+            'undelivered': pending,
+            'tasks': task_count,
+            'task_attempts': task_attempts,
+            'task_retries': max(task_attempts - task_count, 0),
+            'tasks_failed': tasks_failed,
+            'lag': percentiles(lags),
+        },
+    }
+
+def print_report(report):
+    print('Request latency (ms):')
+    print(f"  {'phase':<18} {'p50':>8} {'p95':>8} {'p99':>8} {'control p50':>12} {'impact':>8}")
+    for phase, result in report['request_latency'].items():
+        print(f"  {phase:<18} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} "
+              f"{result['control_p50_ms']:>12.2f} {result['impact_p50_ms']:>+8.2f}")
+    delivery = report['delivery']
+    lag = delivery['lag']
+    print('Delivery:')
+    print(f"  {delivery['emails_sent']} emails for {delivery['notifications']} notifications over "
+          f"{delivery['smtp_connections']} SMTP connections, {delivery['sends_per_second']} sends/s")
+    print(f"  {delivery['emails_rejected']} rejected by the sink, {delivery['task_retries']} task retries, "
+          f"{delivery['tasks_failed']} tasks failed, {delivery['undelivered']} notifications undelivered")
+    if lag['count']:
+        print(f"  lag p50 {lag['p50_ms'] / 1000:.2f}s  p95 {lag['p95_ms'] / 1000:.2f}s  "
+              f"p99 {lag['p99_ms'] / 1000:.2f}s  max {lag['max_ms'] / 1000:.2f}s")
+
+def main(argv=None):
+    from .scenarios import SCALES
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='1k')
+    parser.add_argument('--placements', type=int, default=100, help='Placements per storm')
+    parser.add_argument('--latency', type=float, default=0.01, help='Seconds the sink takes to accept a message')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra random seconds per message, up to this')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of messages rejected with a 451')
+    parser.add_argument('--window', type=float, default=1.0, help='NOTIFICATION_COALESCE_SECONDS for the run')
+    parser.add_argument('--batch-size', type=int, default=200, help='NOTIFICATION_BATCH_SIZE for the run')
+    parser.add_argument('--retry-delay', type=float, default=0.2, help='Base retry delay of the send task')
+    parser.add_argument('--workers', type=int, default=2, help='Worker threads serving the notifications queue')
+    parser.add_argument('--poll', type=float, default=0.05, help='Worker idle poll interval')
+    parser.add_argument('--drain-timeout', type=float, default=120.0, help='Seconds to wait for delivery')
+    parser.add_argument('--eager', action='store_true', help='Send inside the request (TASKS_RUN_EAGERLY)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    parser.add_argument('--reseed', action='store_true', help='Rebuild the benchmark database')
+    args = parser.parse_args(argv)
+
+    setup_django(args.scale, args.reseed)
+    seed(args.scale)
+    report = run(args)
+    print_report(report)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f'Report written to {args.output}')
+    return 0 if not report['delivery']['undelivered'] else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,213 @@
+"""
+Benchmark runner for role dashboards, API endpoints and exports
+
+Seeds a dedicated benchmark database with the generate_data command, drives
+each scenario through the Django test client and records wall time, query
+count, peak traced memory and response size.
+
+Usage:
+    python -m benchmarks.run --scale 1k --output bench-1k.json
+    python -m benchmarks.run --scale 1k --compare bench-1k.json --threshold 0.2
+
+The database is kept between runs (benchmarks/.data/<scale>.sqlite3); pass
+--reseed to rebuild it. With --compare the exit status is 1 when any
+scenario regressed against the stored baseline.
+"""
+from pathlib import Path
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = Path(__file__).resolve().parent / '.data'
+
+def setup_django(scale, reseed):
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'placement_management.settings')
+
+    import django
+    from django.conf import settings
+
+    DATA_DIR.mkdir(exist_ok=True)
+    db_path = DATA_DIR / f'{scale}.sqlite3'
+    if reseed and db_path.exists():
+        db_path.unlink()
+    settings.DATABASES['default']['TEST'] = {'NAME': str(db_path)}
+    django.setup()
+    settings.ALLOWED_HOSTS = ['*']
+    # Measure the views themselves, not the per-request instrumentation
+    settings.REQUEST_METRICS_ENABLED = False
+    settings.NPLUSONE_ENABLED = False
+
+    from django.test.utils import setup_test_environment
+    from django.db import connection
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, keepdb=True)
+    return db_path
+
+def seed(scale):
+    from django.core.management import call_command
+    from accounts.models import User
+    from .scenarios import SCALES
+
+    if User.objects.filter(username__startswith='syn_').exists():
+        return
+    print(f'Seeding {scale} dataset...')
+    call_command('generate_data', seed=42, **SCALES[scale])
+
+def role_users():
+    """The busiest synthetic user of each role (lowest rank in the skewed distributions)"""
+    from accounts.models import User
+
+    users = {}
+    for role in ('student', 'tutor', 'provider'):
+        users[role] = User.objects.filter(username__startswith='syn_', user_type=role).order_by('pk').first()
+    return users
+
+def response_size(response):
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+def measure(scenario, client, repeat):
+    from django.db import connection
+    from core.instrumentation import RequestStats, QueryCollector
+
+    # Warm-up run also validates the scenario
+    response = scenario.run(client)
+    size = response_size(response)
+
+    timings = []
+    stats = None
+    for _ in range(repeat):
+        stats = RequestStats()
+        with connection.execute_wrapper(QueryCollector(stats)):
+            started = time.perf_counter()
+            response = scenario.run(client)
+            response_size(response)
+            timings.append(time.perf_counter() - started)
+
+    # Memory is measured separately because tracing slows execution down
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    response_size(scenario.run(client))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'status': response.status_code,
+        'wall_ms_median': round(statistics.median(timings) * 1000, 2),
+        'wall_ms_min': round(min(timings) * 1000, 2),
+        'queries': stats.query_count,
+        'db_ms': round(stats.db_time * 1000, 2),
+        'peak_memory_kb': round(peak / 1024, 1),
+        'response_bytes': size,
+    }
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+def run(scale, repeat, only):
+    from django.test import Client
+    import django
+    from .scenarios import SCENARIOS
+
+    users = role_users()
+    results = {}
+    for scenario in SCENARIOS:
+        if only and scenario.name not in only:
+            continue
+        client = Client()
+        if scenario.role:
+            client.force_login(users[scenario.role])
+        results[scenario.name] = measure(scenario, client, repeat)
+        result = results[scenario.name]
+        print(f"  {scenario.name:<28} {result['wall_ms_median']:>9.1f} ms {result['queries']:>5} queries "
+              f"{result['peak_memory_kb']:>10.0f} KB {result['response_bytes']:>10} B  [{result['status']}]")
+
+    return {
+        'meta': {
+            'scale': scale,
+            'repeat': repeat,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        },
+        'scenarios': results,
+    }
+
+def compare(report, baseline, threshold, min_delta_ms=2.0):
+    """
+    Return a list of human-readable regressions against the baseline report.
+    Wall time must grow by more than `threshold` (relative) and more than
+    `min_delta_ms`, so timer noise on sub-millisecond scenarios doesn't count.
+    """
+    regressions = []
+    for name, result in report['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous:
+            continue
+        slowdown_ms = result['wall_ms_median'] - previous['wall_ms_median']
+        if slowdown_ms > max(previous['wall_ms_median'] * threshold, min_delta_ms):
+            regressions.append(
+                f"{name}: wall time {previous['wall_ms_median']} ms -> {result['wall_ms_median']} ms"
+            )
+        if result['queries'] > previous['queries']:
+            regressions.append(f"{name}: queries {previous['queries']} -> {result['queries']}")
+        if result['peak_memory_kb'] > previous['peak_memory_kb'] * (1 + threshold):
+            regressions.append(
+                f"{name}: peak memory {previous['peak_memory_kb']} KB -> {result['peak_memory_kb']} KB"
+            )
+    return regressions
+
+def main(argv=None):
+    from .scenarios import SCALES
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='1k')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per scenario')
+    parser.add_argument('--only', nargs='*', help='Run only these scenario names')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    parser.add_argument('--compare', help='Baseline JSON report to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Allowed relative slowdown before a scenario counts as regressed')
+    parser.add_argument('--min-delta-ms', type=float, default=2.0,
+                        help='Slowdowns of at most this many milliseconds never count as regressions')
+    parser.add_argument('--reseed', action='store_true', help='Rebuild the benchmark database')
+    args = parser.parse_args(argv)
+
+    setup_django(args.scale, args.reseed)
+    seed(args.scale)
+    print(f'Running scenarios at scale {args.scale}:')
+    report = run(args.scale, args.repeat, args.only)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f'Report written to {args.output}')
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        regressions = compare(report, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print('Regressions:')
+            for line in regressions:
+                print(f'  {line}')
+            return 1
+        print('No regressions against baseline.')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,48 @@
+"""
+Benchmark scenarios and dataset scales
+
+Each scenario names the role it runs as and how to issue the request
+through the Django test client.
+"""
+
+# Row volumes passed to the generate_data command for each scale
+SCALES = {
+    '1k': {
+        'students': 80, 'tutors': 5, 'providers': 15,
+        'placements': 400, 'messages': 400, 'visits': 100,
+    },
+    '100k': {
+        'students': 8000, 'tutors': 100, 'providers': 500,
+        'placements': 40000, 'messages': 40000, 'visits': 10000,
+    },
+    '1m': {
+        'students': 50000, 'tutors': 500, 'providers': 2000,
+        'placements': 400000, 'messages': 450000, 'visits': 100000,
+    },
+}
+
+class Scenario:
+    def __init__(self, name, role, path, method='get', data=None):
+        self.name = name
+        self.role = role
+        self.path = path
+        self.method = method
+        self.data = data or {}
+
+    def run(self, client):
+        return getattr(client, self.method)(self.path, self.data)
+
+SCENARIOS = [
+    Scenario('home', None, '/'),
+    Scenario('map_view', 'tutor', '/map/'),
+    Scenario('tutor_dashboard', 'tutor', '/tutors/dashboard/'),
+    Scenario('tutor_calendar', 'tutor', '/tutors/calendar/'),
+    Scenario('tutor_export_excel', 'tutor', '/tutors/export/', method='post', data={'export_format': 'excel'}),
+    Scenario('tutor_export_csv', 'tutor', '/tutors/export/', method='post', data={'export_format': 'csv'}),
+    Scenario('student_dashboard', 'student', '/students/dashboard/'),
+    Scenario('provider_dashboard', 'provider', '/providers/dashboard/'),
+    Scenario('api_placements_list', 'tutor', '/api/v1/placements/'),
+    Scenario('api_placements_statistics', 'tutor', '/api/v1/placements/statistics/'),
+    Scenario('api_messages_list', 'student', '/api/v1/messages/'),
+    Scenario('api_messages_unread_count', 'student', '/api/v1/messages/unread_count/'),
+]
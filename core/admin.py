@@ -0,0 +1,13 @@
+from django.contrib import admin
+from .models import Task
+from .paginators import EstimatedCountPaginator
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'queue', 'status', 'priority', 'attempts', 'run_at', 'finished_at')
+    list_filter = ('status', 'queue')
+    search_fields = ('name', 'idempotency_key')
+    ordering = ('-created_at',)
+    readonly_fields = ('attempts', 'locked_by', 'locked_until', 'last_error', 'created_at', 'updated_at', 'finished_at')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
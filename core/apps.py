@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core'
+
+    def ready(self):
+        """Time queries per context, track table writes for the query-result cache and identity changes"""
+        from core import identity, instrumentation, querycache
+        instrumentation.install()
+        querycache.install()
+        identity.install()
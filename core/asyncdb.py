@@ -0,0 +1,58 @@
+"""
+Database helpers for async views (see placement_management.asgi)
+
+Django's async ORM methods (acount(), aget(), `async for`) run every query
+on the request's one sync thread, so asyncio.gather() over them still
+issues the queries one after another. concurrently() runs independent
+read-only queries on separate threads, each with its own connection, so
+their I/O overlaps; SQLite in WAL mode serves concurrent readers.
+
+Usage:
+    pending, unread = await concurrently(
+        PlacementRequest.objects.filter(status='pending').count,
+        lambda: Message.objects.filter(recipient=user, is_read=False).count(),
+    )
+
+The queries run on a pool of ASYNC_QUERY_THREADS threads shared by every
+request in the process, so the pool, not the event loop's small default
+executor, bounds how many are in flight. Only use it for reads outside a
+transaction: the extra connections don't see the request's uncommitted
+writes. Queries are counted in the request's metrics like any other
+(sync_to_async() carries the request's context into the pool threads).
+"""
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+def _isolated(call):
+    def run():
+        try:
+            return call()
+        finally:
+            # Executor threads outlive the request; don't leave connections open in them
+            connections.close_all()
+    return run
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    getattr(settings, 'ASYNC_QUERY_THREADS', 16), thread_name_prefix='async-query',
+                )
+    return _executor
+
+async def concurrently(*calls):
+    """Run zero-argument sync callables in parallel threads; results in argument order"""
+    executor = get_executor()
+    return await asyncio.gather(*(
+        sync_to_async(_isolated(call), thread_sensitive=False, executor=executor)() for call in calls
+    ))
@@ -0,0 +1,96 @@
+"""
+SQLite backend tuned for several worker processes writing to one file
+
+On top of django.db.backends.sqlite3 it understands three extra OPTIONS:
+
+    pragmas           {name: value} applied to every new connection, e.g.
+                      journal_mode=WAL so readers never block the writer
+    transaction_mode  'IMMEDIATE' starts atomic() blocks with BEGIN IMMEDIATE,
+                      taking the write lock up front instead of failing with
+                      "database is locked" when a read transaction later
+                      tries to upgrade to a write
+    lock_retries      how often a statement that could not get the lock is
+                      retried (with jittered backoff) once busy_timeout has
+                      run out; only statements outside a transaction and the
+                      BEGIN itself are retried, as they are safe to repeat
+"""
+import logging
+import random
+import time
+
+from django.db import OperationalError
+from django.db.backends.sqlite3 import base
+
+logger = logging.getLogger(__name__)
+
+LOCKED_MESSAGES = ('database is locked', 'database table is locked', 'database is busy')
+
+def is_locked_error(exc):
+    # Raw sqlite3 errors inside the cursor, Django's wrapped ones above it
+    return isinstance(exc, (base.Database.OperationalError, OperationalError)) and any(
+        message in str(exc).lower() for message in LOCKED_MESSAGES
+    )
+
+def lock_backoff(attempt, base_delay=0.05, max_delay=2.0):
+    """Seconds to wait before retry number `attempt` (full jitter)"""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+def _retry_locked(run, retries):
+    attempt = 0
+    while True:
+        try:
+            return run()
+        except base.Database.OperationalError as exc:
+            if attempt >= retries or not is_locked_error(exc):
+                raise
+            delay = lock_backoff(attempt)
+            attempt += 1
+            logger.warning(f"SQLite lock contention, retry {attempt}/{retries} in {delay:.3f}s")
+            time.sleep(delay)
+
+class SQLiteCursorWrapper(base.SQLiteCursorWrapper):
+    lock_retries = 0
+
+    def execute(self, query, params=None):
+        if self.lock_retries and not self.connection.in_transaction:
+            return _retry_locked(lambda: super(SQLiteCursorWrapper, self).execute(query, params), self.lock_retries)
+        return super().execute(query, params)
+
+    def executemany(self, query, param_list):
+        if self.lock_retries and not self.connection.in_transaction:
+            param_list = list(param_list)
+            return _retry_locked(
+                lambda: super(SQLiteCursorWrapper, self).executemany(query, iter(param_list)), self.lock_retries
+            )
+        return super().executemany(query, param_list)
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    EXTRA_OPTIONS = ('pragmas', 'transaction_mode', 'lock_retries')
+
+    def __init__(self, settings_dict, *args, **kwargs):
+        super().__init__(settings_dict, *args, **kwargs)
+        options = self.settings_dict['OPTIONS']
+        self.pragmas = dict(options.get('pragmas', {}))
+        self.transaction_mode = (options.get('transaction_mode') or 'DEFERRED').upper()
+        self.lock_retries = options.get('lock_retries', 5)
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        for option in self.EXTRA_OPTIONS:
+            kwargs.pop(option, None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=SQLiteCursorWrapper)
+        cursor.lock_retries = self.lock_retries
+        return cursor
+
+    def _start_transaction_under_autocommit(self):
+        statement = 'BEGIN' if self.transaction_mode == 'DEFERRED' else f'BEGIN {self.transaction_mode}'
+        self.cursor().execute(statement)
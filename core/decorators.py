@@ -6,8 +6,12 @@ from django.shortcuts import redirect
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
-from django.http import HttpResponseForbidden
+from django.db import OperationalError, connections, DEFAULT_DB_ALIAS
+from django.http import HttpResponseForbidden, HttpResponseNotAllowed, JsonResponse
 import logging
+import time
+
+from .db_backends.sqlite3.base import is_locked_error, lock_backoff
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +53,31 @@ def ajax_required(view_func):
         return view_func(request, *args, **kwargs)
     return _wrapped_view
 
+def async_api_view(methods=('GET',)):
+    """
+    Decorator for async JSON views: restricts the HTTP methods and answers
+    anonymous requests with 403 like the DRF endpoints rather than
+    redirecting to the login page. (Django's require_http_methods and
+    login_required don't support async views before 5.0.)
+    Usage: @async_api_view(['POST'])
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        async def _wrapped_view(request, *args, **kwargs):
+            if request.method not in methods:
+                return HttpResponseNotAllowed(methods)
+            # request.user was resolved by IdentityMiddleware, so this does no I/O
+            if not request.user.is_authenticated:
+                return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=403)
+            return await view_func(request, *args, **kwargs)
+        return _wrapped_view
+    return decorator
+
+def primary_reads(view_func):
+    """Decorator for GET views that must not read from the replica (see core.routers)"""
+    view_func.primary_reads = True
+    return view_func
+
 def handle_exceptions(view_func):
     """Decorator to handle common exceptions"""
     @wraps(view_func)
@@ -58,8 +87,42 @@ def handle_exceptions(view_func):
         except PermissionDenied:
             messages.error(request, "You don't have permission to perform this action.")
             return redirect('accounts:login')
+        except OperationalError as e:
+            if not is_locked_error(e):
+                raise
+            logger.error(f"Database busy in {view_func.__name__}: {str(e)}")
+            messages.error(request, "The system is busy right now. Please try again in a moment.")
+            return redirect('/')
         except Exception as e:
             logger.error(f"Error in {view_func.__name__}: {str(e)}")
             messages.error(request, "An unexpected error occurred. Please try again.")
             return redirect('/')
     return _wrapped_view
+
+def retry_on_locked(func=None, *, retries=5, using=DEFAULT_DB_ALIAS):
+    """
+    Retry a whole write transaction when SQLite reports the database as locked
+    Usage: @retry_on_locked or @retry_on_locked(retries=3)
+
+    The function must be safe to run again (e.g. wrap its writes in
+    transaction.atomic()). Inside an outer atomic block nothing is retried,
+    since the outer transaction is already broken.
+    """
+    def decorator(func):
+        @wraps(func)
+        def _wrapped(*args, **kwargs):
+            attempt = 0
+            while True:
+                try:
+                    return func(*args, **kwargs)
+                except OperationalError as e:
+                    if attempt >= retries or not is_locked_error(e) or connections[using].in_atomic_block:
+                        raise
+                    delay = lock_backoff(attempt)
+                    attempt += 1
+                    logger.warning(f"{func.__name__} hit a locked database, retry {attempt}/{retries} in {delay:.3f}s")
+                    time.sleep(delay)
+        return _wrapped
+    if func is not None:
+        return decorator(func)
+    return decorator
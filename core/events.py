@@ -0,0 +1,252 @@
+"""
+Per-user live events for the Server-Sent Events stream (core.views.event_stream)
+
+Signal handlers call publish() with the users an event concerns; the event
+reaches the broker once the surrounding transaction commits. Every open
+stream subscribes its user with the process-local HUB, which parks the
+connection on an asyncio.Queue: an idle client costs a suspended coroutine
+and nothing else, no polling and no queries.
+
+Brokers:
+    core.events.LocalBroker   hands events straight to this process's
+                              subscribers (default; a single ASGI process)
+    core.events.SpoolBroker   appends events to a shared SQLite spool that
+                              one thread per process tails while anyone is
+                              subscribed; the single-host stand-in for Redis
+                              pub/sub when several processes serve streams
+
+Usage:
+    from core.events import publish
+    publish([recipient.pk], 'message', {'id': message.pk})
+"""
+from pathlib import Path
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+class Subscription:
+    """One open stream: a bounded queue on the event loop that serves it"""
+
+    def __init__(self, user_id, loop, maxsize):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+        # Set when events were dropped; the stream tells the client to resync
+        self.overflowed = False
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout):
+        """The next event, or None after `timeout` seconds without one"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+class Hub:
+    """Subscriptions of this process, keyed by user id"""
+
+    def __init__(self):
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        subscription = Subscription(
+            user_id, asyncio.get_running_loop(), getattr(settings, 'EVENTS_QUEUE_SIZE', 100),
+        )
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+            if self.count() == 1:
+                get_broker().start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.user_id, None)
+            if self.count() == 0:
+                get_broker().stop()
+
+    def count(self):
+        return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def dispatch(self, user_id, event):
+        """Deliver an event to every stream of a user; safe from any thread"""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                pass  # The loop closed under a stream being torn down
+
+HUB = Hub()
+
+# Brokers
+
+class LocalBroker:
+    """Events only reach streams served by the publishing process"""
+
+    def publish(self, user_ids, event):
+        for user_id in user_ids:
+            HUB.dispatch(user_id, event)
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+class SpoolBroker:
+    """
+    Events go through an append-only SQLite table shared by every process.
+    A tail thread runs only while this process has subscribers and reads new
+    rows every `poll_interval` seconds; rows older than `retention` seconds
+    are pruned by publishers.
+    """
+
+    def __init__(self, path=None, poll_interval=0.5, retention=60):
+        self.path = Path(path or Path(settings.BASE_DIR) / 'events.sqlite3')
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._local = threading.local()
+        self._stop = None
+        self._last_prune = 0.0
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(str(self.path), timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS events ('
+                ' id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL,'
+                ' payload TEXT NOT NULL, created REAL NOT NULL)'
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def publish(self, user_ids, event):
+        conn = self._connection()
+        now = time.time()
+        payload = json.dumps(event, default=str)
+        conn.executemany(
+            'INSERT INTO events (user_id, payload, created) VALUES (?, ?, ?)',
+            [(user_id, payload, now) for user_id in user_ids],
+        )
+        if now - self._last_prune >= self.retention:
+            self._last_prune = now
+            conn.execute('DELETE FROM events WHERE created < ?', (now - self.retention,))
+
+    def start(self):
+        if self._stop is not None:
+            return
+        self._stop = threading.Event()
+        threading.Thread(target=self._tail, args=(self._stop,), name='events-spool', daemon=True).start()
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+            self._stop = None
+
+    def _tail(self, stop):
+        try:
+            last_id = self._connection().execute('SELECT COALESCE(MAX(id), 0) FROM events').fetchone()[0]
+        except sqlite3.Error as e:
+            logger.warning(f"Event spool unavailable: {str(e)}")
+            last_id = 0
+        while not stop.wait(self.poll_interval):
+            try:
+                rows = self._connection().execute(
+                    'SELECT id, user_id, payload FROM events WHERE id > ? ORDER BY id', (last_id,)
+                ).fetchall()
+            except sqlite3.Error as e:
+                logger.warning(f"Event spool read failed: {str(e)}")
+                continue
+            for row_id, user_id, payload in rows:
+                last_id = row_id
+                HUB.dispatch(user_id, json.loads(payload))
+
+_broker = None
+_broker_lock = threading.Lock()
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                broker_class = import_string(getattr(settings, 'EVENTS_BROKER', 'core.events.LocalBroker'))
+                _broker = broker_class(**getattr(settings, 'EVENTS_BROKER_OPTIONS', {}))
+    return _broker
+
+def publish(user_ids, event_type, data=None):
+    """Send an event to the streams of these users once the current transaction commits"""
+    if not getattr(settings, 'EVENTS_ENABLED', True):
+        return
+    user_ids = sorted({user_id for user_id in user_ids if user_id is not None})
+    if not user_ids:
+        return
+    event = {'type': event_type, 'data': data or {}}
+
+    def send():
+        try:
+            get_broker().publish(user_ids, event)
+        except Exception as e:
+            logger.warning(f"Could not publish {event_type} event: {str(e)}")
+
+    transaction.on_commit(send)
+
+# Stream
+
+def format_event(event_type, data):
+    return f"event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def stream(user_id, snapshot, refresh_types=()):
+    """
+    Server-Sent Events for one user. Starts with the events from `snapshot()`
+    and sends them again after any event whose type is in `refresh_types`
+    (so derived values such as unread counts are computed only for connected
+    users, and only when something changed). Ends after EVENTS_STREAM_MAX_SECONDS;
+    the browser reconnects on its own.
+    """
+    heartbeat = getattr(settings, 'EVENTS_HEARTBEAT_SECONDS', 20)
+    deadline = time.monotonic() + getattr(settings, 'EVENTS_STREAM_MAX_SECONDS', 300)
+    subscription = HUB.subscribe(user_id)
+    try:
+        yield f"retry: {getattr(settings, 'EVENTS_RETRY_MS', 3000)}\n\n"
+        for event_type, data in await snapshot():
+            yield format_event(event_type, data)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            event = await subscription.get(min(heartbeat, remaining))
+            if subscription.overflowed:
+                subscription.overflowed = False
+                yield format_event('resync', {})
+            if event is None:
+                yield ': keepalive\n\n'
+                continue
+            yield format_event(event['type'], event['data'])
+            if event['type'] in refresh_types:
+                for event_type, data in await snapshot():
+                    yield format_event(event_type, data)
+    finally:
+        HUB.unsubscribe(subscription)
@@ -0,0 +1,137 @@
+"""
+Request identity: the authenticated user and their role profile
+
+The user row and the profile matching their user_type are loaded with a
+single joined query and the other two reverse profile accessors are
+cached as missing, so hasattr()/attribute checks on request.user never
+query. The pair is also cached across requests, keyed by session, for
+IDENTITY_CACHE_TIMEOUT seconds; saving the user or their profile bumps a
+per-user generation that retires those entries immediately. Entries stay
+in the process's default cache, generations live in SHARED_CACHE_ALIAS so
+a change made in one process retires the entries of every process.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user, user_logged_in,
+)
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache, caches
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models.signals import post_save, post_delete
+from django.utils.crypto import constant_time_compare
+
+# Reverse one-to-one accessor on User for each user_type
+PROFILE_RELATIONS = {
+    'student': 'studentprofile',
+    'tutor': 'tutorprofile',
+    'provider': 'providerprofile',
+}
+
+# Stored at login so the profile join can be chosen before the user is loaded
+SESSION_USER_TYPE_KEY = 'user_type'
+
+def _generation_key(user_id):
+    return f'identity:gen:{user_id}'
+
+def _identity_key(session_key):
+    return f'identity:session:{session_key}'
+
+def _generations():
+    return caches[getattr(settings, 'SHARED_CACHE_ALIAS', 'default')]
+
+def load_user(user_id, user_type=None):
+    """User with their profile joined in; other profile accessors cached as missing"""
+    from accounts.models import User
+
+    relations = [PROFILE_RELATIONS[user_type]] if user_type in PROFILE_RELATIONS else list(PROFILE_RELATIONS.values())
+    user = User._default_manager.select_related(*relations).filter(pk=user_id).first()
+    if user is None:
+        return None
+    for relation in PROFILE_RELATIONS.values():
+        if relation not in relations:
+            # Accessing these now raises RelatedObjectDoesNotExist without a query
+            User._meta.get_field(relation).set_cached_value(user, None)
+    return user
+
+def get_profile(user):
+    """The role profile of an authenticated user, or None"""
+    relation = PROFILE_RELATIONS.get(getattr(user, 'user_type', None))
+    if relation is None or not user.is_authenticated:
+        return None
+    try:
+        return getattr(user, relation)
+    except ObjectDoesNotExist:
+        return None
+
+def _verified_user(request, user_id):
+    """
+    Joined load of the session's user with the same checks as
+    django.contrib.auth.get_user(); anything unusual (unknown backend,
+    inactive user, stale session hash) is left to get_user() itself.
+    """
+    session = request.session
+    if session.get(BACKEND_SESSION_KEY) not in settings.AUTHENTICATION_BACKENDS:
+        return get_user(request)
+    user = load_user(user_id, session.get(SESSION_USER_TYPE_KEY))
+    if user is None or not user.is_active:
+        return get_user(request)
+    session_hash = session.get(HASH_SESSION_KEY)
+    if not (session_hash and constant_time_compare(session_hash, user.get_session_auth_hash())):
+        return get_user(request)
+    return user
+
+def get_request_user(request):
+    """Resolve request.user once, from the cross-request cache when possible"""
+    session = request.session
+    user_id = session.get(SESSION_KEY)
+    if user_id is None:
+        return AnonymousUser()
+
+    timeout = getattr(settings, 'IDENTITY_CACHE_TIMEOUT', 30)
+    session_key = session.session_key
+    if timeout and session_key:
+        generation_key = _generation_key(user_id)
+        generations = _generations()
+        entry = cache.get(_identity_key(session_key))
+        generation = generations.get(generation_key)
+        if generation is None:
+            # Seed from the clock so a lost counter never matches an old entry
+            generations.add(generation_key, time.time_ns(), None)
+            generation = generations.get(generation_key)
+        if entry is not None and entry[0] == generation and str(entry[1].pk) == str(user_id):
+            return entry[1]
+
+    user = _verified_user(request, user_id)
+    if timeout and session_key and user.is_authenticated:
+        cache.set(_identity_key(session_key), (generation, user), timeout)
+    return user
+
+def invalidate_identity(user_id):
+    """Retire every cached identity of this user"""
+    generations = _generations()
+    try:
+        generations.incr(_generation_key(user_id))
+    except ValueError:
+        generations.add(_generation_key(user_id), time.time_ns(), None)
+
+def _invalidate_on_user_change(sender, instance, **kwargs):
+    invalidate_identity(instance.pk)
+
+def _invalidate_on_profile_change(sender, instance, **kwargs):
+    invalidate_identity(instance.user_id)
+
+def _remember_user_type(sender, request, user, **kwargs):
+    request.session[SESSION_USER_TYPE_KEY] = user.user_type
+
+def install():
+    """Connect invalidation and login receivers; called from CoreConfig.ready()"""
+    from accounts.models import User, StudentProfile, TutorProfile, ProviderProfile
+
+    for signal in (post_save, post_delete):
+        signal.connect(_invalidate_on_user_change, sender=User, dispatch_uid='core.identity.user')
+        for model in (StudentProfile, TutorProfile, ProviderProfile):
+            signal.connect(_invalidate_on_profile_change, sender=model,
+                           dispatch_uid=f'core.identity.{model._meta.model_name}')
+    user_logged_in.connect(_remember_user_type, dispatch_uid='core.identity.login')
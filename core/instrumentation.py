@@ -0,0 +1,142 @@
+"""
+Per-request query and template instrumentation helpers
+"""
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+import re
+import time
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+_current_stats = ContextVar('request_stats', default=None)
+_context_wrappers = ContextVar('context_execute_wrappers', default=())
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+def normalize_sql(sql):
+    """
+    Reduce a SQL statement to its shape so that queries differing only
+    in literal values or IN-list length compare equal.
+    """
+    shape = _STRING_RE.sub('?', sql)
+    shape = _NUMBER_RE.sub('?', shape)
+    shape = shape.replace('%s', '?')
+    shape = _IN_LIST_RE.sub('(...)', shape)
+    return _WHITESPACE_RE.sub(' ', shape).strip()
+
+class RequestStats:
+    """Accumulates SQL and template timings for a single request or block"""
+
+    def __init__(self):
+        self.queries = []
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self._template_depth = 0
+
+    @property
+    def query_count(self):
+        return len(self.queries)
+
+    def record_query(self, sql, duration):
+        self.queries.append((sql, duration))
+        self.db_time += duration
+
+    def shape_counts(self):
+        """Counter of normalized query shapes"""
+        return Counter(normalize_sql(sql) for sql, _ in self.queries)
+
+    def duplicate_shapes(self):
+        """Shapes executed more than once, most repeated first"""
+        return [(shape, count) for shape, count in self.shape_counts().most_common() if count > 1]
+
+class QueryCollector:
+    """
+    Execute wrapper that times every query run on a connection.
+    Usage: with connection.execute_wrapper(QueryCollector(stats)): ...
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.stats.record_query(sql, time.perf_counter() - start)
+
+@contextmanager
+def context_execute_wrapper(wrapper):
+    """
+    Like connection.execute_wrapper(wrapper) on every connection, but bound
+    to the current context instead of the current thread, so it also sees
+    the queries async views run through sync_to_async() on other threads.
+    """
+    token = _context_wrappers.set(_context_wrappers.get() + (wrapper,))
+    try:
+        yield wrapper
+    finally:
+        _context_wrappers.reset(token)
+
+def run_context_wrappers(execute, sql, params, many, context):
+    for wrapper in reversed(_context_wrappers.get()):
+        execute = partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+def _install_wrapper(sender, connection, **kwargs):
+    # At the front for the same reason as core.querycache's wrapper
+    if run_context_wrappers not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, run_context_wrappers)
+
+def install():
+    """Run context_execute_wrapper() wrappers on every connection; called from CoreConfig.ready()"""
+    connection_created.connect(_install_wrapper, dispatch_uid='core.instrumentation')
+    for connection in connections.all(initialized_only=True):
+        _install_wrapper(None, connection)
+
+def activate_stats(stats):
+    """Make `stats` the collector for template timings in this context"""
+    return _current_stats.set(stats)
+
+def deactivate_stats(token):
+    _current_stats.reset(token)
+
+def get_current_stats():
+    return _current_stats.get()
+
+_template_timer_installed = False
+
+def install_template_timer():
+    """
+    Wrap Template.render once so top-level render time is added to the
+    active RequestStats. Nested renders ({% include %}) are not double counted.
+    """
+    global _template_timer_installed
+    if _template_timer_installed:
+        return
+
+    from django.template.base import Template
+
+    original_render = Template.render
+
+    def timed_render(self, context):
+        stats = _current_stats.get()
+        if stats is None:
+            return original_render(self, context)
+        stats._template_depth += 1
+        start = time.perf_counter()
+        try:
+            return original_render(self, context)
+        finally:
+            stats._template_depth -= 1
+            if stats._template_depth == 0:
+                stats.template_time += time.perf_counter() - start
+
+    Template.render = timed_render
+    _template_timer_installed = True
@@ -0,0 +1,57 @@
+"""
+Fail when a canonical view/API query falls back to a full table scan
+
+Plans are checked against a throwaway test database built from the current
+migrations, so the result follows the indexes declared in code rather than
+whatever state the local database happens to be in.
+
+Example:
+    python manage.py check_query_plans --verbose
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.queryplan import check_query_plans
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN QUERY PLAN on the canonical queries and fail on full table scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--verbose', action='store_true', help='Print every plan, not just failures')
+        parser.add_argument('--existing', action='store_true',
+                            help='Explain against the configured database instead of a fresh test database')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if connections[using].vendor != 'sqlite':
+            raise CommandError('check_query_plans reads SQLite EXPLAIN QUERY PLAN output; '
+                               f"database '{using}' is {connections[using].vendor}")
+
+        connection = connections[using]
+        if options['existing']:
+            results = check_query_plans(using=using)
+        else:
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                results = check_query_plans(using=using)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        failures = 0
+        for query, plan, scanned in results:
+            if scanned:
+                failures += 1
+                self.stdout.write(self.style.ERROR(
+                    f"SCAN  {query.name} ({query.source}): full scan of {', '.join(scanned)}"
+                ))
+            elif options['verbose']:
+                self.stdout.write(self.style.SUCCESS(f"OK    {query.name} ({query.source})"))
+            if scanned or options['verbose']:
+                for detail in plan:
+                    self.stdout.write(f"        {detail}")
+
+        if failures:
+            raise CommandError(f'{failures} canonical queries fall back to a full table scan')
+        self.stdout.write(self.style.SUCCESS('All canonical queries use indexes'))
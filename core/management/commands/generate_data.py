@@ -0,0 +1,400 @@
+"""
+Generate a large, deterministic synthetic dataset for benchmarking
+
+Rows are generated in parallel worker processes and written with
+bulk_create in batches. Every chunk uses its own RNG derived from --seed,
+so the same seed produces the same data regardless of --workers.
+
+Example:
+    python manage.py generate_data --students 50000 --placements 500000 \
+        --messages 2000000 --visits 200000 --seed 42
+"""
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+import os
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from accounts.models import User, Course, Department, StudentProfile, TutorProfile, ProviderProfile
+from placements.messaging import backfill_conversations
+from placements.models import PlacementRequest, Message, VisitSchedule
+
+FIRST_NAMES = [
+    'Alex', 'Sam', 'Jordan', 'Taylor', 'Morgan', 'Casey', 'Riley', 'Jamie', 'Avery', 'Quinn',
+    'Emma', 'Oliver', 'Amelia', 'Noah', 'Isla', 'Leo', 'Ava', 'Arthur', 'Mia', 'Oscar',
+    'Priya', 'Mohammed', 'Aisha', 'Wei', 'Sofia', 'Lucas', 'Zara', 'Ethan', 'Chloe', 'Ibrahim',
+]
+LAST_NAMES = [
+    'Smith', 'Jones', 'Williams', 'Taylor', 'Brown', 'Davies', 'Evans', 'Wilson', 'Thomas', 'Johnson',
+    'Roberts', 'Walker', 'Wright', 'Patel', 'Khan', 'Chen', 'Singh', 'Hughes', 'Green', 'Lewis',
+]
+INDUSTRIES = ['Technology', 'Banking & Finance', 'Healthcare', 'Engineering', 'Retail', 'Media', 'Energy', 'Education']
+JOB_TITLES = [
+    'Software Engineering Intern', 'Data Analyst Intern', 'Marketing Assistant', 'Finance Intern',
+    'Research Assistant', 'Product Intern', 'Operations Intern', 'Design Intern',
+]
+CITIES = [
+    ('London', 51.5074, -0.1278), ('Manchester', 53.4808, -2.2426), ('Birmingham', 52.4862, -1.8904),
+    ('Leeds', 53.8008, -1.5491), ('Glasgow', 55.8642, -4.2518), ('Bristol', 51.4545, -2.5879),
+    ('Edinburgh', 55.9533, -3.1883), ('Cardiff', 51.4816, -3.1791), ('Belfast', 54.5973, -5.9301),
+]
+PLACEMENT_STATUSES = ['pending', 'approved_by_provider', 'approved_by_tutor', 'rejected', 'completed']
+PLACEMENT_STATUS_WEIGHTS = [20, 15, 35, 10, 20]
+VISIT_PURPOSES = ['Initial visit', 'Mid-placement review', 'Final assessment', 'Welfare check']
+
+# Per-process generation context, set once per worker by _init_worker
+_context = {}
+
+def _init_worker(context):
+    _context.clear()
+    _context.update(context)
+
+def _chunk_rng(table, chunk_index):
+    return random.Random(f"{_context['seed']}:{table}:{chunk_index}")
+
+def zipf_cum_weights(n, skew):
+    """Cumulative weights so that item 0 is the most popular, item n-1 the least"""
+    return list(accumulate(1.0 / (rank ** skew) for rank in range(1, n + 1)))
+
+def _spread_datetime(rng, days_back):
+    offset = rng.random() * days_back * 86400
+    return _context['now'] - timedelta(seconds=offset)
+
+def _user_rows(chunk_index, start, count, user_type):
+    rng = _chunk_rng(f'user-{user_type}', chunk_index)
+    rows = []
+    for pk in range(start, start + count):
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        rows.append((pk, f"syn_{user_type}_{pk}", first, last, f"syn_{user_type}_{pk}@example.com",
+                     user_type, _spread_datetime(rng, 730)))
+    return rows
+
+def _student_rows(chunk_index, start, count):
+    rng = _chunk_rng('student', chunk_index)
+    ctx = _context
+    rows = []
+    for pk in range(start, start + count):
+        index = pk - ctx['student_start']
+        rows.append((
+            pk,
+            ctx['student_user_start'] + index,
+            f"SY{pk:06d}",
+            rng.choice(ctx['course_ids']),
+            rng.randint(1, 4),
+            Decimal(f"{rng.uniform(4.0, 10.0):.2f}"),
+            ctx['tutor_start'] + ctx['student_tutor_indexes'][index],
+        ))
+    return rows
+
+def _placement_rows(chunk_index, start, count):
+    rng = _chunk_rng('placement', chunk_index)
+    ctx = _context
+    provider_indexes = rng.choices(range(ctx['provider_count']), cum_weights=ctx['provider_weights'], k=count)
+    statuses = rng.choices(PLACEMENT_STATUSES, weights=PLACEMENT_STATUS_WEIGHTS, k=count)
+    rows = []
+    for offset, pk in enumerate(range(start, start + count)):
+        student_index = rng.randrange(ctx['student_count'])
+        tutor_index = ctx['student_tutor_indexes'][student_index]
+        provider_index = provider_indexes[offset]
+        status = statuses[offset]
+        city, lat, lng = rng.choice(CITIES)
+        created_at = _spread_datetime(rng, 365)
+        start_date = created_at.date() + timedelta(days=rng.randint(14, 120))
+        approved = status in ('approved_by_tutor', 'completed')
+        rows.append({
+            'id': pk,
+            'student_id': ctx['student_start'] + student_index,
+            'provider_id': ctx['provider_start'] + provider_index,
+            'tutor_id': ctx['tutor_start'] + tutor_index,
+            'company_name': ctx['company_names'][provider_index],
+            'job_title': rng.choice(JOB_TITLES),
+            'job_description': 'Synthetic placement generated for benchmarking.',
+            'start_date': start_date,
+            'end_date': start_date + timedelta(days=rng.choice([90, 180, 365])),
+            'location': city,
+            'latitude': Decimal(f"{lat + rng.uniform(-0.05, 0.05):.8f}"),
+            'longitude': Decimal(f"{lng + rng.uniform(-0.05, 0.05):.8f}"),
+            'status': status,
+            'created_at': created_at,
+            'updated_at': created_at,
+            'provider_approved_at': created_at + timedelta(days=2) if status != 'pending' else None,
+            'tutor_approved_at': created_at + timedelta(days=5) if approved else None,
+            'approved_by_tutor_id': ctx['tutor_user_start'] + tutor_index if approved else None,
+        })
+    return rows
+
+def _message_rows(chunk_index, start, count):
+    rng = _chunk_rng('message', chunk_index)
+    ctx = _context
+    provider_indexes = rng.choices(range(ctx['provider_count']), cum_weights=ctx['provider_weights'], k=count)
+    rows = []
+    for offset in range(count):
+        student_index = rng.randrange(ctx['student_count'])
+        student_user = ctx['student_user_start'] + student_index
+        if rng.random() < 0.6:
+            other_user = ctx['tutor_user_start'] + ctx['student_tutor_indexes'][student_index]
+        else:
+            other_user = ctx['provider_user_start'] + provider_indexes[offset]
+        sender, recipient = (student_user, other_user) if rng.random() < 0.5 else (other_user, student_user)
+        rows.append((sender, recipient, f"Synthetic message {start + offset}",
+                     rng.random() < 0.7, _spread_datetime(rng, 365)))
+    return rows
+
+def _visit_rows(chunk_index, start, count):
+    rng = _chunk_rng('visit', chunk_index)
+    approved = _context['approved_placements']
+    rows = []
+    for _ in range(count):
+        placement_id, tutor_user_id = approved[rng.randrange(len(approved))]
+        visit_date = _context['now'] + timedelta(days=rng.randint(-180, 180), hours=rng.randint(9, 16))
+        rows.append((placement_id, tutor_user_id, visit_date, rng.choice(VISIT_PURPOSES),
+                     visit_date < _context['now'] and rng.random() < 0.9))
+    return rows
+
+def _chunk_specs(start, total, batch_size):
+    specs = []
+    for chunk_index, chunk_start in enumerate(range(start, start + total, batch_size)):
+        specs.append((chunk_index, chunk_start, min(batch_size, start + total - chunk_start)))
+    return specs
+
+@contextmanager
+def _manual_timestamps(*models):
+    """Let generated rows keep their spread-out created_at/updated_at values"""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+def _next_pk(model, using):
+    return (model.objects.using(using).aggregate(max_pk=Max('pk'))['max_pk'] or 0) + 1
+
+class Command(BaseCommand):
+    help = 'Generate a large synthetic dataset with skewed distributions for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000)
+        parser.add_argument('--tutors', type=int, default=50)
+        parser.add_argument('--providers', type=int, default=200)
+        parser.add_argument('--placements', type=int, default=5000)
+        parser.add_argument('--messages', type=int, default=10000)
+        parser.add_argument('--visits', type=int, default=2000)
+        parser.add_argument('--courses', type=int, default=12)
+        parser.add_argument('--departments', type=int, default=8)
+        parser.add_argument('--seed', type=int, default=42, help='Seed for deterministic output')
+        parser.add_argument('--skew', type=float, default=1.1,
+                            help='Zipf exponent for provider and tutor popularity (0 = uniform)')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--password', default='Synthetic#Pass1',
+                            help='Password for every generated user (hashed once)')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.using = options['database']
+        self.batch_size = options['batch_size']
+        started = time.perf_counter()
+
+        if min(options['students'], options['tutors'], options['providers']) < 1:
+            self.stderr.write('At least one student, tutor and provider is required.')
+            return
+
+        with _manual_timestamps(User, PlacementRequest, Message, VisitSchedule):
+            context = self.generate_reference_data()
+            self.generate_people(context)
+            approved = self.generate_placements(context)
+            self.generate_messages(context)
+            self.generate_visits(context, approved)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Synthetic dataset generated in {elapsed:.1f}s'))
+
+    # Helpers
+
+    def run_chunks(self, func, specs, context, *extra):
+        """Yield generated rows chunk by chunk, in order, from the worker pool"""
+        workers = max(1, self.options['workers'])
+        if workers == 1 or len(specs) == 1:
+            _init_worker(context)
+            for spec in specs:
+                yield func(*spec, *extra)
+            return
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(context,)) as pool:
+            yield from pool.map(func, *zip(*specs), *([value] * len(specs) for value in extra))
+
+    def insert(self, label, model, instances_per_chunk):
+        total = 0
+        started = time.perf_counter()
+        for instances in instances_per_chunk:
+            with transaction.atomic(using=self.using):
+                model.objects.using(self.using).bulk_create(instances, batch_size=self.batch_size)
+            total += len(instances)
+        elapsed = time.perf_counter() - started
+        rate = total / elapsed if elapsed else 0
+        self.stdout.write(f'  {label}: {total} rows in {elapsed:.1f}s ({rate:,.0f} rows/s)')
+
+    # Stages
+
+    def generate_reference_data(self):
+        options = self.options
+        self.stdout.write('Preparing reference data...')
+        course_ids = []
+        for index in range(options['courses']):
+            course, _ = Course.objects.using(self.using).get_or_create(
+                code=f'SYN{index:03d}', defaults={'name': f'Synthetic Course {index}'}
+            )
+            course_ids.append(course.id)
+        department_ids = []
+        for index in range(options['departments']):
+            department, _ = Department.objects.using(self.using).get_or_create(
+                code=f'SYND{index:03d}', defaults={'name': f'Synthetic Department {index}'}
+            )
+            department_ids.append(department.id)
+
+        rng = random.Random(f"{options['seed']}:reference")
+        tutor_weights = zipf_cum_weights(options['tutors'], options['skew'])
+        user_start = _next_pk(User, self.using)
+        return {
+            'seed': options['seed'],
+            'now': timezone.now(),
+            'course_ids': course_ids,
+            'department_ids': department_ids,
+            'password_hash': make_password(options['password']),
+            'tutor_count': options['tutors'],
+            'provider_count': options['providers'],
+            'student_count': options['students'],
+            'tutor_weights': tutor_weights,
+            'provider_weights': zipf_cum_weights(options['providers'], options['skew']),
+            'student_tutor_indexes': rng.choices(
+                range(options['tutors']), cum_weights=tutor_weights, k=options['students']
+            ),
+            'tutor_user_start': user_start,
+            'provider_user_start': user_start + options['tutors'],
+            'student_user_start': user_start + options['tutors'] + options['providers'],
+            'tutor_start': _next_pk(TutorProfile, self.using),
+            'provider_start': _next_pk(ProviderProfile, self.using),
+            'student_start': _next_pk(StudentProfile, self.using),
+            'company_names': [f'Synthetic {INDUSTRIES[i % len(INDUSTRIES)]} Ltd {i}' for i in range(options['providers'])],
+        }
+
+    def generate_people(self, context):
+        options = self.options
+        self.stdout.write('Generating users and profiles...')
+        password_hash = context['password_hash']
+
+        def build_users(chunks):
+            for rows in chunks:
+                yield [
+                    User(id=pk, username=username, first_name=first, last_name=last, email=email,
+                         user_type=user_type, password=password_hash, is_active=True, is_verified=True,
+                         date_joined=joined, created_at=joined, updated_at=joined)
+                    for pk, username, first, last, email, user_type, joined in rows
+                ]
+
+        for user_type, start_key, count in (
+            ('tutor', 'tutor_user_start', options['tutors']),
+            ('provider', 'provider_user_start', options['providers']),
+            ('student', 'student_user_start', options['students']),
+        ):
+            specs = _chunk_specs(context[start_key], count, self.batch_size)
+            self.insert(f'{user_type} users', User,
+                        build_users(self.run_chunks(_user_rows, specs, context, user_type)))
+
+        department_ids = context['department_ids']
+        self.insert('tutor profiles', TutorProfile, [[
+            TutorProfile(id=context['tutor_start'] + index, user_id=context['tutor_user_start'] + index,
+                         employee_id=f"EMP{context['tutor_start'] + index:06d}",
+                         department_id=department_ids[index % len(department_ids)],
+                         designation='Lecturer')
+            for index in range(options['tutors'])
+        ]])
+        self.insert('provider profiles', ProviderProfile, [[
+            ProviderProfile(id=context['provider_start'] + index, user_id=context['provider_user_start'] + index,
+                            company_name=context['company_names'][index],
+                            company_address=f'{index} Synthetic Street', contact_person='Synthetic Contact',
+                            industry=INDUSTRIES[index % len(INDUSTRIES)])
+            for index in range(options['providers'])
+        ]])
+
+        def build_students(chunks):
+            for rows in chunks:
+                yield [
+                    StudentProfile(id=pk, user_id=user_id, student_id=student_id, course_id=course_id,
+                                   year=year, cgpa=cgpa, tutor_id=tutor_id)
+                    for pk, user_id, student_id, course_id, year, cgpa, tutor_id in rows
+                ]
+
+        specs = _chunk_specs(context['student_start'], options['students'], self.batch_size)
+        self.insert('student profiles', StudentProfile, build_students(self.run_chunks(_student_rows, specs, context)))
+
+    def generate_placements(self, context):
+        self.stdout.write('Generating placements...')
+        approved = []
+
+        def build(chunks):
+            for rows in chunks:
+                instances = []
+                for row in rows:
+                    if row['approved_by_tutor_id']:
+                        approved.append((row['id'], row['approved_by_tutor_id']))
+                    instances.append(PlacementRequest(**row))
+                yield instances
+
+        specs = _chunk_specs(_next_pk(PlacementRequest, self.using), self.options['placements'], self.batch_size)
+        self.insert('placements', PlacementRequest, build(self.run_chunks(_placement_rows, specs, context)))
+        return approved
+
+    def generate_messages(self, context):
+        self.stdout.write('Generating messages...')
+
+        def build(chunks):
+            for rows in chunks:
+                yield [
+                    Message(sender_id=sender, recipient_id=recipient, subject=subject,
+                            content='Synthetic message body generated for benchmarking.',
+                            is_read=is_read, created_at=created_at)
+                    for sender, recipient, subject, is_read, created_at in rows
+                ]
+
+        specs = _chunk_specs(0, self.options['messages'], self.batch_size)
+        self.insert('messages', Message, build(self.run_chunks(_message_rows, specs, context)))
+
+        started = time.perf_counter()
+        with transaction.atomic(using=self.using):
+            conversations = backfill_conversations(self.batch_size, using=self.using)
+        self.stdout.write(f'  conversations: {conversations} rows in {time.perf_counter() - started:.1f}s')
+
+    def generate_visits(self, context, approved):
+        if not approved or not self.options['visits']:
+            return
+        self.stdout.write('Generating visits...')
+        visit_context = dict(context, approved_placements=approved)
+
+        def build(chunks):
+            for rows in chunks:
+                yield [
+                    VisitSchedule(placement_request_id=placement_id, tutor_id=tutor_id, visit_date=visit_date,
+                                  purpose=purpose, completed=completed, created_at=visit_date - timedelta(days=14))
+                    for placement_id, tutor_id, visit_date, purpose, completed in rows
+                ]
+
+        specs = _chunk_specs(0, self.options['visits'], self.batch_size)
+        self.insert('visits', VisitSchedule, build(self.run_chunks(_visit_rows, specs, visit_context)))
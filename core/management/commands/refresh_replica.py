@@ -0,0 +1,66 @@
+"""
+Refresh the local SQLite read replica from the primary database
+
+The primary is copied with SQLite's online backup API in a single step,
+into a temporary file that then replaces REPLICA_PATH atomically. The
+primary runs in WAL mode, where the copy's read transaction doesn't block
+writers; a stepped backup would instead restart whenever the primary is
+written and might never finish under steady writes. Connections opened afterwards see
+the new snapshot; queries already running finish on the old one. The
+snapshot's mtime is set to the time the copy started, which is what
+core.routers compares a client's last write against.
+
+Example:
+    python manage.py refresh_replica --interval 30
+"""
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database to the read replica snapshot'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Keep refreshing every N seconds instead of once')
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError('refresh_replica copies SQLite files; use the database\'s own replication')
+        replica_path = getattr(settings, 'REPLICA_PATH', None)
+        if not replica_path:
+            raise CommandError('Set REPLICA_PATH (and REPLICA_ENABLED) to use a read replica')
+
+        while True:
+            started = time.monotonic()
+            self.refresh(str(primary.settings_dict['NAME']), str(replica_path))
+            self.stdout.write(self.style.SUCCESS(
+                f"Replica refreshed in {time.monotonic() - started:.2f}s: {replica_path}"
+            ))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def refresh(self, primary_path, replica_path):
+        tmp_path = f'{replica_path}.tmp'
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        # The copy reads one snapshot, taken no earlier than this moment, so
+        # it holds at least everything committed before it
+        started = time.time()
+        source = sqlite3.connect(primary_path)
+        target = sqlite3.connect(tmp_path)
+        try:
+            source.backup(target, pages=-1)
+            # Readers open the replica read-only, which a WAL database does not allow
+            target.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            target.close()
+            source.close()
+        os.utime(tmp_path, (started, started))
+        os.replace(tmp_path, replica_path)
@@ -0,0 +1,146 @@
+"""
+Run background task workers (see core.tasks)
+
+Each worker loop claims one task at a time, runs it and records the
+result, sleeping --poll seconds when nothing is runnable. Loops run as
+threads in this process or, with --pool process, as forked processes.
+Per-queue concurrency limits (TASK_QUEUE_LIMITS, or --limit) hold across
+every worker sharing the database.
+
+SIGINT/SIGTERM stop claiming new tasks; running tasks get --grace seconds
+to finish. A task cut off after that is picked up again when its lease
+expires.
+
+Example:
+    python manage.py run_workers --concurrency 4 --queues email,default --limit email=2
+"""
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+from django.utils.module_loading import autodiscover_modules
+
+from core.metrics import REGISTRY
+from core.tasks import claim_next, run_task
+
+logger = logging.getLogger('core.tasks')
+
+def worker_loop(worker_id, queues, limits, poll, stop):
+    while not stop.is_set():
+        close_old_connections()
+        try:
+            claimed = claim_next(worker_id, queues, limits)
+        except Exception as e:
+            # Typically a locked or unavailable database; back off and retry
+            logger.warning(f"{worker_id} could not claim a task: {str(e)}")
+            stop.wait(poll)
+            continue
+        if claimed is None:
+            stop.wait(poll)
+            continue
+        run_task(claimed, worker_id)
+    connections.close_all()
+
+def _process_main(worker_id, queues, limits, poll):
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    signal.signal(signal.SIGINT, lambda *args: stop.set())
+    worker_loop(worker_id, queues, limits, poll, stop)
+    # Forked children skip atexit handlers; flush what they would have
+    REGISTRY.flush()
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+def parse_limits(values):
+    limits = {}
+    for value in values:
+        queue, _, limit = value.partition('=')
+        if not queue or not limit.isdigit():
+            raise CommandError(f"--limit expects QUEUE=N, got '{value}'")
+        limits[queue] = int(limit)
+    return limits
+
+class Command(BaseCommand):
+    help = 'Run background task workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1, help='Number of worker loops')
+        parser.add_argument('--pool', choices=['thread', 'process'], default='thread')
+        parser.add_argument('--queues', default='', help='Comma-separated queues to serve (default: all)')
+        parser.add_argument('--limit', action='append', default=[], metavar='QUEUE=N',
+                            help='Max tasks of QUEUE running at once across all workers')
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds to sleep when idle')
+        parser.add_argument('--grace', type=float, default=30.0, help='Seconds to let running tasks finish on shutdown')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1')
+        # Register every app's @task functions
+        autodiscover_modules('tasks')
+
+        queues = [queue for queue in options['queues'].split(',') if queue] or None
+        limits = {**getattr(settings, 'TASK_QUEUE_LIMITS', {}), **parse_limits(options['limit'])}
+        prefix = f'{socket.gethostname()}:{os.getpid()}'
+        stop = threading.Event()
+
+        workers = []
+        if options['pool'] == 'process':
+            # Children must not inherit open database connections
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            for n in range(options['concurrency']):
+                worker = context.Process(
+                    target=_process_main, args=(f'{prefix}:{n}', queues, limits, options['poll']),
+                    name=f'task-worker-{n}',
+                )
+                worker.start()
+                workers.append(worker)
+        else:
+            for n in range(options['concurrency']):
+                worker = threading.Thread(
+                    target=worker_loop, args=(f'{prefix}:{n}', queues, limits, options['poll'], stop),
+                    name=f'task-worker-{n}',
+                )
+                worker.start()
+                workers.append(worker)
+
+        def shutdown(signum, frame):
+            if not stop.is_set():
+                self.stdout.write('Shutting down; waiting for running tasks to finish')
+            stop.set()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+        self.stdout.write(self.style.SUCCESS(
+            f"Started {len(workers)} {options['pool']} workers on "
+            f"{', '.join(queues) if queues else 'all queues'}"
+            + (f" with limits {limits}" if limits else '')
+        ))
+
+        while not stop.is_set() and any(worker.is_alive() for worker in workers):
+            stop.wait(0.5)
+
+        if options['pool'] == 'process':
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()  # SIGTERM: finish the current task, then exit
+        deadline = time.monotonic() + options['grace']
+        for worker in workers:
+            worker.join(max(0, deadline - time.monotonic()))
+        unfinished = [worker.name for worker in workers if worker.is_alive()]
+        if unfinished:
+            self.stderr.write(f"Still running after {options['grace']}s, leaving leases to expire: {', '.join(unfinished)}")
+            if options['pool'] == 'process':
+                for worker in workers:
+                    if worker.is_alive():
+                        worker.kill()
+            os._exit(1)
+        self.stdout.write(self.style.SUCCESS('Workers stopped'))
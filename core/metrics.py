@@ -0,0 +1,290 @@
+"""
+In-process metrics registry with Prometheus text exposition
+
+Counters and histograms are aggregated in memory and periodically flushed
+as additive deltas into a shared SQLite spool file, so every worker process
+contributes to the same totals. Gauges are computed from callbacks at
+scrape time.
+
+Usage:
+    from core.metrics import REGISTRY
+    exports = REGISTRY.histogram('export_duration_seconds', 'Export time', ['format'])
+    exports.observe(1.2, format='csv')
+"""
+from pathlib import Path
+import atexit
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+class Metric:
+    metric_type = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _label_values(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+class Counter(Metric):
+    metric_type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        self.registry.add(self.name, f'{self.name}_total', self._label_values(labels), amount)
+
+class Histogram(Metric):
+    metric_type = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        label_values = self._label_values(labels)
+        for bound in self.buckets:
+            if value <= bound:
+                self.registry.add(
+                    self.name, f'{self.name}_bucket', label_values + (('le', _format_value(bound)),), 1
+                )
+        self.registry.add(self.name, f'{self.name}_sum', label_values, value)
+        self.registry.add(self.name, f'{self.name}_count', label_values, 1)
+
+class Gauge(Metric):
+    """
+    Gauge whose samples come from `callback`, called at scrape time.
+    The callback returns an iterable of (labels_dict, value).
+    """
+    metric_type = 'gauge'
+
+    def __init__(self, registry, name, documentation, labelnames=(), callback=None):
+        super().__init__(registry, name, documentation, labelnames)
+        self.callback = callback
+
+    def collect(self):
+        if self.callback is None:
+            return []
+        try:
+            return [(self._label_values(labels), value) for labels, value in self.callback()]
+        except Exception as e:
+            logger.warning(f"Gauge {self.name} collection failed: {str(e)}")
+            return []
+
+class SpoolStore:
+    """Additive sample storage in a SQLite file shared by all worker processes"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(str(self.path), timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS samples ('
+                ' metric TEXT NOT NULL, sample TEXT NOT NULL, labels TEXT NOT NULL,'
+                ' value REAL NOT NULL, PRIMARY KEY (sample, labels))'
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def add_many(self, rows):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT INTO samples (metric, sample, labels, value) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (sample, labels) DO UPDATE SET value = value + excluded.value',
+                rows
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def read(self):
+        return self._connection().execute('SELECT metric, sample, labels, value FROM samples').fetchall()
+
+    def clear(self):
+        self._connection().execute('DELETE FROM samples')
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._store = None
+
+    # Registration
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(self, name, *args, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def gauge(self, name, documentation, labelnames=(), callback=None):
+        return self._register(Gauge, name, documentation, labelnames, callback=callback)
+
+    # Recording
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'METRICS_ENABLED', True)
+
+    @property
+    def store(self):
+        if self._store is None:
+            path = getattr(settings, 'METRICS_SPOOL_PATH', Path(settings.BASE_DIR) / 'metrics.sqlite3')
+            self._store = SpoolStore(path)
+        return self._store
+
+    def add(self, metric, sample, label_values, amount):
+        if not self.enabled:
+            return
+        key = (metric, sample, json.dumps(label_values))
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + amount
+        if time.monotonic() - self._last_flush >= getattr(settings, 'METRICS_FLUSH_INTERVAL', 5):
+            self.flush()
+
+    def flush(self):
+        """Move pending in-memory deltas into the shared spool"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+        try:
+            self.store.add_many([(m, s, labels, value) for (m, s, labels), value in pending.items()])
+        except Exception as e:
+            logger.warning(f"Metrics flush failed, dropping {len(pending)} samples: {str(e)}")
+
+    def reset(self):
+        """Discard all recorded samples (for tests and benchmarks)"""
+        with self._lock:
+            self._pending = {}
+        self.store.clear()
+
+    # Exposition
+
+    def render(self):
+        """Return all metrics in Prometheus text exposition format"""
+        self.flush()
+        samples = {}
+        try:
+            rows = self.store.read()
+        except Exception as e:
+            logger.warning(f"Metrics spool read failed: {str(e)}")
+            rows = []
+        for metric, sample, labels, value in rows:
+            samples.setdefault(metric, []).append((sample, [tuple(pair) for pair in json.loads(labels)], value))
+
+        lines = []
+        for name, metric in sorted(self._metrics.items()):
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.metric_type}')
+            if isinstance(metric, Gauge):
+                for label_values, value in metric.collect():
+                    lines.append(f'{name}{_format_labels(label_values)} {_format_value(value)}')
+                continue
+            for sample, label_values, value in sorted(samples.get(name, []), key=self._sort_key):
+                lines.append(f'{sample}{_format_labels(label_values)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _sort_key(entry):
+        sample, label_values, _ = entry
+        base = [pair for pair in label_values if pair[0] != 'le']
+        bound = next((float(value) for key, value in label_values if key == 'le'), math.inf)
+        suffix_order = {'_bucket': 0, '_sum': 1, '_count': 2}
+        suffix = next((order for suffix, order in suffix_order.items() if sample.endswith(suffix)), 0)
+        return (base, suffix, bound)
+
+REGISTRY = MetricsRegistry()
+atexit.register(REGISTRY.flush)
+
+# Core application metrics
+REQUEST_LATENCY = REGISTRY.histogram(
+    'http_request_duration_seconds',
+    'Request latency by resolved URL name',
+    ['view', 'method', 'status'],
+)
+REQUEST_QUERIES = REGISTRY.histogram(
+    'http_request_db_queries',
+    'SQL queries executed per request by resolved URL name',
+    ['view'],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    'cache_requests',
+    'Cache lookups by cache name and result (hit or miss)',
+    ['cache', 'result'],
+)
+EXPORT_DURATION = REGISTRY.histogram(
+    'export_duration_seconds',
+    'Placement export generation time by format',
+    ['format'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+TASKS_PROCESSED = REGISTRY.counter(
+    'tasks_processed',
+    'Background tasks run by task name and result (succeeded, retried or failed)',
+    ['task', 'result'],
+)
+TASK_DURATION = REGISTRY.histogram(
+    'task_duration_seconds',
+    'Background task run time by task name',
+    ['task'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+
+def _task_queue_depth():
+    from .tasks import queue_depth
+    return queue_depth()
+
+TASK_QUEUE_DEPTH = REGISTRY.gauge(
+    'task_queue_depth',
+    'Background tasks waiting or running, by queue and status',
+    ['queue', 'status'],
+    callback=_task_queue_depth,
+)
@@ -1,20 +1,49 @@
 """
 Custom middleware for error handling and logging
 """
+import json
 import logging
+import random
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from django.http import HttpResponseServerError, HttpResponseNotFound
 from django.shortcuts import render, redirect
 from django.conf import settings
 from django.urls import reverse
 from django.contrib import messages
+from .identity import get_profile, get_request_user
+from .metrics import REQUEST_LATENCY, REQUEST_QUERIES
+from .nplusone import NPlusOneDetector
+from .profiling import profile_call, resolve_request, should_profile
+from .routers import (
+    PRIMARY_ONLY_APPS, REPLICA_DB_ALIAS, STICKY_COOKIE_NAME, pin_primary, replica_available, routing_scope,
+)
+from .instrumentation import (
+    RequestStats, QueryCollector, activate_stats, context_execute_wrapper, deactivate_stats,
+    install_template_timer,
+)
 
 logger = logging.getLogger(__name__)
+metrics_logger = logging.getLogger('core.request_metrics')
+
+class AsyncCapableMiddleware:
+    """
+    Base for middleware that runs natively under both WSGI and ASGI. Django
+    passes an async get_response under ASGI; the instance then counts as a
+    coroutine function, and subclasses hand __call__ over to their
+    __acall__ so a request doesn't switch threads at every layer. A
+    __call__ that only returns self.get_response(request) needs no __acall__.
+    """
+    sync_capable = True
+    async_capable = True
 
-class ErrorHandlingMiddleware:
-    """Custom middleware for handling errors gracefully"""
-    
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+class ErrorHandlingMiddleware(AsyncCapableMiddleware):
+    """Custom middleware for handling errors gracefully"""
 
     def __call__(self, request):
         response = self.get_response(request)
@@ -30,11 +59,77 @@ class ErrorHandlingMiddleware:
         # Return custom error page in production
         return render(request, 'errors/500.html', status=500)
 
-class UserTypeMiddleware:
+class ReplicaReadMiddleware(AsyncCapableMiddleware):
+    """
+    Route reads of safe requests to the read replica (see core.routers) and
+    keep a client on the primary until the replica has caught up with its
+    last write.
+    Views decorated with core.decorators.primary_reads always use the primary.
+    """
+
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+    def _replica_allowed(self, request):
+        if request.method not in self.SAFE_METHODS:
+            return False
+        try:
+            written_at = float(request.COOKIES.get(STICKY_COOKIE_NAME, 0))
+        except ValueError:
+            written_at = 0
+        return replica_available(written_at)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with routing_scope(self._replica_allowed(request)) as wrote:
+            response = self.get_response(request)
+        return self._remember_write(response, wrote)
+
+    async def __acall__(self, request):
+        with routing_scope(self._replica_allowed(request)) as wrote:
+            response = await self.get_response(request)
+        return self._remember_write(response, wrote)
+
+    def _remember_write(self, response, wrote):
+        if wrote - PRIMARY_ONLY_APPS and REPLICA_DB_ALIAS in settings.DATABASES:
+            # Once the cookie expires any snapshot young enough to be used
+            # (REPLICA_MAX_LAG_SECONDS) is newer than this write
+            response.set_cookie(
+                STICKY_COOKIE_NAME, str(time.time()),
+                max_age=getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 300) or None,
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if getattr(view_func, 'primary_reads', False):
+            pin_primary()
+
+class IdentityMiddleware(AsyncCapableMiddleware):
+    """
+    Resolve request.user and request.profile once per request with a single
+    joined query (or from the short-lived identity cache); see core.identity.
+    Must come after AuthenticationMiddleware.
+    """
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self.resolve(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        await sync_to_async(self.resolve)(request)
+        return await self.get_response(request)
+
+    @staticmethod
+    def resolve(request):
+        if hasattr(request, 'session'):
+            request.user = get_request_user(request)
+        request.profile = get_profile(request.user)
+
+class UserTypeMiddleware(AsyncCapableMiddleware):
     """Middleware to handle user type-specific redirects and permissions"""
-    
-    def __init__(self, get_response):
-        self.get_response = get_response
 
     def __call__(self, request):
         # Process request
@@ -59,3 +154,193 @@ class UserTypeMiddleware:
                 return redirect('accounts:login')
         
         return None
+
+
+class RequestMetricsMiddleware(AsyncCapableMiddleware):
+    """
+    Record request latency for every request, and for the
+    REQUEST_METRICS_SAMPLE_RATE share of requests that are sampled also
+    SQL count, DB time, duplicate query shapes, template and view time.
+    Only sampled requests pay the per-query cost; they get a Server-Timing
+    header and a structured log line. Requests slower than
+    REQUEST_METRICS_SLOW_MS are always logged, with their queries when
+    sampled.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.enabled = getattr(settings, 'REQUEST_METRICS_ENABLED', True)
+        self.sample_rate = getattr(settings, 'REQUEST_METRICS_SAMPLE_RATE', 1.0)
+        self.slow_ms = getattr(settings, 'REQUEST_METRICS_SLOW_MS', 500)
+        self.server_timing = getattr(settings, 'REQUEST_METRICS_SERVER_TIMING', settings.DEBUG)
+        if self.enabled:
+            install_template_timer()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        if random.random() >= self.sample_rate:
+            return self.record(request, self.get_response(request), None, start)
+        stats = RequestStats()
+        request.request_stats = stats
+        token = activate_stats(stats)
+        try:
+            with context_execute_wrapper(QueryCollector(stats)):
+                response = self.get_response(request)
+        finally:
+            deactivate_stats(token)
+        return self.record(request, response, stats, start)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        start = time.perf_counter()
+        if random.random() >= self.sample_rate:
+            return self.record(request, await self.get_response(request), None, start)
+        stats = RequestStats()
+        request.request_stats = stats
+        token = activate_stats(stats)
+        try:
+            # Context-bound, so it also counts queries run via sync_to_async()
+            with context_execute_wrapper(QueryCollector(stats)):
+                response = await self.get_response(request)
+        finally:
+            deactivate_stats(token)
+        return self.record(request, response, stats, start)
+
+    def record(self, request, response, stats, start):
+        """Observe the request; `stats` is None for requests that were not sampled"""
+        total_ms = (time.perf_counter() - start) * 1000
+        view_start = getattr(request, '_metrics_view_start', None)
+        view_ms = (time.perf_counter() - view_start) * 1000 if view_start else 0.0
+        is_slow = total_ms >= self.slow_ms
+        sampled = stats is not None
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else 'unresolved'
+        REQUEST_LATENCY.observe(
+            total_ms / 1000, view=view_name, method=request.method, status=response.status_code
+        )
+        if sampled:
+            # A sample of the per-view distribution, not a count of every request
+            REQUEST_QUERIES.observe(stats.query_count, view=view_name)
+
+        if sampled and self.server_timing:
+            response['Server-Timing'] = self.format_server_timing(stats, view_ms, total_ms)
+        if sampled or is_slow:
+            self.log_request(request, response, stats, view_ms, total_ms, is_slow)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_view_start = time.perf_counter()
+        return None
+
+    @staticmethod
+    def format_server_timing(stats, view_ms, total_ms):
+        return ', '.join([
+            f'db;dur={stats.db_time * 1000:.1f};desc="{stats.query_count} queries"',
+            f'tpl;dur={stats.template_time * 1000:.1f}',
+            f'view;dur={view_ms:.1f}',
+            f'total;dur={total_ms:.1f}',
+        ])
+
+    def log_request(self, request, response, stats, view_ms, total_ms, is_slow):
+        match = getattr(request, 'resolver_match', None)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 1),
+            'view_ms': round(view_ms, 1),
+            'sampled': stats is not None,
+        }
+        if stats is None:
+            # Slow but not sampled: only the timings are known
+            record['slow'] = True
+            metrics_logger.warning(json.dumps(record))
+            return
+        duplicates = stats.duplicate_shapes()
+        record.update({
+            'template_ms': round(stats.template_time * 1000, 1),
+            'db_ms': round(stats.db_time * 1000, 1),
+            'queries': stats.query_count,
+            'duplicate_queries': sum(count - 1 for _, count in duplicates),
+        })
+        if is_slow:
+            record['slow'] = True
+            record['duplicate_shapes'] = [{'sql': shape, 'count': count} for shape, count in duplicates[:10]]
+            record['slowest_queries'] = [
+                {'sql': sql, 'ms': round(duration * 1000, 2)}
+                for sql, duration in sorted(stats.queries, key=lambda q: q[1], reverse=True)[:10]
+            ]
+            metrics_logger.warning(json.dumps(record))
+        else:
+            metrics_logger.info(json.dumps(record))
+
+
+class NPlusOneMiddleware(AsyncCapableMiddleware):
+    """
+    Flag repeated query shapes per view. Logs a warning by default;
+    with NPLUSONE_RAISE the request fails so regressions surface in tests.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.enabled = getattr(settings, 'NPLUSONE_ENABLED', settings.DEBUG)
+        self.raise_on_detect = getattr(settings, 'NPLUSONE_RAISE', False)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        with NPlusOneDetector() as detector:
+            response = self.get_response(request)
+        return self.report(request, response, detector)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        with NPlusOneDetector() as detector:
+            response = await self.get_response(request)
+        return self.report(request, response, detector)
+
+    def report(self, request, response, detector):
+        repeated = detector.repeated()
+        if repeated:
+            match = getattr(request, 'resolver_match', None)
+            view_name = match.view_name if match else request.path
+            for entry in repeated:
+                logger.warning(f"Possible N+1 in {view_name}: {entry}")
+            if self.raise_on_detect:
+                detector.check()
+        return response
+
+
+class ProfilingMiddleware(AsyncCapableMiddleware):
+    """
+    Run opted-in staff requests under the profiler (see core.profiling).
+    Keep this last in MIDDLEWARE: the profile covers URL resolution, every
+    process_view, the view exactly as Django runs it (ATOMIC_REQUESTS,
+    process_exception) and deferred rendering. Only WSGI requests to sync
+    views are profiled; anything else runs on threads the profiler can't see.
+    """
+
+    def __call__(self, request):
+        if iscoroutinefunction(self) or not should_profile(request):
+            return self.get_response(request)
+        match = resolve_request(request)
+        if match is not None and iscoroutinefunction(match.func):
+            return self.get_response(request)
+        label = match.view_name if match and match.view_name else request.path
+        response, name = profile_call(label, self.get_response, request)
+        response['X-Profile-Id'] = name
+        return response
@@ -0,0 +1,109 @@
+"""
+N+1 query detection
+
+Counts normalized query shapes within a request or a block of code and
+reports the project stack frame that issued the repeated query.
+
+Usage in tests:
+    with assert_max_repeats(threshold=3):
+        client.get(reverse('providers:placement_list'))
+"""
+from collections import defaultdict
+from contextlib import ExitStack
+from pathlib import Path
+import logging
+import sys
+
+from django.conf import settings
+
+from .instrumentation import context_execute_wrapper, normalize_sql
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 5
+
+_IGNORED_PATH_PARTS = ('site-packages', 'dist-packages')
+_IGNORED_FILES = (__file__,) + tuple(
+    str(Path(__file__).with_name(name)) for name in ('instrumentation.py', 'querycache.py')
+)
+
+class NPlusOneError(AssertionError):
+    """Raised when a query shape repeats more often than the threshold allows"""
+
+def _origin_frame():
+    """Return 'file:line in func' of the innermost project frame, or None"""
+    base_dir = str(settings.BASE_DIR)
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(base_dir)
+                and filename not in _IGNORED_FILES
+                and not any(part in filename for part in _IGNORED_PATH_PARTS)):
+            relative = filename[len(base_dir):].lstrip('/\\')
+            return f"{relative}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+class RepeatedQuery:
+    """A query shape seen more than `threshold` times"""
+
+    def __init__(self, shape, count, origins):
+        self.shape = shape
+        self.count = count
+        self.origins = origins
+
+    def __str__(self):
+        origins = ', '.join(sorted(self.origins)) or 'unknown origin'
+        return f"{self.count}x [{origins}] {self.shape}"
+
+class NPlusOneDetector:
+    """
+    Context manager that records query shapes and their origins on every
+    database connection while active, including queries async code runs
+    through sync_to_async().
+    """
+
+    def __init__(self, threshold=None, raise_on_detect=False):
+        self.threshold = threshold or getattr(settings, 'NPLUSONE_THRESHOLD', DEFAULT_THRESHOLD)
+        self.raise_on_detect = raise_on_detect
+        self.counts = defaultdict(int)
+        self.origins = defaultdict(set)
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        shape = normalize_sql(sql)
+        self.counts[shape] += 1
+        origin = _origin_frame()
+        if origin:
+            self.origins[shape].add(origin)
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        self._stack.enter_context(context_execute_wrapper(self))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stack.close()
+        if exc_type is None and self.raise_on_detect:
+            self.check()
+        return False
+
+    def repeated(self):
+        """Shapes that reached the threshold, most repeated first"""
+        return sorted(
+            (RepeatedQuery(shape, count, self.origins[shape])
+             for shape, count in self.counts.items() if count >= self.threshold),
+            key=lambda r: r.count,
+            reverse=True
+        )
+
+    def check(self):
+        repeated = self.repeated()
+        if repeated:
+            details = '\n'.join(str(r) for r in repeated)
+            raise NPlusOneError(f"Repeated query shapes (threshold {self.threshold}):\n{details}")
+
+def assert_max_repeats(threshold=None):
+    """Test helper: raise NPlusOneError if any query shape repeats `threshold` times"""
+    return NPlusOneDetector(threshold=threshold, raise_on_detect=True)
@@ -0,0 +1,89 @@
+"""
+Paginators for large tables
+"""
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+import logging
+
+logger = logging.getLogger(__name__)
+
+def estimated_row_count(queryset):
+    """
+    Return a cheap row estimate for an unfiltered queryset, or None.
+    Filtered querysets always return None because no estimate can be trusted.
+    """
+    if queryset.query.has_filters() or queryset.query.is_sliced:
+        return None
+
+    table = queryset.model._meta.db_table
+    connection = connections[queryset.db]
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table])
+            elif connection.vendor == 'mysql':
+                cursor.execute(
+                    "SELECT table_rows FROM information_schema.tables "
+                    "WHERE table_schema = DATABASE() AND table_name = %s",
+                    [table]
+                )
+            elif connection.vendor == 'sqlite':
+                # MAX(rowid) is an index lookup; it overestimates only by deleted rows
+                cursor.execute(f'SELECT MAX(rowid) FROM "{table}"')
+            else:
+                return None
+            row = cursor.fetchone()
+    except Exception as e:
+        logger.warning(f"Row estimate failed for {table}: {str(e)}")
+        return None
+
+    if not row or row[0] is None:
+        return None
+    return max(int(row[0]), 0)
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that avoids an exact COUNT(*) on large unfiltered tables.
+    Below `estimate_threshold` rows, and for filtered querysets, the exact
+    count is used. An estimate may include deleted rows; a page that turns
+    out to lie past the real end falls back to the exact count and is
+    clamped to the last page.
+    """
+    estimate_threshold = 10000
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.estimated = False
+        self.overshot = False
+
+    @cached_property
+    def count(self):
+        if hasattr(self.object_list, 'query'):
+            estimate = estimated_row_count(self.object_list)
+            if estimate is not None and estimate >= self.estimate_threshold:
+                self.estimated = True
+                return estimate
+        return super().count
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # After an overshoot the caller still holds the page number it asked
+            # for (the admin's page links do); treat it as the last page
+            if not self.overshot or int(number) < 1:
+                raise
+            return self.num_pages
+
+    def page(self, number):
+        page = super().page(number)
+        # len() evaluates the slice, which the caller then reuses
+        if self.estimated and page.number > 1 and not len(page):
+            logger.info(f"Row estimate {self.count} overshot {self.object_list.model._meta.db_table}; counting")
+            self.__dict__.pop('num_pages', None)
+            self.__dict__['count'] = Paginator.count.func(self)
+            self.estimated = False
+            self.overshot = True
+            page = super().page(self.num_pages)
+        return page
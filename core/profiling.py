@@ -0,0 +1,170 @@
+"""
+On-demand request profiling
+
+Staff users opt a request in with either the `_profile=1` query flag or an
+`X-Profile-Token` header carrying a token from make_profile_token(). Opted-in
+requests are further sampled by PROFILING_SAMPLE_RATE. The request runs under a
+low-overhead stack sampler (collapsed-stack output, usable with flamegraph
+tools) or under cProfile (.prof output), and results are kept in a bounded
+on-disk ring buffer under PROFILING_DIR.
+"""
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+import cProfile
+import logging
+import os
+import random
+import re
+import sys
+import threading
+
+from django.conf import settings
+from django.core import signing
+from django.urls import Resolver404, resolve
+
+logger = logging.getLogger(__name__)
+
+TOKEN_SALT = 'core.profiling'
+PROFILE_FILE_RE = re.compile(r'^[\w.-]+\.(txt|prof)$')
+
+def make_profile_token(view_name=None):
+    """Signed token for the X-Profile-Token header, optionally limited to one view"""
+    return signing.dumps({'view': view_name}, salt=TOKEN_SALT)
+
+def _token_allows(token, view_name):
+    max_age = getattr(settings, 'PROFILING_TOKEN_MAX_AGE', 3600)
+    try:
+        payload = signing.loads(token, salt=TOKEN_SALT, max_age=max_age)
+    except signing.BadSignature:
+        return False
+    return payload.get('view') in (None, view_name)
+
+def resolve_request(request):
+    """The request's ResolverMatch, also before Django has resolved it; None when nothing matches"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        try:
+            match = resolve(request.path_info, getattr(request, 'urlconf', None))
+        except Resolver404:
+            return None
+    return match
+
+def should_profile(request):
+    """Decide whether this request is profiled"""
+    if not getattr(settings, 'PROFILING_ENABLED', False):
+        return False
+    if not (request.user.is_authenticated and request.user.is_staff):
+        return False
+
+    match = resolve_request(request)
+    view_name = match.view_name if match else None
+    token = request.headers.get('X-Profile-Token')
+    requested = request.GET.get('_profile') == '1' or (token and _token_allows(token, view_name))
+    if not requested:
+        return False
+    return random.random() < getattr(settings, 'PROFILING_SAMPLE_RATE', 1.0)
+
+class StackSampler:
+    """
+    Samples the call stack of one thread at a fixed interval from a
+    background thread and aggregates the results as collapsed stacks.
+    """
+
+    def __init__(self, thread_id=None, interval=0.005):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def collapsed(self):
+        return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + '\n'
+
+class ProfileStore:
+    """Bounded on-disk ring buffer of profile files"""
+
+    def __init__(self, directory=None, max_files=None):
+        self.directory = Path(directory or getattr(settings, 'PROFILING_DIR', Path(settings.BASE_DIR) / 'profiles'))
+        self.max_files = max_files or getattr(settings, 'PROFILING_MAX_FILES', 50)
+
+    def save(self, label, extension, write):
+        """Create a new profile file, fill it with `write(path)` and prune old ones"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        safe_label = re.sub(r'[^\w.-]+', '-', label).strip('-') or 'request'
+        name = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{safe_label}.{extension}"
+        write(self.directory / name)
+        self.prune()
+        return name
+
+    def prune(self):
+        files = self.list()
+        for entry in files[self.max_files:]:
+            try:
+                (self.directory / entry['name']).unlink()
+            except FileNotFoundError:
+                pass
+
+    def list(self):
+        """Profile files, newest first"""
+        if not self.directory.exists():
+            return []
+        entries = []
+        for path in self.directory.iterdir():
+            if PROFILE_FILE_RE.match(path.name):
+                stat = path.stat()
+                entries.append({
+                    'name': path.name,
+                    'size': stat.st_size,
+                    'modified': datetime.fromtimestamp(stat.st_mtime),
+                    'format': 'collapsed' if path.suffix == '.txt' else 'cprofile',
+                })
+        return sorted(entries, key=lambda entry: entry['name'], reverse=True)
+
+    def path(self, name):
+        """Resolve a profile file name, refusing anything outside the store"""
+        if not PROFILE_FILE_RE.match(name):
+            return None
+        path = self.directory / name
+        return path if path.is_file() else None
+
+def profile_call(label, func, *args, **kwargs):
+    """Run func under the configured profiler; return (result, profile file name)"""
+    store = ProfileStore()
+    mode = getattr(settings, 'PROFILING_MODE', 'sampler')
+    if mode == 'sampler' and hasattr(sys, '_current_frames'):
+        sampler = StackSampler(interval=getattr(settings, 'PROFILING_INTERVAL', 0.005))
+        try:
+            with sampler:
+                result = func(*args, **kwargs)
+        finally:
+            name = store.save(label, 'txt', lambda path: path.write_text(sampler.collapsed()))
+    else:
+        profiler = cProfile.Profile()
+        try:
+            result = profiler.runcall(func, *args, **kwargs)
+        finally:
+            name = store.save(label, 'prof', lambda path: profiler.dump_stats(str(path)))
+    logger.info(f"Profile captured for {label}: {name}")
+    return result, name
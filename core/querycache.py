@@ -0,0 +1,249 @@
+"""
+Opt-in query-result cache with table-level invalidation
+
+Wrap a queryset in cached_list(), cached_count() or cached_aggregate() to
+cache its result under a key built from the SQL, the parameters and the
+current generation of every table the query reads. Any INSERT, UPDATE or
+DELETE issued through Django bumps the generation of the written table, so
+cached results that read it are never served again. Writes are caught at
+the connection level because QuerySet.update(), bulk_create() and
+QuerySet.delete() do not send post_save/post_delete for every row.
+
+Backends:
+    core.querycache.DjangoCacheBackend results and generations in a Django
+                                       cache alias shared by all processes
+                                       (default: SHARED_CACHE_ALIAS)
+    core.querycache.LocalLRUBackend    bounded in-process LRU; only sees
+                                       writes made by this process, so only
+                                       for single-process runs
+"""
+from collections import OrderedDict
+import hashlib
+import pickle
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.module_loading import import_string
+
+from .metrics import CACHE_REQUESTS
+
+MISS = object()
+
+READ_TABLE_RE = re.compile(r'\b(?:FROM|JOIN)\s+[`"]?(\w+)[`"]?', re.IGNORECASE)
+WRITE_TABLE_RE = re.compile(
+    r'^\s*(?:INSERT\s+(?:OR\s+\w+\s+)?INTO|REPLACE\s+INTO|UPDATE|DELETE\s+FROM)\s+[`"]?(\w+)[`"]?',
+    re.IGNORECASE,
+)
+
+def read_tables(sql):
+    """Tables referenced by a SELECT, including joins and subqueries"""
+    return sorted(set(READ_TABLE_RE.findall(sql)))
+
+class LocalLRUBackend:
+    """
+    Bounded in-process LRU. Values are stored pickled so callers can
+    mutate what they get back without corrupting the cache.
+    """
+
+    def __init__(self, max_entries=1000, **options):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISS
+            expires, payload = entry
+            if expires is not None and expires < time.monotonic():
+                del self._entries[key]
+                return MISS
+            self._entries.move_to_end(key)
+        return pickle.loads(payload)
+
+    def set(self, key, value, timeout):
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        expires = time.monotonic() + timeout if timeout else None
+        with self._lock:
+            self._entries[key] = (expires, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_generations(self, tables):
+        with self._lock:
+            return tuple(self._generations.get(table, 0) for table in tables)
+
+    def bump(self, tables):
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+class DjangoCacheBackend:
+    """
+    Shared backend on a Django cache alias (SHARED_CACHE_ALIAS unless given).
+    Generation counters live in the same cache so a write in any process
+    invalidates results everywhere.
+    """
+
+    def __init__(self, alias=None, key_prefix='qc', **options):
+        from django.core.cache import caches
+
+        self.cache = caches[alias or getattr(settings, 'SHARED_CACHE_ALIAS', 'default')]
+        self.key_prefix = key_prefix
+
+    def _generation_key(self, table):
+        return f'{self.key_prefix}:gen:{table}'
+
+    def get(self, key):
+        return self.cache.get(f'{self.key_prefix}:{key}', MISS)
+
+    def set(self, key, value, timeout):
+        self.cache.set(f'{self.key_prefix}:{key}', value, timeout)
+
+    def get_generations(self, tables):
+        keys = [self._generation_key(table) for table in tables]
+        found = self.cache.get_many(keys)
+        for key in keys:
+            if key not in found:
+                # An evicted counter must not restart at a value an old
+                # entry was stored under, so seed it from the clock
+                self.cache.add(key, time.time_ns(), None)
+                found[key] = self.cache.get(key)
+        return tuple(found[key] for key in keys)
+
+    def bump(self, tables):
+        for table in tables:
+            key = self._generation_key(table)
+            try:
+                self.cache.incr(key)
+            except ValueError:
+                self.cache.add(key, time.time_ns(), None)
+
+    def clear(self):
+        self.cache.clear()
+
+class QueryCache:
+    def __init__(self, backend, timeout=300, name='query'):
+        self.backend = backend
+        self.timeout = timeout
+        self.name = name
+
+    def fetch(self, queryset, evaluate, kind, timeout=None):
+        """Return evaluate(queryset), served from the cache when still valid"""
+        connection = connections[queryset.db]
+        # Results read inside a transaction may be uncommitted or rolled back
+        if connection.in_atomic_block:
+            return evaluate(queryset)
+
+        try:
+            sql, params = queryset.query.get_compiler(using=queryset.db).as_sql()
+        except EmptyResultSet:
+            return evaluate(queryset)
+        tables = read_tables(sql)
+        generations = self.backend.get_generations(tables)
+        raw_key = repr((queryset.db, kind, sql, tuple(params), tables, generations))
+        key = hashlib.sha1(raw_key.encode()).hexdigest()
+
+        value = self.backend.get(key)
+        if value is not MISS:
+            CACHE_REQUESTS.inc(cache=self.name, result='hit')
+            return value
+        CACHE_REQUESTS.inc(cache=self.name, result='miss')
+        value = evaluate(queryset)
+        self.backend.set(key, value, self.timeout if timeout is None else timeout)
+        return value
+
+    def invalidate(self, tables):
+        self.backend.bump(tables)
+
+_query_cache = None
+_query_cache_lock = threading.Lock()
+
+def get_query_cache():
+    global _query_cache
+    if _query_cache is None:
+        with _query_cache_lock:
+            if _query_cache is None:
+                backend_class = import_string(
+                    getattr(settings, 'QUERY_CACHE_BACKEND', 'core.querycache.DjangoCacheBackend')
+                )
+                backend = backend_class(**getattr(settings, 'QUERY_CACHE_OPTIONS', {}))
+                _query_cache = QueryCache(backend, timeout=getattr(settings, 'QUERY_CACHE_TIMEOUT', 300))
+    return _query_cache
+
+def _enabled():
+    return getattr(settings, 'QUERY_CACHE_ENABLED', True)
+
+def cached_list(queryset, timeout=None):
+    """Evaluate a queryset to a list through the query cache"""
+    if not _enabled():
+        return list(queryset)
+    return get_query_cache().fetch(queryset, list, 'list', timeout)
+
+def cached_count(queryset, timeout=None):
+    """queryset.count() through the query cache"""
+    if not _enabled():
+        return queryset.count()
+    return get_query_cache().fetch(queryset, lambda qs: qs.count(), 'count', timeout)
+
+def cached_aggregate(queryset, timeout=None, **aggregates):
+    """queryset.aggregate(**aggregates) through the query cache"""
+    if not _enabled():
+        return queryset.aggregate(**aggregates)
+    kind = 'aggregate:' + repr(sorted((name, str(expression)) for name, expression in aggregates.items()))
+    return get_query_cache().fetch(queryset, lambda qs: qs.aggregate(**aggregates), kind, timeout)
+
+class _PendingInvalidation:
+    """Tables written in the current transaction, bumped again on commit"""
+
+    def __init__(self):
+        self.tables = set()
+
+    def __call__(self):
+        get_query_cache().invalidate(self.tables)
+
+def invalidate_on_write(execute, sql, params, many, context):
+    """Execute wrapper bumping the generation of any table a statement writes"""
+    result = execute(sql, params, many, context)
+    match = WRITE_TABLE_RE.match(sql)
+    if match:
+        table = match.group(1)
+        get_query_cache().invalidate([table])
+        connection = context['connection']
+        if connection.in_atomic_block:
+            # Bump again once the data is visible to other connections, so
+            # results cached between the write and the commit are dropped.
+            # A rollback discards the callback and the next write registers anew.
+            pending = getattr(connection, '_querycache_pending', None)
+            if pending is None or not any(entry[1] is pending for entry in connection.run_on_commit):
+                pending = _PendingInvalidation()
+                connection._querycache_pending = pending
+                connection.on_commit(pending)
+            pending.tables.add(table)
+    return result
+
+def _install_wrapper(sender, connection, **kwargs):
+    # connection_created can fire inside a `with connection.execute_wrapper(...)`
+    # block, which pop()s the last wrapper on exit; inserting at the front
+    # leaves that wrapper last, so the block removes its own wrapper, not ours
+    if invalidate_on_write not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, invalidate_on_write)
+
+def install():
+    """Track writes on every database connection; called from CoreConfig.ready()"""
+    connection_created.connect(_install_wrapper, dispatch_uid='core.querycache')
+    for connection in connections.all(initialized_only=True):
+        _install_wrapper(None, connection)
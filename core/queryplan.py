@@ -0,0 +1,145 @@
+"""
+Query-plan regression checks
+
+CANONICAL_QUERIES mirrors the filters and orderings used by the views and
+API actions. Each one is run through EXPLAIN QUERY PLAN and any step that
+reads a whole table instead of searching an index is reported, so a new
+filter without a matching index shows up before it reaches production
+data volumes. Run with `python manage.py check_query_plans`.
+"""
+from datetime import date, datetime, timezone as dt_timezone
+import re
+
+from django.db import connections
+from django.db.models import Q
+
+# Fixed parameter values; EXPLAIN only needs well-typed placeholders
+USER_ID = 1
+PROFILE_ID = 1
+NOW = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+TODAY = date(2025, 1, 1)
+
+# "SCAN <table>" without an index is a full table scan. "SCAN ... USING
+# [COVERING] INDEX" walks an index in order and is fine for ordered slices.
+FULL_SCAN_RE = re.compile(r'^SCAN (\w+)(?! USING (?:COVERING )?INDEX)')
+
+class CanonicalQuery:
+    def __init__(self, name, source, build, allow_scan=()):
+        self.name = name
+        self.source = source
+        self.build = build
+        # Tables this query is expected to read in full (e.g. unfiltered totals)
+        self.allow_scan = set(allow_scan)
+
+    def queryset(self):
+        return self.build()
+
+def _canonical_queries():
+    from accounts.models import User
+    from placements.models import PlacementRequest, PlacementReport, Message, VisitSchedule
+    from providers.models import PublishOpportunity
+
+    placements = PlacementRequest.objects
+    visits = VisitSchedule.objects
+    messages = Message.objects
+    opportunities = PublishOpportunity.objects
+
+    return [
+        # core.views
+        CanonicalQuery('home.pending_count', 'core.views.home',
+                       lambda: placements.filter(status='pending').values('pk')),
+        CanonicalQuery('home.approved_count', 'core.views.home',
+                       lambda: placements.filter(status__in=['approved_by_provider', 'approved_by_tutor']).values('pk')),
+        CanonicalQuery('home.recent_placements', 'core.views.home',
+                       lambda: placements.select_related('student__user', 'provider__user').order_by('-created_at')[:3],
+                       allow_scan={'placements_placementrequest'}),
+
+        # tutors.views
+        CanonicalQuery('tutor.pending_requests', 'tutors.views.dashboard',
+                       lambda: placements.filter(status='approved_by_provider')
+                       .select_related('student__user', 'provider__user').order_by('-created_at')),
+        CanonicalQuery('tutor.approved_requests', 'tutors.views.dashboard',
+                       lambda: placements.filter(approved_by_tutor_id=USER_ID)
+                       .select_related('student__user', 'provider__user').order_by('-created_at')),
+        CanonicalQuery('tutor.upcoming_visits', 'tutors.views.dashboard',
+                       lambda: visits.filter(tutor_id=USER_ID, completed=False, visit_date__gte=NOW)
+                       .select_related('placement_request__student__user', 'placement_request__provider__user')
+                       .order_by('visit_date')),
+        CanonicalQuery('tutor.recent_completed_visits', 'tutors.views.dashboard',
+                       lambda: visits.filter(tutor_id=USER_ID, completed=True).order_by('-visit_date')[:5]),
+        CanonicalQuery('tutor.calendar_visits', 'tutors.views.calendar_view',
+                       lambda: visits.filter(tutor_id=USER_ID).order_by('visit_date')),
+        CanonicalQuery('tutor.calendar_placements', 'tutors.views.calendar_view',
+                       lambda: placements.filter(status__in=['approved_by_tutor', 'completed'])
+                       .select_related('student__user', 'provider__user')),
+        CanonicalQuery('tutor.student_visits', 'tutors.views.view_student',
+                       lambda: visits.filter(placement_request__student_id=PROFILE_ID, tutor_id=USER_ID)
+                       .order_by('-visit_date')),
+
+        # providers.views
+        CanonicalQuery('provider.pending_requests', 'providers.views.dashboard',
+                       lambda: placements.filter(provider_id=PROFILE_ID, status='pending').order_by('-created_at')[:5]),
+        CanonicalQuery('provider.placement_list', 'providers.views.placement_list',
+                       lambda: placements.filter(provider_id=PROFILE_ID)
+                       .select_related('student__user', 'tutor__user').order_by('-created_at')),
+        CanonicalQuery('provider.opportunities', 'providers.views.dashboard',
+                       lambda: opportunities.filter(provider_id=PROFILE_ID).order_by('-created_at')[:10]),
+
+        # students.views
+        CanonicalQuery('student.placement_requests', 'students.views.dashboard',
+                       lambda: placements.filter(student_id=PROFILE_ID).order_by('-created_at')),
+        CanonicalQuery('student.visits', 'students.views.dashboard',
+                       lambda: visits.filter(placement_request__student_id=PROFILE_ID).order_by('visit_date')),
+        CanonicalQuery('student.opportunities', 'students.views.opportunity_list',
+                       lambda: opportunities.filter(status='approved', application_deadline__gte=TODAY)
+                       .order_by('-created_at')),
+
+        # placements.views / placements.api_views
+        CanonicalQuery('messages.inbox', 'placements.views.message_list',
+                       lambda: messages.filter(recipient_id=USER_ID).order_by('-created_at')),
+        CanonicalQuery('messages.sent', 'placements.views.message_list',
+                       lambda: messages.filter(sender_id=USER_ID).order_by('-created_at')),
+        CanonicalQuery('api.messages.list', 'MessageViewSet.list',
+                       lambda: messages.filter(Q(sender_id=USER_ID) | Q(recipient_id=USER_ID))
+                       .select_related('sender', 'recipient', 'placement_request')),
+        CanonicalQuery('api.messages.unread_count', 'MessageViewSet.unread_count',
+                       lambda: messages.filter(recipient_id=USER_ID, is_read=False).values('pk')),
+        CanonicalQuery('api.placements.tutor', 'PlacementRequestViewSet.list',
+                       lambda: placements.filter(approved_by_tutor_id=USER_ID).order_by('-created_at')),
+        CanonicalQuery('api.placements.provider_statistics', 'PlacementRequestViewSet.statistics',
+                       lambda: placements.filter(provider_id=PROFILE_ID, status='pending').values('pk')),
+        CanonicalQuery('api.visits.upcoming', 'VisitScheduleViewSet.upcoming',
+                       lambda: visits.filter(tutor_id=USER_ID, visit_date__gte=NOW, completed=False)
+                       .order_by('visit_date')),
+        CanonicalQuery('api.reports.tutor', 'PlacementReportViewSet.list',
+                       lambda: PlacementReport.objects.filter(placement_request__approved_by_tutor_id=USER_ID),
+                       allow_scan={'placements_placementreport'}),
+        CanonicalQuery('api.users.tutors', 'UserViewSet.list',
+                       lambda: User.objects.filter(user_type='tutor'),
+                       allow_scan={'accounts_user'}),
+    ]
+
+def explain(queryset, using='default'):
+    """EXPLAIN QUERY PLAN detail lines for a queryset (SQLite only)"""
+    connection = connections[using]
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+def full_scans(plan, allow_scan=()):
+    """Tables read in full by a plan, minus the ones explicitly allowed"""
+    scanned = []
+    for detail in plan:
+        match = FULL_SCAN_RE.match(detail)
+        if match and match.group(1) not in allow_scan:
+            scanned.append(match.group(1))
+    return scanned
+
+def check_query_plans(using='default', queries=None):
+    """Return [(query, plan, scanned tables)] for every canonical query"""
+    results = []
+    for query in queries or _canonical_queries():
+        plan = explain(query.queryset(), using=using)
+        results.append((query, plan, full_scans(plan, query.allow_scan)))
+    return results
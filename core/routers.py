@@ -0,0 +1,107 @@
+"""
+Read-replica routing for read-only requests
+
+core.middleware.ReplicaReadMiddleware marks GET/HEAD/OPTIONS requests (page views and DRF
+list/retrieve actions alike) as safe to read from the 'replica' database
+alias; ReplicaRouter then sends their reads there and everything else to
+'default'. The alias only exists when REPLICA_ENABLED is set, and reads
+fall back to 'default' whenever it is missing or older than
+REPLICA_MAX_LAG_SECONDS.
+
+A request that writes anything (directly or through core.writer) gets a
+cookie with the time of the write, and the same client's reads stay on the
+primary until the replica snapshot is newer than that write, so a user
+never sees a page that is missing their own change.
+
+Locally the replica is a read-only SQLite snapshot of the primary, kept up
+to date by `manage.py refresh_replica --interval N`.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+import os
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_DB_ALIAS = 'replica'
+STICKY_COOKIE_NAME = 'last_write'
+
+# Sessions, accounts and auth bookkeeping must never be read stale
+PRIMARY_ONLY_APPS = {'sessions', 'contenttypes', 'admin', 'auth', 'accounts'}
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_wrote = ContextVar('wrote', default=None)
+
+def replica_available(written_at=0):
+    """
+    Whether the replica may serve reads for a client whose last write was
+    at `written_at` (a timestamp, 0 for none). The snapshot's mtime is the
+    time its copy started (see refresh_replica), so anything committed
+    before it is in the snapshot.
+    """
+    if REPLICA_DB_ALIAS not in settings.DATABASES:
+        return False
+    max_lag = getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 300)
+    path = getattr(settings, 'REPLICA_PATH', None)
+    if not path:
+        # No way to tell how fresh the replica is
+        return not written_at
+    try:
+        snapshot_time = os.stat(path).st_mtime
+    except OSError:
+        return False
+    if max_lag and time.time() - snapshot_time > max_lag:
+        return False
+    return snapshot_time > written_at
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_ONLY_APPS or not _replica_reads.get():
+            return DEFAULT_DB_ALIAS
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        wrote = _wrote.get()
+        if wrote is not None:
+            wrote.add(model._meta.app_label)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+@contextmanager
+def routing_scope(replica_reads):
+    """
+    Let reads in this block use the replica (if replica_reads); yields the
+    set of app labels written inside the block
+    """
+    wrote = set()
+    reads_token = _replica_reads.set(replica_reads)
+    wrote_token = _wrote.set(wrote)
+    try:
+        yield wrote
+    finally:
+        _replica_reads.reset(reads_token)
+        _wrote.reset(wrote_token)
+
+def current_writes():
+    """The set the current routing scope records written app labels in, or None"""
+    return _wrote.get()
+
+@contextmanager
+def recording_writes(wrote):
+    """Record writes made in this block in another scope's set (core.writer's thread)"""
+    token = _wrote.set(wrote)
+    try:
+        yield
+    finally:
+        _wrote.reset(token)
+
+def pin_primary():
+    """Send the rest of the current routing scope's reads to the primary"""
+    _replica_reads.set(False)
@@ -0,0 +1,113 @@
+"""
+Cached-database session engine with lazy write-back
+
+Sessions are read from the SESSION_CACHE_ALIAS cache and only fall back to
+django_session on a miss, like django.contrib.sessions.backends.cached_db.
+Writes differ in two ways:
+
+* a session that was marked modified but ends the request holding the same
+  data (e.g. a key set to the value it already had) is not saved at all;
+* other changes go to the cache immediately but reach the database at most
+  once per SESSION_DB_WRITE_BACK_SECONDS per session. Creating a session
+  and any change to the authentication keys (login, logout, password
+  change) are always written through.
+
+A change still waiting for write-back is lost if the cache entry is
+evicted first, so the session cache must be shared by every process
+(the file-based cache in settings is the single-host stand-in; point it at
+Redis or memcached when running on several hosts).
+
+clear_expired(), and so `manage.py clearsessions`, deletes expired rows in
+chunks of SESSION_CLEANUP_BATCH_SIZE, each in its own short transaction, and
+leaves rows whose expiry may be behind a pending write-back alone.
+"""
+from datetime import timedelta
+import time
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.utils import timezone
+
+KEY_PREFIX = 'core.sessions'
+
+# Changes to these keys are written to the database straight away
+WRITE_THROUGH_KEYS = (SESSION_KEY, BACKEND_SESSION_KEY, HASH_SESSION_KEY)
+
+def _write_back_seconds():
+    return getattr(settings, 'SESSION_DB_WRITE_BACK_SECONDS', 60)
+
+class SessionStore(CachedDBStore):
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._loaded_state = None
+        self._synced_at = 0
+
+    def _state(self, data):
+        return self.serializer().dumps(data)
+
+    def load(self):
+        try:
+            entry = self._cache.get(self.cache_key)
+        except Exception:
+            # Invalid cache key on some backends; reset the session (see cached_db)
+            entry = None
+
+        if entry is not None:
+            data, self._synced_at = entry['data'], entry['synced_at']
+        else:
+            s = self._get_session_from_db()
+            if s:
+                data = self.decode(s.session_data)
+                self._synced_at = time.time()
+                self._cache_set(data, self.get_expiry_age(expiry=s.expire_date))
+            else:
+                data = {}
+        self._loaded_state = self._state(data)
+        return data
+
+    def _cache_set(self, data, timeout):
+        self._cache.set(self.cache_key, {'data': data, 'synced_at': self._synced_at}, timeout)
+
+    def _needs_write_through(self, data):
+        if self._loaded_state is None:
+            return True
+        loaded = self.serializer().loads(self._loaded_state)
+        return any(data.get(key) != loaded.get(key) for key in WRITE_THROUGH_KEYS)
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        data = self._get_session(no_load=must_create)
+        if not must_create and self._state(data) == self._loaded_state:
+            return
+
+        now = time.time()
+        if must_create or self._needs_write_through(data) or now - self._synced_at >= _write_back_seconds():
+            DBStore.save(self, must_create)
+            self._synced_at = now
+        self._cache_set(data, self.get_expiry_age())
+        self._loaded_state = self._state(data)
+
+    @classmethod
+    def clear_expired(cls):
+        model = cls.get_model_class()
+        batch_size = getattr(settings, 'SESSION_CLEANUP_BATCH_SIZE', 500)
+        pause = getattr(settings, 'SESSION_CLEANUP_PAUSE_SECONDS', 0.05)
+        # A row's expire_date can trail the cached session by one write-back interval
+        cutoff = timezone.now() - timedelta(seconds=_write_back_seconds())
+        expired = model.objects.filter(expire_date__lt=cutoff)
+        deleted = 0
+        while True:
+            keys = list(expired.values_list('session_key', flat=True)[:batch_size])
+            if not keys:
+                return deleted
+            # Outside a transaction each DELETE commits on its own
+            deleted += model.objects.filter(session_key__in=keys, expire_date__lt=cutoff).delete()[0]
+            if len(keys) < batch_size:
+                return deleted
+            # Give waiting writers a turn at the lock between chunks
+            time.sleep(pause)
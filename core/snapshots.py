@@ -0,0 +1,96 @@
+"""
+Cached snapshots with background refresh and single-flight rebuilds
+
+A snapshot is an expensive-to-build value (e.g. page statistics) kept in
+the cache past its freshness window. Once it goes stale, the first caller
+to take the rebuild lock refreshes it in a background thread while every
+caller, including that one, keeps getting the stale copy. Only a cold
+cache makes a request wait, and then only one request builds while the
+others poll for its result.
+"""
+import logging
+import threading
+import time
+
+from django.core.cache import caches
+from django.db import connections
+
+from .metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+class Snapshot:
+    def __init__(self, key, build, fresh_for=60, max_age=3600, lock_timeout=30,
+                 wait_timeout=5, background=True, cache_alias='default'):
+        self.key = key
+        self.lock_key = f'{key}:lock'
+        self.build = build
+        self.fresh_for = fresh_for
+        self.max_age = max_age
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.background = background
+        self.cache_alias = cache_alias
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def get(self):
+        """Return the snapshot entry: {'value': ..., 'built_at': timestamp}"""
+        entry = self.cache.get(self.key)
+        if entry is not None:
+            if time.time() - entry['built_at'] < self.fresh_for:
+                CACHE_REQUESTS.inc(cache=self.key, result='hit')
+            else:
+                CACHE_REQUESTS.inc(cache=self.key, result='stale')
+                if self._acquire():
+                    if self.background:
+                        threading.Thread(
+                            target=self._refresh, args=(True,), name=f'snapshot-{self.key}', daemon=True
+                        ).start()
+                    else:
+                        self._refresh()
+            return entry
+
+        CACHE_REQUESTS.inc(cache=self.key, result='miss')
+        if self._acquire():
+            try:
+                return self._rebuild()
+            finally:
+                self._release()
+
+        # Another request is building it; wait for the result rather than piling on
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = self.cache.get(self.key)
+            if entry is not None:
+                return entry
+        logger.warning(f"Timed out waiting for snapshot {self.key}; building it in this request")
+        return self._rebuild()
+
+    def invalidate(self):
+        self.cache.delete(self.key)
+
+    def _acquire(self):
+        return self.cache.add(self.lock_key, 1, self.lock_timeout)
+
+    def _release(self):
+        self.cache.delete(self.lock_key)
+
+    def _rebuild(self):
+        entry = {'value': self.build(), 'built_at': time.time()}
+        self.cache.set(self.key, entry, self.max_age)
+        return entry
+
+    def _refresh(self, in_thread=False):
+        try:
+            self._rebuild()
+        except Exception:
+            logger.exception(f"Background refresh of snapshot {self.key} failed")
+        finally:
+            self._release()
+            if in_thread:
+                # Database connections are per thread; don't leak this one
+                connections.close_all()
@@ -0,0 +1,182 @@
+"""
+Durable background tasks stored in the application database
+
+Register a function with @task and enqueue it with .enqueue(); the row is
+written in the caller's transaction, so a task is only ever visible to
+workers if the change that triggered it was committed. Workers started by
+`manage.py run_workers` claim tasks with a lease: a task whose worker dies
+becomes claimable again once locked_until has passed. Failed tasks are
+retried with exponential backoff up to max_attempts.
+
+Usage:
+    @task(queue='email', max_attempts=5)
+    def send_welcome_email(user_id):
+        ...
+
+    send_welcome_email.enqueue(user.pk, idempotency_key=f'welcome:{user.pk}')
+
+Arguments are stored as JSON, so pass ids rather than model instances.
+"""
+from datetime import timedelta
+import logging
+import time
+import traceback
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .metrics import TASK_DURATION, TASKS_PROCESSED
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+class TaskSpec:
+    def __init__(self, func, name, queue, priority, max_attempts, retry_delay, lease_seconds):
+        self.func = func
+        self.name = name
+        self.queue = queue
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lease_seconds = lease_seconds
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, run_at=None, priority=None, idempotency_key=None, **kwargs):
+        """
+        Queue the task and return its Task row. With an idempotency_key an
+        existing task with the same key is returned instead of a new one.
+        """
+        if getattr(settings, 'TASKS_RUN_EAGERLY', False):
+            # Development without a worker: run right after the commit
+            transaction.on_commit(lambda: self.func(*args, **kwargs))
+            return None
+
+        fields = {
+            'name': self.name,
+            'queue': self.queue,
+            'args': list(args),
+            'kwargs': kwargs,
+            'priority': self.priority if priority is None else priority,
+            'run_at': run_at or timezone.now(),
+            'max_attempts': self.max_attempts,
+        }
+        if idempotency_key is None:
+            return Task.objects.create(**fields)
+        try:
+            with transaction.atomic():
+                return Task.objects.create(idempotency_key=idempotency_key, **fields)
+        except IntegrityError:
+            return Task.objects.get(idempotency_key=idempotency_key)
+
+def task(func=None, *, name=None, queue='default', priority=0, max_attempts=5, retry_delay=30, lease_seconds=300):
+    """Register a function as a background task"""
+    def decorator(func):
+        spec = TaskSpec(
+            func, name or f'{func.__module__}.{func.__name__}', queue, priority,
+            max_attempts, retry_delay, lease_seconds,
+        )
+        _registry[spec.name] = spec
+        return spec
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+def get_task(name):
+    return _registry.get(name)
+
+def claim_next(worker_id, queues=None, limits=None):
+    """
+    Lease the next runnable task for this worker, or return None. Queues at
+    their concurrency limit (counted across every worker) are skipped.
+    """
+    limits = limits or {}
+    now = timezone.now()
+    # BEGIN IMMEDIATE on SQLite serializes claims, so the limit check is exact
+    with transaction.atomic():
+        running = Task.objects.filter(status=Task.RUNNING, locked_until__gt=now)
+        if queues:
+            running = running.filter(queue__in=queues)
+        busy = {
+            row['queue']: row['n']
+            for row in running.values('queue').annotate(n=Count('id'))
+        }
+        full = [queue for queue, limit in limits.items() if busy.get(queue, 0) >= limit]
+
+        runnable = Task.objects.filter(
+            Q(status=Task.QUEUED, run_at__lte=now) | Q(status=Task.RUNNING, locked_until__lte=now)
+        )
+        if queues:
+            runnable = runnable.filter(queue__in=queues)
+        if full:
+            runnable = runnable.exclude(queue__in=full)
+        candidate = runnable.order_by('-priority', 'run_at', 'id').first()
+        if candidate is None:
+            return None
+
+        spec = get_task(candidate.name)
+        lease = timedelta(seconds=spec.lease_seconds if spec else 300)
+        claimed = Task.objects.filter(
+            pk=candidate.pk, status=candidate.status, locked_until=candidate.locked_until,
+        ).update(
+            status=Task.RUNNING, locked_by=worker_id, locked_until=now + lease,
+            attempts=F('attempts') + 1, updated_at=now,
+        )
+        if not claimed:
+            return None
+
+    candidate.status = Task.RUNNING
+    candidate.locked_by = worker_id
+    candidate.locked_until = now + lease
+    candidate.attempts += 1
+    return candidate
+
+def run_task(claimed, worker_id):
+    """Run a claimed task and record the outcome; returns True on success"""
+    spec = get_task(claimed.name)
+    started = time.monotonic()
+    error = None
+    if spec is None:
+        error = f"Unknown task {claimed.name}; is its module imported by the worker?"
+    elif claimed.attempts > claimed.max_attempts:
+        error = f"Lease expired on the last of {claimed.max_attempts} attempts"
+    else:
+        try:
+            spec.func(*claimed.args, **claimed.kwargs)
+        except Exception:
+            error = traceback.format_exc()
+            logger.warning(
+                f"Task {claimed.name} ({claimed.pk}) failed, attempt {claimed.attempts}: {error.strip().splitlines()[-1]}"
+            )
+    duration = time.monotonic() - started
+
+    now = timezone.now()
+    if error is None:
+        result = 'succeeded'
+        changes = {'status': Task.SUCCEEDED, 'finished_at': now, 'last_error': ''}
+    elif spec is not None and claimed.attempts < claimed.max_attempts:
+        result = 'retried'
+        delay = spec.retry_delay * 2 ** (claimed.attempts - 1)
+        changes = {'status': Task.QUEUED, 'run_at': now + timedelta(seconds=delay), 'last_error': error}
+    else:
+        result = 'failed'
+        changes = {'status': Task.FAILED, 'finished_at': now, 'last_error': error}
+        logger.error(f"Task {claimed.name} ({claimed.pk}) gave up after {claimed.attempts} attempts")
+
+    # Only the current lease holder may record the outcome
+    Task.objects.filter(pk=claimed.pk, locked_by=worker_id, status=Task.RUNNING).update(
+        locked_by='', locked_until=None, updated_at=now, **changes
+    )
+    TASKS_PROCESSED.inc(task=claimed.name, result=result)
+    TASK_DURATION.observe(duration, task=claimed.name)
+    return error is None
+
+def queue_depth():
+    """[(labels, count)] of queued and running tasks per queue, for the metrics gauge"""
+    rows = Task.objects.filter(status__in=(Task.QUEUED, Task.RUNNING)).values('queue', 'status').annotate(n=Count('id'))
+    return [({'queue': row['queue'], 'status': row['status']}, row['n']) for row in rows]
@@ -27,4 +27,8 @@ urlpatterns = [
     
     # Messages
     path('messages/', views.messages_view, name='messages'),
+    path('events/', views.event_stream, name='event_stream'),
+
+    # Monitoring
+    path('metrics', views.metrics, name='metrics'),
 ]
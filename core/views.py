@@ -2,46 +2,57 @@ from django.shortcuts import render, redirect
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
 from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, FileResponse, Http404, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db.models import Count, Q
+from django.contrib import admin
 from accounts.models import StudentProfile, TutorProfile, ProviderProfile
-from placements.models import PlacementRequest
+from placements.models import PlacementRequest, Message
+from .decorators import primary_reads
+from .events import format_event, stream
+from .metrics import REGISTRY
+from .snapshots import Snapshot
+from .profiling import ProfileStore
 import logging
 import json
 
 logger = logging.getLogger(__name__)
 
+def build_home_snapshot():
+    """Statistics and recent placements for the home page, as plain data"""
+    placement_stats = PlacementRequest.objects.aggregate(
+        total_placements=Count('id'),
+        pending_placements=Count('id', filter=Q(status='pending')),
+        approved_placements=Count('id', filter=Q(status__in=['approved_by_provider', 'approved_by_tutor'])),
+        completed_placements=Count('id', filter=Q(status='completed')),
+    )
+    recent_placements = list(PlacementRequest.objects.order_by('-created_at').values(
+        'job_title', 'company_name', 'job_description', 'location', 'status'
+    )[:3])
+    return {
+        'stats': placement_stats,
+        'recent_placements': recent_placements,
+        'total_students': StudentProfile.objects.count(),
+        'total_tutors': TutorProfile.objects.count(),
+        'total_providers': ProviderProfile.objects.count(),
+    }
+
+HOME_SNAPSHOT = Snapshot(
+    'core:home_snapshot',
+    build_home_snapshot,
+    fresh_for=getattr(settings, 'HOME_SNAPSHOT_FRESH_SECONDS', 60),
+    max_age=getattr(settings, 'HOME_SNAPSHOT_MAX_AGE', 3600),
+)
+
 def home(request):
     """Home page with dynamic statistics from database"""
     try:
-        # Get statistics from database
-        total_students = StudentProfile.objects.count()
-        total_tutors = TutorProfile.objects.count()
-        total_providers = ProviderProfile.objects.count()
-        total_placements = PlacementRequest.objects.count()
-        
-        # Get recent placements for homepage
-        recent_placements = PlacementRequest.objects.select_related(
-            'student__user', 'provider__user'
-        ).order_by('-created_at')[:3]
-        
-        # Get placement statistics
-        pending_placements = PlacementRequest.objects.filter(status='pending').count()
-        approved_placements = PlacementRequest.objects.filter(
-            status__in=['approved_by_provider', 'approved_by_tutor']
-        ).count()
-        completed_placements = PlacementRequest.objects.filter(status='completed').count()
-        
-        context = {
-            'stats': {
-                'total_placements': total_placements,
-                'pending_placements': pending_placements,
-                'approved_placements': approved_placements,
-                'completed_placements': completed_placements,
-            },
-            'recent_placements': recent_placements,
-            'total_students': total_students,
-            'total_providers': total_providers,
-            'total_tutors': total_tutors,
-        }
+        # Served from a cached snapshot; stale copies are refreshed in the background
+        snapshot = HOME_SNAPSHOT.get()
+        context = dict(snapshot['value'])
+        context['snapshot_version'] = int(snapshot['built_at'])
+        context['fragment_timeout'] = getattr(settings, 'HOME_FRAGMENT_CACHE_SECONDS', 300)
         return render(request, 'index.html', context)
         
     except Exception as e:
@@ -58,6 +69,7 @@ def home(request):
             'total_students': 0,
             'total_providers': 0,
             'total_tutors': 0,
+            'fragment_timeout': 0,  # Never cache the fallback fragments
         }
         return render(request, 'index.html', context)
 
@@ -170,8 +182,9 @@ def map_view(request):
         
         context = {
             'placements': placements,
-            'locations': json.dumps(locations_list),
-            'total_placements': placements.count(),
+            'locations': locations_list,
+            'locations_json': json.dumps(locations_list),
+            'total_placements': sum(len(location['placements']) for location in locations_list),
             'total_locations': len(locations),
             'google_maps_api_key': settings.GOOGLE_MAPS_API_KEY,
         }
@@ -181,7 +194,8 @@ def map_view(request):
         logger.error(f"Error in map view: {str(e)}")
         context = {
             'placements': [],
-            'locations': json.dumps([]),
+            'locations': [],
+            'locations_json': json.dumps([]),
             'total_placements': 0,
             'total_locations': 0,
             'google_maps_api_key': settings.GOOGLE_MAPS_API_KEY,
@@ -195,3 +209,60 @@ def map_test(request):
         'google_maps_api_key': settings.GOOGLE_MAPS_API_KEY,
     }
     return render(request, 'core/map_test.html', context)
+
+
+def metrics(request):
+    """Prometheus scrape endpoint, restricted to METRICS_ALLOWED_IPS"""
+    allowed_ips = getattr(settings, 'METRICS_ALLOWED_IPS', None)
+    if allowed_ips and request.META.get('REMOTE_ADDR') not in allowed_ips:
+        return HttpResponseForbidden("Metrics are not available from this address")
+    return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# Events that change the unread count; the stream re-sends it after each
+UNREAD_EVENTS = ('message', 'message_updated', 'message_deleted', 'messages_read')
+
+@primary_reads
+async def event_stream(request):
+    """Server-Sent Events for the signed-in user (see core.events)"""
+    # request.user was resolved by IdentityMiddleware, so this does no I/O
+    user = request.user
+    if not user.is_authenticated:
+        return HttpResponse(status=204)  # EventSource stops reconnecting on 204
+
+    async def snapshot():
+        unread = await Message.objects.filter(recipient_id=user.pk, is_read=False).acount()
+        return [('unread_count', {'unread_count': unread})]
+
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker can't be held open; send the current state and have
+        # the browser check back much later
+        body = 'retry: 60000\n\n' + ''.join(format_event(*event) for event in await snapshot())
+        return HttpResponse(body, content_type='text/event-stream')
+
+    response = StreamingHttpResponse(
+        stream(user.pk, snapshot, refresh_types=UNREAD_EVENTS), content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Don't let nginx buffer the stream
+    return response
+
+
+@staff_member_required
+def profile_list(request):
+    """Admin page listing recent request profiles"""
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Request profiles',
+        'profiles': ProfileStore().list(),
+        'profiling_enabled': getattr(settings, 'PROFILING_ENABLED', False),
+    }
+    return render(request, 'admin/profiles.html', context)
+
+@staff_member_required
+def profile_download(request, name):
+    """Download a single profile file"""
+    path = ProfileStore().path(name)
+    if path is None:
+        raise Http404("Profile not found")
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=name)
@@ -0,0 +1,109 @@
+"""
+Optional single-writer queue for high-contention write paths
+
+SQLite lets one connection write at a time, so request threads that all
+try to write queue up on the file lock, each paying for its own BEGIN and
+COMMIT. With WRITE_QUEUE_ENABLED, run_write() hands the write to one
+dedicated thread per process instead. That thread drains whatever has been
+queued (up to WRITE_QUEUE_MAX_BATCH writes), runs the batch in a single
+transaction with a savepoint per write, and commits once. Callers block
+until their write is committed and get its return value or exception, so
+the calling code reads exactly as if it had written directly.
+
+Writes made while the caller is already inside transaction.atomic() run
+inline: the caller's connection may hold the write lock the queue would
+wait for.
+"""
+from concurrent.futures import Future
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from .decorators import retry_on_locked
+from .routers import current_writes, recording_writes
+
+logger = logging.getLogger(__name__)
+
+class WriteQueue:
+    def __init__(self, using=DEFAULT_DB_ALIAS, max_batch=50):
+        self.using = using
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs):
+        """Run func(*args, **kwargs) on the writer thread and return its result"""
+        if threading.current_thread() is self._thread or connections[self.using].in_atomic_block:
+            return func(*args, **kwargs)
+        self._ensure_thread()
+        future = Future()
+        # The writer thread records what it writes in the caller's routing
+        # scope, so ReplicaReadMiddleware still keeps this client on the primary
+        self._queue.put((future, func, args, kwargs, current_writes()))
+        return future.result()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name=f'db-writer-{self.using}', daemon=True)
+                    self._thread.start()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            connections[self.using].close_if_unusable_or_obsolete()
+            try:
+                outcomes = self._write_batch(batch)
+            except Exception as e:
+                logger.exception(f"Write batch of {len(batch)} failed")
+                for future, *_ in batch:
+                    future.set_exception(e)
+                continue
+            for (future, *_), (ok, value) in zip(batch, outcomes):
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    @retry_on_locked
+    def _write_batch(self, batch):
+        outcomes = []
+        with transaction.atomic(using=self.using):
+            for future, func, args, kwargs, wrote in batch:
+                try:
+                    # One failing write must not take the rest of the batch with it
+                    with transaction.atomic(using=self.using), recording_writes(wrote):
+                        outcomes.append((True, func(*args, **kwargs)))
+                except Exception as e:
+                    outcomes.append((False, e))
+        return outcomes
+
+_write_queues = {}
+_write_queues_lock = threading.Lock()
+
+def get_write_queue(using=DEFAULT_DB_ALIAS):
+    if using not in _write_queues:
+        with _write_queues_lock:
+            if using not in _write_queues:
+                _write_queues[using] = WriteQueue(using, getattr(settings, 'WRITE_QUEUE_MAX_BATCH', 50))
+    return _write_queues[using]
+
+def run_write(func, *args, using=DEFAULT_DB_ALIAS, **kwargs):
+    """func(*args, **kwargs) through the single-writer queue when it is enabled"""
+    if not getattr(settings, 'WRITE_QUEUE_ENABLED', False):
+        return func(*args, **kwargs)
+    return get_write_queue(using).submit(func, *args, **kwargs)
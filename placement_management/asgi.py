@@ -0,0 +1,22 @@
+"""
+ASGI config for placement_management project.
+
+Serves the live event stream (core.views.event_stream) and the async API
+endpoints (placements.async_views) without tying up a worker per waiting
+request, e.g.:
+
+    uvicorn placement_management.asgi:application
+
+The default EVENTS_BROKER (core.events.LocalBroker) only delivers events to
+streams in the process that published them. Set EVENTS_BROKER to
+'core.events.SpoolBroker' before running several processes, e.g. with
+--workers 4 or next to a separate WSGI server for the rest of the site.
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'placement_management.settings')
+
+application = get_asgi_application()
@@ -34,15 +34,20 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaReadMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.IdentityMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'core.middleware.UserTypeMiddleware', 
+    'core.middleware.NPlusOneMiddleware',
+    'core.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'placement_management.urls'
@@ -69,11 +74,37 @@ WSGI_APPLICATION = 'placement_management.wsgi.application'
 # Database - Using SQLite for development 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # django.db.backends.sqlite3 plus pragmas, BEGIN IMMEDIATE and lock retries
+        'ENGINE': 'core.db_backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'pragmas': {
+                'journal_mode': 'WAL',  # Readers don't block the writer and vice versa
+                'synchronous': 'NORMAL',  # Safe with WAL; fsync only at checkpoints
+                'mmap_size': 256 * 1024 * 1024,
+                'cache_size': -32000,  # In KiB (32 MB) per connection
+                'busy_timeout': 5000,  # Milliseconds to wait for a lock before failing
+            },
+            'transaction_mode': 'IMMEDIATE',
+            'lock_retries': 5,
+        },
     }
 }
 
+# Read replica (core.routers): reads of GET/HEAD/OPTIONS requests go to the
+# 'replica' alias, a read-only snapshot kept fresh by `manage.py refresh_replica`
+REPLICA_ENABLED = False
+REPLICA_PATH = BASE_DIR / 'db.replica.sqlite3'
+REPLICA_MAX_LAG_SECONDS = 300  # Older snapshots are ignored; a client's reads stay on the primary until the snapshot is newer than its last write
+if REPLICA_ENABLED:
+    DATABASES['replica'] = {
+        'ENGINE': 'core.db_backends.sqlite3',
+        'NAME': f'file:{REPLICA_PATH}?mode=ro',
+        'OPTIONS': {'pragmas': {'mmap_size': 256 * 1024 * 1024, 'cache_size': -32000}},
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
 # Custom User Model
 AUTH_USER_MODEL = 'accounts.User'
 
@@ -96,9 +127,120 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Request instrumentation (core.middleware.RequestMetricsMiddleware)
+REQUEST_METRICS_ENABLED = True
+REQUEST_METRICS_SAMPLE_RATE = 1.0 if DEBUG else 0.05  # Fraction of requests whose queries are collected; they emit headers/log lines
+REQUEST_METRICS_SLOW_MS = 500  # Requests slower than this are always logged (with their queries when sampled)
+REQUEST_METRICS_SERVER_TIMING = DEBUG  # Expose Server-Timing headers to clients
+
+# N+1 query detection (core.middleware.NPlusOneMiddleware, core.nplusone)
+NPLUSONE_ENABLED = DEBUG
+NPLUSONE_THRESHOLD = 5  # Repeats of one query shape before it is reported
+NPLUSONE_RAISE = False  # Fail the request instead of logging; enable in test settings
+
+# Prometheus metrics (core.metrics), exposed at /metrics
+METRICS_ENABLED = True
+METRICS_SPOOL_PATH = BASE_DIR / 'metrics.sqlite3'  # Shared by all worker processes
+METRICS_FLUSH_INTERVAL = 5  # Seconds between flushes of in-process samples to the spool
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# On-demand profiling for staff (core.profiling); browse at /admin/profiles/
+PROFILING_ENABLED = True
+PROFILING_SAMPLE_RATE = 1.0  # Fraction of opted-in requests actually profiled
+PROFILING_MODE = 'sampler'  # 'sampler' (collapsed stacks) or 'cprofile' (.prof files)
+PROFILING_INTERVAL = 0.005  # Seconds between stack samples
+PROFILING_DIR = BASE_DIR / 'profiles'
+PROFILING_MAX_FILES = 50  # Oldest profiles are deleted beyond this
+
+# Cache backends; point 'default' at Redis/Memcached to share it between processes
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'placement-management',
+    },
+    # Sessions must be visible to every process; the file cache is the
+    # single-host stand-in for a shared Redis/memcached cache
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache' / 'sessions',
+        'TIMEOUT': 3600,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    # Values every process must agree on: invalidation versions and
+    # generations (accounts.lookups, core.identity, core.querycache),
+    # dropdown choices and query-cache results
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache' / 'shared',
+        'TIMEOUT': 3600,
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+SHARED_CACHE_ALIAS = 'shared'
+
+# Query-result cache (core.querycache), invalidated per table on every write
+QUERY_CACHE_ENABLED = True
+# Results and table generations go to SHARED_CACHE_ALIAS so a write in any
+# process invalidates every process's results. LocalLRUBackend ({'max_entries':
+# 1000}) only sees this process's writes; use it for single-process runs only.
+QUERY_CACHE_BACKEND = 'core.querycache.DjangoCacheBackend'
+QUERY_CACHE_OPTIONS = {}  # DjangoCacheBackend takes {'alias': ...}, default SHARED_CACHE_ALIAS
+QUERY_CACHE_TIMEOUT = 300  # Seconds; writes invalidate sooner
+
+# Dropdown choices for profile/lookup selects (accounts.choices), invalidated on save
+CHOICES_CACHE_TIMEOUT = 3600
+
+# In-process Course/Department lookups (accounts.lookups)
+LOOKUP_CACHE_CHECK_INTERVAL = 5  # Seconds between checks of the shared version key
+
+# Request identity (core.identity): user + role profile cached per session
+IDENTITY_CACHE_TIMEOUT = 30  # Seconds; saving the user or profile invalidates sooner
+
+# Home page snapshot (core.views.HOME_SNAPSHOT) and its template fragments
+HOME_SNAPSHOT_FRESH_SECONDS = 60  # Older snapshots are rebuilt in the background
+HOME_SNAPSHOT_MAX_AGE = 3600  # Stale snapshots are served at most this long
+HOME_FRAGMENT_CACHE_SECONDS = 300  # Fragments are also keyed by the snapshot version
+
+# Single-writer queue (core.writer) for message creation; batches concurrent
+# writes into one transaction on a dedicated thread per process
+WRITE_QUEUE_ENABLED = False
+WRITE_QUEUE_MAX_BATCH = 50
+
+# Background tasks (core.tasks), run by `manage.py run_workers`
+TASKS_RUN_EAGERLY = False  # Run tasks in-process after commit instead of queueing (no worker needed)
+TASK_QUEUE_LIMITS = {'email': 2, 'notifications': 1}  # Max running tasks per queue across all workers
+
+# Notification emails (placements.notifications): notifications for the same
+# recipient are coalesced into one email per window
+NOTIFICATION_COALESCE_SECONDS = 60  # Window for users on immediate delivery
+NOTIFICATION_DIGEST_HOUR = 8  # Local hour daily digests go out
+NOTIFICATION_BATCH_SIZE = 200  # Recipients loaded and rendered per query
+NOTIFICATION_MAX_ATTEMPTS = 5  # Failed sends before a recipient's notifications are given up on
+NOTIFICATION_RETRY_SECONDS = 300  # Delay before the first retry; doubles after each failure
+
+# Live events (core.events) pushed to browsers over /events/ (Server-Sent Events).
+# Streams need the ASGI entry point (placement_management.asgi); under WSGI the
+# endpoint returns the current state once and the browser checks back later.
+EVENTS_ENABLED = True
+EVENTS_BROKER = 'core.events.LocalBroker'  # 'core.events.SpoolBroker' when more than one process publishes or serves streams
+EVENTS_BROKER_OPTIONS = {}  # SpoolBroker takes {'path': ..., 'poll_interval': 0.5, 'retention': 60}
+EVENTS_HEARTBEAT_SECONDS = 20  # Keep-alive comment on idle streams
+EVENTS_STREAM_MAX_SECONDS = 300  # Streams are recycled; the browser reconnects on its own
+EVENTS_QUEUE_SIZE = 100  # Undelivered events per stream before the client is told to resync
+EVENTS_RETRY_MS = 3000  # Browser reconnect delay
+
+# Async views (placements.async_views): independent reads run in parallel on
+# a per-process thread pool (core.asyncdb.concurrently)
+ASYNC_QUERY_THREADS = 16
+
 # Session settings
+SESSION_ENGINE = 'core.sessions'  # Cached reads, database writes only on change (core.sessions)
+SESSION_CACHE_ALIAS = 'sessions'
 SESSION_COOKIE_AGE = 3600  # 1 hour
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
+SESSION_DB_WRITE_BACK_SECONDS = 60  # Non-auth changes reach django_session at most this often
+SESSION_CLEANUP_BATCH_SIZE = 500  # Rows per DELETE in clearsessions
+SESSION_CLEANUP_PAUSE_SECONDS = 0.05
 
 # Messages framework
 from django.contrib.messages import constants as messages
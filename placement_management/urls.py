@@ -5,8 +5,11 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from core import views as core_views
 
 urlpatterns = [
+    path('admin/profiles/', core_views.profile_list, name='admin_profiles'),
+    path('admin/profiles/<str:name>', core_views.profile_download, name='admin_profile_download'),
     path('admin/', admin.site.urls),
     path('accounts/', include('accounts.urls')),
     path('students/', include('students.urls')),
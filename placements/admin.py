@@ -1,14 +1,26 @@
-from django.contrib import admin
-from .models import PlacementRequest, PlacementReport, Message, VisitSchedule
+from django.contrib import admin, messages
+from django.db import transaction
+from django.utils import timezone
+from core.paginators import EstimatedCountPaginator
+from .models import (
+    PlacementRequest, PlacementReport, Message, VisitSchedule, NotificationPreference, QueuedNotification,
+    Conversation, ConversationParticipant,
+)
 
 @admin.register(PlacementRequest)
 class PlacementRequestAdmin(admin.ModelAdmin):
     list_display = ('student', 'tutor', 'company_name', 'job_title', 'status', 'start_date', 'end_date', 'created_at')
     list_filter = ('status', 'start_date', 'end_date', 'created_at')
+    list_select_related = ('student__user', 'tutor__user', 'tutor__department')
     search_fields = ('student__user__first_name', 'student__user__last_name', 'company_name', 'job_title')
     ordering = ('-created_at',)
     readonly_fields = ('created_at', 'updated_at', 'provider_approved_at', 'tutor_approved_at')
-    
+    autocomplete_fields = ('student', 'provider', 'tutor')
+    raw_id_fields = ('approved_by_tutor',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['approve_selected', 'reject_selected', 'mark_completed']
+
     fieldsets = (
         ('Basic Information', {
             'fields': ('student', 'provider', 'tutor', 'company_name', 'job_title', 'job_description')
@@ -28,26 +40,121 @@ class PlacementRequestAdmin(admin.ModelAdmin):
         }),
     )
 
+    @admin.action(description='Approve selected placement requests')
+    def approve_selected(self, request, queryset):
+        """Approve requests already approved by the provider"""
+        now = timezone.now()
+        with transaction.atomic():
+            placements = self._lock_for_save(queryset.filter(status='approved_by_provider'))
+            for placement in placements:
+                placement.status = 'approved_by_tutor'
+                placement.tutor_approved_at = now
+                if request.user.user_type == 'tutor':
+                    placement.approved_by_tutor = request.user
+                placement.save()
+        self.message_user(request, f'{len(placements)} placement requests approved.', messages.SUCCESS)
+
+    @admin.action(description='Reject selected placement requests')
+    def reject_selected(self, request, queryset):
+        """Reject requests that are still awaiting a decision"""
+        with transaction.atomic():
+            placements = self._lock_for_save(queryset.filter(status__in=['pending', 'approved_by_provider']))
+            for placement in placements:
+                placement.status = 'rejected'
+                placement.save()
+        self.message_user(request, f'{len(placements)} placement requests rejected.', messages.SUCCESS)
+
+    @admin.action(description='Mark selected placements as completed')
+    def mark_completed(self, request, queryset):
+        """Complete tutor-approved placements"""
+        with transaction.atomic():
+            placements = self._lock_for_save(queryset.filter(status='approved_by_tutor'))
+            for placement in placements:
+                placement.status = 'completed'
+                placement.save()
+        self.message_user(request, f'{len(placements)} placements marked as completed.', messages.SUCCESS)
+
+    @staticmethod
+    def _lock_for_save(queryset):
+        """
+        Rows to save one by one (so post_save queues the notifications and
+        publishes the events), locked until the surrounding atomic() block
+        ends so a concurrent change is not overwritten. The parties post_save
+        notifies are joined in up front. On SQLite the IMMEDIATE transaction
+        mode already holds the write lock from the start of the block.
+        """
+        return list(queryset.select_for_update(of=('self',)).select_related('student', 'provider', 'tutor'))
+
 @admin.register(PlacementReport)
 class PlacementReportAdmin(admin.ModelAdmin):
     list_display = ('placement_request', 'submitted_at', 'report_file')
     list_filter = ('submitted_at',)
+    list_select_related = ('placement_request__student__user',)
     search_fields = ('placement_request__student__user__first_name', 'placement_request__student__user__last_name')
     ordering = ('-submitted_at',)
     readonly_fields = ('submitted_at',)
+    raw_id_fields = ('placement_request',)
 
 @admin.register(Message)
 class MessageAdmin(admin.ModelAdmin):
     list_display = ('sender', 'recipient', 'subject', 'is_read', 'created_at')
     list_filter = ('is_read', 'created_at', 'sender__user_type', 'recipient__user_type')
+    list_select_related = ('sender', 'recipient')
     search_fields = ('sender__username', 'recipient__username', 'subject', 'content')
     ordering = ('-created_at',)
     readonly_fields = ('created_at',)
+    autocomplete_fields = ('sender', 'recipient')
+    raw_id_fields = ('placement_request', 'conversation')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+class ConversationParticipantInline(admin.TabularInline):
+    model = ConversationParticipant
+    extra = 0
+    raw_id_fields = ('user',)
+    readonly_fields = ('unread_count', 'last_message_at')
+
+@admin.register(Conversation)
+class ConversationAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'placement_request', 'last_sender', 'last_message_at')
+    list_select_related = ('placement_request__student__user', 'last_sender')
+    search_fields = ('subject', 'participants__username')
+    ordering = ('-last_message_at',)
+    readonly_fields = ('key', 'last_message', 'last_message_at', 'last_message_preview', 'last_sender', 'created_at')
+    raw_id_fields = ('placement_request',)
+    inlines = [ConversationParticipantInline]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 @admin.register(VisitSchedule)
 class VisitScheduleAdmin(admin.ModelAdmin):
     list_display = ('placement_request', 'tutor', 'visit_date', 'purpose', 'completed')
     list_filter = ('completed', 'visit_date', 'tutor__user_type')
+    list_select_related = ('placement_request__student__user', 'tutor')
     search_fields = ('placement_request__company_name', 'tutor__username', 'purpose')
     ordering = ('visit_date',)
     readonly_fields = ('created_at',)
+    autocomplete_fields = ('tutor',)
+    raw_id_fields = ('placement_request',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+@admin.register(NotificationPreference)
+class NotificationPreferenceAdmin(admin.ModelAdmin):
+    list_display = ('user', 'frequency', 'updated_at')
+    list_filter = ('frequency',)
+    list_select_related = ('user',)
+    search_fields = ('user__username', 'user__email')
+    autocomplete_fields = ('user',)
+
+@admin.register(QueuedNotification)
+class QueuedNotificationAdmin(admin.ModelAdmin):
+    list_display = ('recipient', 'kind', 'created_at', 'sent_at', 'attempts', 'failed_at')
+    list_filter = ('kind', 'sent_at', 'failed_at')
+    list_select_related = ('recipient',)
+    search_fields = ('recipient__username', 'recipient__email')
+    ordering = ('-created_at',)
+    readonly_fields = ('created_at', 'sent_at', 'attempts', 'failed_at')
+    raw_id_fields = ('recipient', 'placement_request', 'report')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
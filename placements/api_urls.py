@@ -3,7 +3,7 @@ API URL configuration for placement_management system
 """
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import api_views
+from . import api_views, async_views
 
 # Create a router and register our viewsets with it
 router = DefaultRouter()
@@ -11,10 +11,19 @@ router.register(r'placements', api_views.PlacementRequestViewSet, basename='plac
 router.register(r'visits', api_views.VisitScheduleViewSet, basename='visit')
 router.register(r'reports', api_views.PlacementReportViewSet, basename='report')
 router.register(r'messages', api_views.MessageViewSet, basename='message')
+router.register(r'conversations', api_views.ConversationViewSet, basename='conversation')
 router.register(r'users', api_views.UserViewSet, basename='user')
 
 # The API URLs are now determined automatically by the router
 urlpatterns = [
+    # Async counterparts of the busiest read endpoints (placements.async_views)
+    path('async/messages/inbox/', async_views.inbox, name='async-message-inbox'),
+    path('async/messages/sent/', async_views.sent, name='async-message-sent'),
+    path('async/messages/unread_count/', async_views.unread_count, name='async-message-unread-count'),
+    path('async/messages/mark_all_read/', async_views.mark_all_read, name='async-message-mark-all-read'),
+    path('async/messages/<int:pk>/mark_read/', async_views.mark_read, name='async-message-mark-read'),
+    path('async/dashboard/', async_views.dashboard, name='async-dashboard'),
+    path('notification-preferences/', api_views.NotificationPreferenceView.as_view(), name='notification-preferences'),
     path('', include(router.urls)),
 ]
 
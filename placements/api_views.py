@@ -1,20 +1,41 @@
-from rest_framework import viewsets, status, filters
+from rest_framework import generics, viewsets, status, filters
 from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Q, Count
 from django.utils import timezone
 
-from .models import PlacementRequest, VisitSchedule, PlacementReport, Message
+from .models import PlacementRequest, VisitSchedule, PlacementReport, Message, NotificationPreference
 from accounts.models import User
+from accounts.lookups import COURSES, DEPARTMENTS
 from .serializers import (
     PlacementRequestSerializer, VisitScheduleSerializer, PlacementReportSerializer,
     PlacementRequestListSerializer, VisitScheduleListSerializer,
-    MessageSerializer, MessageCreateSerializer, MessageListSerializer
+    MessageSerializer, MessageCreateSerializer, MessageListSerializer,
+    BroadcastSerializer, MessageBatchSerializer, ConversationSerializer, NotificationPreferenceSerializer,
 )
 from core.decorators import handle_exceptions
+from core.identity import get_profile
+from core.writer import run_write
+from . import messaging
 
-class PlacementRequestViewSet(viewsets.ModelViewSet):
+class ProfileMixin:
+    """
+    The role profile of the user DRF authenticated. IdentityMiddleware's
+    request.profile is resolved from the session before DRF authentication
+    runs, so it is None for Basic-auth requests; this resolves it from
+    DRF's request.user instead (no query when that is the session's user).
+    """
+
+    def get_profile(self):
+        request = self.request
+        if getattr(request, '_profile_user', None) is not request.user:
+            request._profile_user = request.user
+            request._profile = get_profile(request.user)
+        return request._profile
+
+class PlacementRequestViewSet(ProfileMixin, viewsets.ModelViewSet):
     """
     API endpoint for placement requests
     """
@@ -27,13 +48,22 @@ class PlacementRequestViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         
-        # Different access based on user type
-        if hasattr(user, 'tutorprofile'):
-            return PlacementRequest.objects.filter(approved_by_tutor=user)
-        elif hasattr(user, 'studentprofile'):
-            return PlacementRequest.objects.filter(student=user.studentprofile)
-        elif hasattr(user, 'providerprofile'):
-            return PlacementRequest.objects.filter(provider=user.providerprofile)
+        queryset = PlacementRequest.objects.select_related('student__user', 'provider')
+        if self.action != 'list':
+            queryset = queryset.select_related(
+                'provider__user', 'tutor__user', 'approved_by_tutor'
+            )
+        
+        # Different access based on user type; the profile is resolved once per request
+        profile = self.get_profile()
+        if profile is None:
+            return PlacementRequest.objects.none()
+        if user.user_type == 'tutor':
+            return queryset.filter(approved_by_tutor=user)
+        elif user.user_type == 'student':
+            return queryset.filter(student=profile)
+        elif user.user_type == 'provider':
+            return queryset.filter(provider=profile)
         else:
             return PlacementRequest.objects.none()
     
@@ -48,7 +78,7 @@ class PlacementRequestViewSet(viewsets.ModelViewSet):
         placement = self.get_object()
         user = request.user
         
-        if not hasattr(user, 'tutorprofile'):
+        if user.user_type != 'tutor' or self.get_profile() is None:
             return Response(
                 {'error': 'Only tutors can approve placements'}, 
                 status=status.HTTP_403_FORBIDDEN
@@ -67,7 +97,7 @@ class PlacementRequestViewSet(viewsets.ModelViewSet):
         placement = self.get_object()
         user = request.user
         
-        if not hasattr(user, 'tutorprofile'):
+        if user.user_type != 'tutor' or self.get_profile() is None:
             return Response(
                 {'error': 'Only tutors can reject placements'}, 
                 status=status.HTTP_403_FORBIDDEN
@@ -96,7 +126,7 @@ class PlacementRequestViewSet(viewsets.ModelViewSet):
         
         return Response(stats)
 
-class VisitScheduleViewSet(viewsets.ModelViewSet):
+class VisitScheduleViewSet(ProfileMixin, viewsets.ModelViewSet):
     """
     API endpoint for visit schedules
     """
@@ -110,10 +140,13 @@ class VisitScheduleViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         
-        if hasattr(user, 'tutorprofile'):
-            return VisitSchedule.objects.filter(tutor=user)
-        elif hasattr(user, 'studentprofile'):
-            return VisitSchedule.objects.filter(placement_request__student=user.studentprofile)
+        queryset = VisitSchedule.objects.select_related('placement_request__student__user')
+        
+        profile = self.get_profile()
+        if profile is not None and user.user_type == 'tutor':
+            return queryset.filter(tutor=user)
+        elif profile is not None and user.user_type == 'student':
+            return queryset.filter(placement_request__student=profile)
         else:
             return VisitSchedule.objects.none()
     
@@ -169,7 +202,7 @@ class VisitScheduleViewSet(viewsets.ModelViewSet):
         
         return Response(calendar_events)
 
-class PlacementReportViewSet(viewsets.ModelViewSet):
+class PlacementReportViewSet(ProfileMixin, viewsets.ModelViewSet):
     """
     API endpoint for placement reports
     """
@@ -183,14 +216,15 @@ class PlacementReportViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         
-        if hasattr(user, 'tutorprofile'):
+        profile = self.get_profile()
+        if profile is not None and user.user_type == 'tutor':
             return PlacementReport.objects.filter(placement_request__approved_by_tutor=user)
-        elif hasattr(user, 'studentprofile'):
-            return PlacementReport.objects.filter(placement_request__student=user.studentprofile)
+        elif profile is not None and user.user_type == 'student':
+            return PlacementReport.objects.filter(placement_request__student=profile)
         else:
             return PlacementReport.objects.none()
 
-class MessageViewSet(viewsets.ModelViewSet):
+class MessageViewSet(ProfileMixin, viewsets.ModelViewSet):
     """
     API endpoint for messages/communication
     """
@@ -205,12 +239,12 @@ class MessageViewSet(viewsets.ModelViewSet):
         # Users can see messages they sent or received
         return Message.objects.filter(
             Q(sender=user) | Q(recipient=user)
-        )
+        ).select_related('sender', 'recipient', 'placement_request')
     
     def get_serializer_class(self):
         if self.action == 'create':
             return MessageCreateSerializer
-        elif self.action in ['list', 'inbox', 'sent']:
+        elif self.action in ['list', 'inbox', 'sent', 'archived']:
             return MessageListSerializer
         return MessageSerializer
     
@@ -221,7 +255,7 @@ class MessageViewSet(viewsets.ModelViewSet):
             serializer.is_valid(raise_exception=True)
             
             # Set the sender to the current user
-            message = serializer.save(sender=request.user)
+            message = run_write(serializer.save, sender=request.user)
             
             # Return the created message with full details
             response_serializer = MessageSerializer(message)
@@ -237,26 +271,73 @@ class MessageViewSet(viewsets.ModelViewSet):
     def mark_read(self, request, pk=None):
         """Mark a message as read"""
         message = self.get_object()
-        if message.recipient == request.user:
-            message.is_read = True
-            message.save()
+        if message.recipient_id == request.user.pk:
+            messaging.mark_read(message)
             return Response({'message': 'Message marked as read'})
         return Response(
             {'error': 'You can only mark messages you received as read'}, 
             status=status.HTTP_403_FORBIDDEN
         )
     
+    @action(detail=False, methods=['post'])
+    def broadcast(self, request):
+        """Send one message to a tutor's assigned students or to a placement cohort"""
+        if request.user.user_type not in ('tutor', 'provider') or self.get_profile() is None:
+            return Response(
+                {'error': 'Only tutors and providers can send broadcasts'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        serializer = BroadcastSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        recipient_ids = messaging.broadcast_audience(
+            request.user, self.get_profile(), data['audience'], data.get('statuses'), data.get('start_date'),
+        )
+        sent = run_write(messaging.broadcast, request.user, recipient_ids, data['subject'], data['content'])
+        return Response({'message': f'Message sent to {sent} recipients', 'recipients': sent})
+    
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Mark read, archive, unarchive or delete many messages at once.
+        Body: {"action": ..., "ids": [...]} or {"action": ..., "up_to": id},
+        optionally limited to one conversation with "conversation": id.
+        """
+        serializer = MessageBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        updated = run_write(
+            messaging.apply_batch, request.user, data['action'],
+            ids=data.get('ids'), up_to=data.get('up_to'), conversation_id=data.get('conversation'),
+        )
+        unread = Message.objects.filter(recipient=request.user, is_read=False).count()
+        return Response({'updated': updated, 'unread_count': unread})
+    
     @action(detail=False, methods=['get'])
     def inbox(self, request):
         """Get received messages (inbox)"""
-        queryset = self.get_queryset().filter(recipient=request.user).order_by('-created_at')
+        queryset = self.get_queryset().filter(
+            recipient=request.user, archived_by_recipient=False
+        ).order_by('-created_at')
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def sent(self, request):
         """Get sent messages"""
-        queryset = self.get_queryset().filter(sender=request.user).order_by('-created_at')
+        queryset = self.get_queryset().filter(
+            sender=request.user, archived_by_sender=False
+        ).order_by('-created_at')
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def archived(self, request):
+        """Get messages the user archived, sent or received"""
+        queryset = self.get_queryset().filter(
+            Q(recipient=request.user, archived_by_recipient=True) |
+            Q(sender=request.user, archived_by_sender=True)
+        ).order_by('-created_at')
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
     
@@ -272,17 +353,14 @@ class MessageViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
         """Mark all received messages as read"""
-        Message.objects.filter(
-            recipient=request.user, 
-            is_read=False
-        ).update(is_read=True)
+        messaging.mark_all_read(request.user)
         return Response({'message': 'All messages marked as read'})
     
     def destroy(self, request, *args, **kwargs):
         """Delete a message - only sender can delete"""
         message = self.get_object()
         if message.sender == request.user:
-            message.delete()
+            messaging.delete_message(message)
             return Response({'message': 'Message deleted successfully'})
         return Response(
             {'error': 'You can only delete messages you sent'},
@@ -290,6 +368,40 @@ class MessageViewSet(viewsets.ModelViewSet):
         )
 
 
+class ConversationPagination(CursorPagination):
+    page_size = 20
+    ordering = ('-last_message_at', '-id')
+
+class ConversationMessagePagination(CursorPagination):
+    page_size = 50
+    ordering = ('-created_at', '-id')
+
+class ConversationViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint for the signed-in user's conversations, latest activity first.
+    Pages walk participant_inbox_idx with a cursor rather than an OFFSET.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = ConversationSerializer
+    pagination_class = ConversationPagination
+    filter_backends = []
+    lookup_field = 'conversation_id'
+
+    def get_queryset(self):
+        return messaging.inbox(self.request.user)
+
+    @action(detail=True, methods=['get'])
+    def messages(self, request, conversation_id=None):
+        """Messages of a conversation, newest first"""
+        membership = self.get_object()
+        queryset = Message.objects.filter(conversation_id=membership.conversation_id).select_related(
+            'sender', 'recipient', 'placement_request'
+        )
+        paginator = ConversationMessagePagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = MessageListSerializer(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
+
 class UserViewSet(viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for users (for recipient selection)
@@ -308,7 +420,8 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
     
     def list(self, request, *args, **kwargs):
         """Custom list method to return user data with profile information"""
-        queryset = self.get_queryset()
+        # Profiles in one join; course and department names from the lookup cache
+        queryset = self.get_queryset().select_related('tutorprofile', 'providerprofile', 'studentprofile')
         
         # Get users with their profile information
         users_data = []
@@ -330,7 +443,7 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
                 user_data['tutorprofile'] = {
                     'id': user.tutorprofile.id,
                     'employee_id': user.tutorprofile.employee_id,
-                    'department': user.tutorprofile.department.name if user.tutorprofile.department else None,
+                    'department': DEPARTMENTS.name(user.tutorprofile.department_id),
                     'designation': user.tutorprofile.designation,
                 }
             elif hasattr(user, 'providerprofile'):
@@ -343,7 +456,7 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
                 user_data['studentprofile'] = {
                     'id': user.studentprofile.id,
                     'student_id': user.studentprofile.student_id,
-                    'course': user.studentprofile.course.name if user.studentprofile.course else None,
+                    'course': COURSES.name(user.studentprofile.course_id),
                     'year': user.studentprofile.year,
                 }
             
@@ -353,3 +466,16 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
             'results': users_data,
             'count': len(users_data)
         })
+
+
+class NotificationPreferenceView(generics.RetrieveUpdateAPIView):
+    """
+    API endpoint for the current user's notification email frequency
+    (immediate, hourly or daily digest)
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = NotificationPreferenceSerializer
+    
+    def get_object(self):
+        preference, _ = NotificationPreference.objects.get_or_create(user=self.request.user)
+        return preference
@@ -0,0 +1,135 @@
+"""
+Async JSON endpoints for the busiest read paths: message lists, unread
+counts and dashboard statistics
+
+DRF has no async views, so these are plain Django views returning the same
+payloads as the MessageViewSet actions they stand in for. Under the ASGI
+entry point (placement_management.asgi) a request waiting on the database
+doesn't hold a worker, and the dashboard runs its independent aggregate
+queries concurrently (core.asyncdb). Under WSGI they work as ordinary views.
+"""
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Q
+from django.http import JsonResponse
+from django.utils import timezone
+
+from core.asyncdb import concurrently
+from core.decorators import async_api_view, primary_reads
+from providers.models import PublishOpportunity
+from . import messaging
+from .models import Message, PlacementRequest, VisitSchedule
+from .serializers import MessageListSerializer
+
+# Messages
+
+async def _message_list(request, **filters):
+    queryset = Message.objects.filter(**filters).select_related(
+        'sender', 'recipient', 'placement_request'
+    ).order_by('-created_at')
+    messages = [message async for message in queryset]
+    # Everything the serializer reads was loaded above, so this does no I/O
+    data = MessageListSerializer(messages, many=True, context={'request': request}).data
+    return JsonResponse(data, safe=False)
+
+@async_api_view(['GET'])
+async def inbox(request):
+    """Received messages, newest first"""
+    return await _message_list(request, recipient=request.user, archived_by_recipient=False)
+
+@async_api_view(['GET'])
+async def sent(request):
+    """Sent messages, newest first"""
+    return await _message_list(request, sender=request.user, archived_by_sender=False)
+
+@primary_reads
+@async_api_view(['GET'])
+async def unread_count(request):
+    """Count of unread received messages"""
+    count = await Message.objects.filter(recipient=request.user, is_read=False).acount()
+    return JsonResponse({'unread_count': count})
+
+@async_api_view(['POST'])
+async def mark_read(request, pk):
+    """Mark a received message as read"""
+    message = await Message.objects.filter(pk=pk).filter(
+        Q(sender=request.user) | Q(recipient=request.user)
+    ).afirst()
+    if message is None:
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+    if message.recipient_id != request.user.pk:
+        return JsonResponse({'error': 'You can only mark messages you received as read'}, status=403)
+    await sync_to_async(messaging.mark_read)(message)
+    return JsonResponse({'message': 'Message marked as read'})
+
+@async_api_view(['POST'])
+async def mark_all_read(request):
+    """Mark all received messages as read"""
+    await sync_to_async(messaging.mark_all_read)(request.user)
+    return JsonResponse({'message': 'All messages marked as read'})
+
+# Dashboards
+
+def _unread(user):
+    return lambda: Message.objects.filter(recipient=user, is_read=False).count()
+
+async def _student_stats(user, profile):
+    now = timezone.now()
+    placements, visits, unread = await concurrently(
+        lambda: PlacementRequest.objects.filter(student=profile).aggregate(
+            total=Count('id'),
+            pending=Count('id', filter=Q(status='pending')),
+            approved=Count('id', filter=Q(status__in=['approved_by_provider', 'approved_by_tutor'])),
+            completed=Count('id', filter=Q(status='completed')),
+        ),
+        lambda: VisitSchedule.objects.filter(placement_request__student=profile).aggregate(
+            total_visits=Count('id'),
+            upcoming_visits=Count('id', filter=Q(visit_date__gte=now)),
+            completed_visits=Count('id', filter=Q(completed=True)),
+        ),
+        _unread(user),
+    )
+    return {'stats': placements, 'visit_stats': visits, 'unread_count': unread}
+
+async def _tutor_stats(user, profile):
+    now = timezone.now()
+    pending, approved, visits, unread = await concurrently(
+        PlacementRequest.objects.filter(status='approved_by_provider').count,
+        lambda: PlacementRequest.objects.filter(approved_by_tutor=user).aggregate(
+            approved=Count('id'),
+            monthly_approvals=Count('id', filter=Q(tutor_approved_at__month=now.month)),
+        ),
+        lambda: VisitSchedule.objects.filter(tutor=user).aggregate(
+            visits=Count('id', filter=Q(completed=False, visit_date__gte=now)),
+            completed_visits=Count('id', filter=Q(completed=True)),
+        ),
+        _unread(user),
+    )
+    return {'stats': {'pending': pending, **approved, **visits}, 'unread_count': unread}
+
+async def _provider_stats(user, profile):
+    opportunities, pending_requests, unread = await concurrently(
+        lambda: PublishOpportunity.objects.filter(provider=profile).aggregate(
+            total=Count('id'),
+            pending=Count('id', filter=Q(status='pending')),
+            approved=Count('id', filter=Q(status='approved')),
+            rejected=Count('id', filter=Q(status='rejected')),
+        ),
+        PlacementRequest.objects.filter(provider=profile, status='pending').count,
+        _unread(user),
+    )
+    return {'stats': opportunities, 'pending_requests': pending_requests, 'unread_count': unread}
+
+DASHBOARD_STATS = {
+    'student': _student_stats,
+    'tutor': _tutor_stats,
+    'provider': _provider_stats,
+}
+
+@async_api_view(['GET'])
+async def dashboard(request):
+    """The statistics shown on the signed-in user's role dashboard"""
+    stats = DASHBOARD_STATS.get(request.user.user_type)
+    # request.profile was loaded by IdentityMiddleware
+    if stats is None or request.profile is None:
+        return JsonResponse({'detail': 'No dashboard for this account.'}, status=404)
+    return JsonResponse({'role': request.user.user_type, **await stats(request.user, request.profile)})
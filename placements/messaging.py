@@ -0,0 +1,332 @@
+"""
+Conversations: messages grouped into threads with denormalized inbox data
+
+Two users writing to each other about the same placement (or about no
+placement) share one direct Conversation, found by its key. The
+conversation carries the preview, time and sender of its latest message.
+Each ConversationParticipant row carries that user's unread count and a copy
+of last_message_at. That makes the inbox one scan of participant_inbox_idx
+rather than a GROUP BY over every message the user has sent or received.
+
+Messages should be created and changed through this module so the
+denormalized fields stay in step. send() updates them in the same
+transaction as the insert. Anything that changes many messages at once
+calls refresh_conversations(), which recounts from the messages themselves.
+
+broadcast() sends one message to many users (a tutor's assigned students,
+a placement cohort) with a fixed number of queries per batch of recipients.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    Case, CharField, Count, F, OuterRef, PositiveIntegerField, Q, Subquery, Value, When,
+)
+from django.db.models.functions import Cast, Coalesce, Concat, Greatest, Least, Substr
+
+from accounts.models import StudentProfile
+from core.events import publish
+from .models import Conversation, ConversationParticipant, Message, PlacementRequest
+
+PREVIEW_LENGTH = 140
+
+def direct_key(user_a_id, user_b_id, placement_request_id=None):
+    low, high = sorted((user_a_id, user_b_id))
+    return f'{low}:{high}:{placement_request_id or 0}'
+
+def direct_key_expression(ref=F):
+    """direct_key() in SQL for Message rows; pass ref=OuterRef inside a subquery"""
+    return Concat(
+        Cast(Least(ref('sender_id'), ref('recipient_id')), CharField()), Value(':'),
+        Cast(Greatest(ref('sender_id'), ref('recipient_id')), CharField()), Value(':'),
+        Cast(Coalesce(ref('placement_request_id'), Value(0)), CharField()),
+        output_field=CharField(),
+    )
+
+def get_direct_conversation(user_a_id, user_b_id, placement_request_id=None, subject=''):
+    """The conversation between two users about a placement, created on first use"""
+    key = direct_key(user_a_id, user_b_id, placement_request_id)
+    conversation = Conversation.objects.filter(key=key).first()
+    if conversation is not None:
+        return conversation
+    try:
+        with transaction.atomic():
+            conversation = Conversation.objects.create(
+                key=key, subject=subject, placement_request_id=placement_request_id,
+            )
+            ConversationParticipant.objects.bulk_create([
+                ConversationParticipant(conversation=conversation, user_id=user_id)
+                for user_id in {user_a_id, user_b_id}
+            ])
+    except IntegrityError:
+        # Another request created it first
+        conversation = Conversation.objects.get(key=key)
+    return conversation
+
+def get_direct_conversations(user_id, other_ids, placement_request_id=None, subject=''):
+    """{other user id: conversation id} for the direct conversations of a user with several others"""
+    keys = {direct_key(user_id, other_id, placement_request_id): other_id for other_id in other_ids}
+    conversations = dict(Conversation.objects.filter(key__in=keys).values_list('key', 'pk'))
+    missing = [key for key in keys if key not in conversations]
+    if missing:
+        Conversation.objects.bulk_create(
+            [Conversation(key=key, subject=subject, placement_request_id=placement_request_id) for key in missing],
+            ignore_conflicts=True,
+        )
+        created = dict(Conversation.objects.filter(key__in=missing).values_list('key', 'pk'))
+        ConversationParticipant.objects.bulk_create([
+            ConversationParticipant(conversation_id=conversation_id, user_id=member_id)
+            for key, conversation_id in created.items()
+            for member_id in {user_id, keys[key]}
+        ], ignore_conflicts=True)
+        conversations.update(created)
+    return {keys[key]: conversation_id for key, conversation_id in conversations.items()}
+
+def record_message(message):
+    """Denormalize a newly created message onto its conversation and participants"""
+    created_at = message.created_at
+    newer = Q(last_message_at__isnull=True) | Q(last_message_at__lte=created_at)
+    Conversation.objects.filter(newer, pk=message.conversation_id).update(
+        last_message=message, last_message_at=created_at,
+        last_message_preview=message.content[:PREVIEW_LENGTH], last_sender_id=message.sender_id,
+    )
+    ConversationParticipant.objects.filter(conversation_id=message.conversation_id).update(
+        last_message_at=Case(When(newer, then=Value(created_at)), default=F('last_message_at')),
+        unread_count=Case(
+            When(user_id=message.recipient_id, then=F('unread_count') + 1), default=F('unread_count'),
+            output_field=PositiveIntegerField(),
+        ),
+    )
+
+def send(sender, recipient, subject, content, placement_request=None):
+    """Create a message in the direct conversation of its sender and recipient"""
+    placement_request_id = placement_request.pk if placement_request else None
+    with transaction.atomic():
+        conversation = get_direct_conversation(sender.pk, recipient.pk, placement_request_id, subject)
+        message = Message.objects.create(
+            sender=sender, recipient=recipient, subject=subject, content=content,
+            placement_request=placement_request, conversation=conversation,
+        )
+        record_message(message)
+    return message
+
+def broadcast_audience(user, profile, audience, statuses=None, start_date=None):
+    """
+    User ids for a broadcast from a tutor or provider, in one query:
+
+        assigned_students   students whose StudentProfile.tutor is this tutor
+        cohort              students with a placement supervised by this tutor
+                            (or hosted by this provider) in one of `statuses`,
+                            optionally starting on `start_date`
+    """
+    if audience == 'assigned_students':
+        if user.user_type != 'tutor':
+            return []
+        return list(StudentProfile.objects.filter(tutor=profile).values_list('user_id', flat=True))
+
+    placements = PlacementRequest.objects.filter(status__in=statuses or ['approved_by_tutor'])
+    if user.user_type == 'tutor':
+        placements = placements.filter(tutor=profile)
+    elif user.user_type == 'provider':
+        placements = placements.filter(provider=profile)
+    else:
+        return []
+    if start_date:
+        placements = placements.filter(start_date=start_date)
+    return list(placements.order_by().values_list('student__user_id', flat=True).distinct())
+
+def broadcast(sender, recipient_ids, subject, content, batch_size=500):
+    """
+    Send the same message to every recipient, each in their direct
+    conversation with the sender; returns the number of messages created.
+    Per batch of recipients this costs a few queries for the conversations,
+    one bulk INSERT and one set-based refresh, whatever the batch size.
+    """
+    from .tasks import queue_broadcast_notifications
+
+    recipient_ids = sorted({pk for pk in recipient_ids if pk != sender.pk})
+    message_ids = []
+    with transaction.atomic():
+        for start in range(0, len(recipient_ids), batch_size):
+            batch = recipient_ids[start:start + batch_size]
+            conversations = get_direct_conversations(sender.pk, batch, subject=subject)
+            messages = Message.objects.bulk_create([
+                Message(
+                    sender=sender, recipient_id=recipient_id, subject=subject, content=content,
+                    conversation_id=conversations[recipient_id],
+                )
+                for recipient_id in batch
+            ])
+            refresh_conversations(list(conversations.values()))
+            message_ids.extend(message.pk for message in messages)
+        if message_ids:
+            # bulk_create sends no post_save: one event for every recipient's streams, one task for the emails
+            publish(recipient_ids, 'message', {'subject': subject, 'sender_id': sender.pk, 'broadcast': True})
+            queue_broadcast_notifications.enqueue(message_ids)
+    return len(message_ids)
+
+def mark_read(message):
+    """Mark one received message read; returns False if it already was"""
+    if message.is_read:
+        return False
+    with transaction.atomic():
+        message.is_read = True
+        message.save(update_fields=['is_read'])
+        ConversationParticipant.objects.filter(
+            conversation_id=message.conversation_id, user_id=message.recipient_id, unread_count__gt=0,
+        ).update(unread_count=F('unread_count') - 1)
+    return True
+
+def mark_all_read(user):
+    """Mark everything the user received as read; returns the number of messages changed"""
+    with transaction.atomic():
+        updated = Message.objects.filter(recipient=user, is_read=False).update(is_read=True)
+        ConversationParticipant.objects.filter(user=user, unread_count__gt=0).update(unread_count=0)
+        if updated:
+            # update() sends no post_save; tell the user's streams directly
+            publish([user.pk], 'messages_read', {'count': updated})
+    return updated
+
+BATCH_ACTIONS = ('read', 'archive', 'unarchive', 'delete')
+
+def batch_scope(user, ids=None, up_to=None, conversation_id=None):
+    """The user's messages picked by a list of ids or by an up-to-id watermark"""
+    messages = Message.objects.filter(Q(sender=user) | Q(recipient=user))
+    if ids is not None:
+        messages = messages.filter(pk__in=ids)
+    else:
+        messages = messages.filter(pk__lte=up_to)
+    if conversation_id is not None:
+        messages = messages.filter(conversation_id=conversation_id)
+    return messages.order_by()
+
+def _conversation_ids(messages):
+    return [pk for pk in messages.values_list('conversation_id', flat=True).distinct() if pk is not None]
+
+def apply_batch(user, action, ids=None, up_to=None, conversation_id=None):
+    """
+    Apply one of BATCH_ACTIONS to a batch_scope() of messages with a single
+    UPDATE (or DELETE); returns the number of messages changed. Only the
+    recipient can mark a message read and only the sender can delete it;
+    archiving applies to whichever side the user is on.
+    """
+    scope = batch_scope(user, ids, up_to, conversation_id)
+    with transaction.atomic():
+        if action == 'read':
+            unread = scope.filter(recipient=user, is_read=False)
+            conversation_ids = _conversation_ids(unread)
+            changed = unread.update(is_read=True)
+            if changed:
+                counts = Message.objects.filter(
+                    conversation=OuterRef('conversation_id'), recipient=user, is_read=False,
+                ).order_by().values('conversation').annotate(n=Count('pk')).values('n')
+                ConversationParticipant.objects.filter(user=user, conversation_id__in=conversation_ids).update(
+                    unread_count=Coalesce(Subquery(counts), Value(0)),
+                )
+                # update() sends no post_save; tell the user's streams directly
+                publish([user.pk], 'messages_read', {'count': changed})
+        elif action in ('archive', 'unarchive'):
+            archived = Value(action == 'archive')
+            changed = scope.update(
+                archived_by_sender=Case(When(sender=user, then=archived), default=F('archived_by_sender')),
+                archived_by_recipient=Case(When(recipient=user, then=archived), default=F('archived_by_recipient')),
+            )
+        elif action == 'delete':
+            sent = scope.filter(sender=user)
+            conversation_ids = _conversation_ids(sent)
+            changed = sent.delete()[1].get(Message._meta.label, 0)
+            if conversation_ids:
+                refresh_conversations(conversation_ids)
+        else:
+            raise ValueError(f"Unknown batch action: {action}")
+    return changed
+
+def delete_message(message):
+    with transaction.atomic():
+        message.delete()
+        if message.conversation_id:
+            refresh_conversations([message.conversation_id])
+
+def _models(apps=None):
+    """The models to work with; migrations pass their historical app registry"""
+    if apps is None:
+        return Conversation, ConversationParticipant, Message
+    return tuple(apps.get_model('placements', name) for name in ('Conversation', 'ConversationParticipant', 'Message'))
+
+def refresh_conversations(conversation_ids=None, apps=None, using=None):
+    """
+    Recompute the denormalized fields of these conversations (all when None)
+    and of their participants from the messages, with one UPDATE per table
+    """
+    Conversation, ConversationParticipant, Message = _models(apps)
+    conversations = Conversation.objects.using(using).all()
+    participants = ConversationParticipant.objects.using(using).all()
+    if conversation_ids is not None:
+        conversations = conversations.filter(pk__in=conversation_ids)
+        participants = participants.filter(conversation_id__in=conversation_ids)
+
+    latest = Message.objects.using(using).filter(conversation=OuterRef('pk')).order_by('-created_at', '-id')
+    first = Message.objects.using(using).filter(conversation=OuterRef('pk')).order_by('created_at', 'id')
+    conversations.update(
+        last_message=Subquery(latest.values('pk')[:1]),
+        last_message_at=Subquery(latest.values('created_at')[:1]),
+        last_message_preview=Coalesce(
+            Subquery(latest.annotate(preview=Substr('content', 1, PREVIEW_LENGTH)).values('preview')[:1]), Value(''),
+        ),
+        last_sender=Subquery(latest.values('sender_id')[:1]),
+        subject=Case(
+            When(subject='', then=Coalesce(Subquery(first.values('subject')[:1]), Value(''))),
+            default=F('subject'),
+        ),
+    )
+
+    unread = Message.objects.using(using).filter(
+        conversation=OuterRef('conversation_id'), recipient=OuterRef('user_id'), is_read=False,
+    ).order_by().values('conversation').annotate(n=Count('pk')).values('n')
+    participants.update(
+        unread_count=Coalesce(Subquery(unread), Value(0)),
+        last_message_at=Subquery(
+            Conversation.objects.using(using).filter(pk=OuterRef('conversation_id')).values('last_message_at')[:1]
+        ),
+    )
+
+def backfill_conversations(batch_size=500, apps=None, using=None):
+    """
+    Put every message without a conversation into its direct conversation,
+    creating conversations and participants as needed; returns the number
+    of conversations refreshed
+    """
+    Conversation, ConversationParticipant, Message = _models(apps)
+    unassigned = Message.objects.using(using).filter(conversation__isnull=True)
+    keys = list(
+        unassigned.annotate(key=direct_key_expression())
+        .order_by().values_list('key', 'placement_request_id').distinct()
+    )
+    if not keys:
+        return 0
+    Conversation.objects.using(using).bulk_create(
+        [Conversation(key=key, placement_request_id=placement_request_id) for key, placement_request_id in keys],
+        batch_size=batch_size, ignore_conflicts=True,
+    )
+    unassigned.update(conversation_id=Subquery(
+        Conversation.objects.using(using).filter(key=direct_key_expression(OuterRef)).values('pk')[:1]
+    ))
+
+    refreshed = 0
+    for start in range(0, len(keys), batch_size):
+        batch = [key for key, _ in keys[start:start + batch_size]]
+        conversation_ids = list(Conversation.objects.using(using).filter(key__in=batch).values_list('pk', flat=True))
+        messages = Message.objects.using(using).filter(conversation_id__in=conversation_ids).order_by()
+        members = set(messages.values_list('conversation_id', 'sender_id').distinct())
+        members |= set(messages.values_list('conversation_id', 'recipient_id').distinct())
+        ConversationParticipant.objects.using(using).bulk_create(
+            [ConversationParticipant(conversation_id=c, user_id=u) for c, u in members],
+            batch_size=batch_size, ignore_conflicts=True,
+        )
+        refresh_conversations(conversation_ids, apps, using)
+        refreshed += len(conversation_ids)
+    return refreshed
+
+def inbox(user):
+    """The user's conversations, latest activity first, with what the inbox shows"""
+    return ConversationParticipant.objects.filter(user=user, last_message_at__isnull=False).select_related(
+        'conversation__last_sender', 'conversation__placement_request',
+    ).prefetch_related('conversation__participants').order_by('-last_message_at', '-id')
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('placements', '0002_placementrequest_provider_comments_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['recipient', 'is_read', 'created_at'], name='message_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='placementrequest',
+            index=models.Index(fields=['status', 'created_at'], name='placement_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='placementrequest',
+            index=models.Index(fields=['approved_by_tutor', 'created_at'], name='placement_approver_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='placementrequest',
+            index=models.Index(fields=['provider', 'status'], name='placement_provider_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visitschedule',
+            index=models.Index(fields=['tutor', 'completed', 'visit_date'], name='visit_tutor_completed_date_idx'),
+        ),
+    ]
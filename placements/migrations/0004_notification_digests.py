@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('placements', '0003_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationPreference',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('frequency', models.CharField(choices=[('immediate', 'Immediately'), ('hourly', 'Hourly digest'), ('daily', 'Daily digest')], default='immediate', max_length=10)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='notification_preference', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QueuedNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('new_request', 'New placement request'), ('awaiting_tutor', 'Placement awaiting tutor approval'), ('approved', 'Placement approved'), ('rejected', 'Placement rejected'), ('completed', 'Placement completed'), ('completed_provider', 'Student placement completed'), ('report_submitted', 'Report submitted')], max_length=30)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('placement_request', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='placements.placementrequest')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='queued_notifications', to=settings.AUTH_USER_MODEL)),
+                ('report', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='placements.placementreport')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['recipient', 'sent_at', 'created_at'], name='notification_pending_idx')],
+            },
+        ),
+    ]
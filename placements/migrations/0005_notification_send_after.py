@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('placements', '0004_notification_digests'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='queuednotification',
+            name='notification_pending_idx',
+        ),
+        migrations.AddField(
+            model_name='queuednotification',
+            name='send_after',
+            field=models.DateTimeField(blank=True, help_text='End of the digest window it belongs to', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='queuednotification',
+            index=models.Index(fields=['sent_at', 'send_after'], name='notification_due_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+def backfill(apps, schema_editor):
+    from placements.messaging import backfill_conversations
+    backfill_conversations(apps=apps, using=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('placements', '0006_conversations'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
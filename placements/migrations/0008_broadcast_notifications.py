@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('placements', '0007_backfill_conversations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='queuednotification',
+            name='message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='placements.message'),
+        ),
+        migrations.AlterField(
+            model_name='queuednotification',
+            name='kind',
+            field=models.CharField(choices=[('new_request', 'New placement request'), ('awaiting_tutor', 'Placement awaiting tutor approval'), ('approved', 'Placement approved'), ('rejected', 'Placement rejected'), ('completed', 'Placement completed'), ('completed_provider', 'Student placement completed'), ('report_submitted', 'Report submitted'), ('message', 'New message')], max_length=30),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('placements', '0008_broadcast_notifications'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='archived_by_recipient',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='archived_by_sender',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('placements', '0009_message_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='queuednotification',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Failed attempts to email it so far'),
+        ),
+        migrations.AddField(
+            model_name='queuednotification',
+            name='failed_at',
+            field=models.DateTimeField(blank=True, help_text='When sending it was given up', null=True),
+        ),
+    ]
@@ -48,6 +48,20 @@ class PlacementRequest(models.Model):
     tutor_comments = models.TextField(blank=True, help_text="Comments from tutor during approval/rejection")
     provider_comments = models.TextField(blank=True, help_text="Comments from provider during approval/rejection")
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='placement_status_created_idx'),
+            models.Index(fields=['approved_by_tutor', 'created_at'], name='placement_approver_created_idx'),
+            models.Index(fields=['provider', 'status'], name='placement_provider_status_idx'),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Status as loaded, so post_save can tell whether it changed
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+    
     def __str__(self):
         return f"{self.student.user.get_full_name()} - {self.company_name}"
 
@@ -60,15 +74,69 @@ class PlacementReport(models.Model):
     def __str__(self):
         return f"Report for {self.placement_request}"
 
+class Conversation(models.Model):
+    """
+    A thread of messages between participants, optionally about a placement.
+    The latest message is denormalized onto it and each participant's unread
+    count onto ConversationParticipant; placements.messaging keeps both in step.
+    """
+    subject = models.CharField(max_length=200, blank=True)
+    placement_request = models.ForeignKey(PlacementRequest, on_delete=models.CASCADE, null=True, blank=True)
+    participants = models.ManyToManyField(User, through='ConversationParticipant', related_name='conversations')
+    key = models.CharField(
+        max_length=64, unique=True, null=True, blank=True,
+        help_text="Identifies the direct conversation between two users about a placement",
+    )
+    
+    last_message = models.ForeignKey('Message', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    last_message_preview = models.CharField(max_length=200, blank=True)
+    last_sender = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return self.subject or f"Conversation {self.pk}"
+
+class ConversationParticipant(models.Model):
+    """A user's membership of a conversation; one row per inbox entry"""
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='memberships')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='conversation_memberships')
+    unread_count = models.PositiveIntegerField(default=0)
+    # Copy of conversation.last_message_at so the inbox is one index scan
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['conversation', 'user'], name='unique_conversation_participant'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'last_message_at'], name='participant_inbox_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} in {self.conversation_id}"
+
 class Message(models.Model):
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_messages')
     recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='received_messages')
     subject = models.CharField(max_length=200)
     content = models.TextField()
     placement_request = models.ForeignKey(PlacementRequest, on_delete=models.CASCADE, null=True, blank=True)
+    conversation = models.ForeignKey(
+        Conversation, on_delete=models.CASCADE, null=True, blank=True, related_name='messages'
+    )
     is_read = models.BooleanField(default=False)
+    # Archiving hides a message from one side's inbox or sent list, not the other's
+    archived_by_sender = models.BooleanField(default=False)
+    archived_by_recipient = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['recipient', 'is_read', 'created_at'], name='message_inbox_idx'),
+            models.Index(fields=['conversation', 'created_at'], name='message_conversation_idx'),
+        ]
+    
     def __str__(self):
         return f"From {self.sender.username} to {self.recipient.username}: {self.subject}"
 
@@ -81,5 +149,60 @@ class VisitSchedule(models.Model):
     completed = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['tutor', 'completed', 'visit_date'], name='visit_tutor_completed_date_idx'),
+        ]
+    
     def __str__(self):
         return f"Visit to {self.placement_request.company_name} on {self.visit_date}"
+
+class NotificationPreference(models.Model):
+    """How often a user wants placement notification emails"""
+    IMMEDIATE = 'immediate'
+    HOURLY = 'hourly'
+    DAILY = 'daily'
+    FREQUENCY_CHOICES = (
+        (IMMEDIATE, 'Immediately'),
+        (HOURLY, 'Hourly digest'),
+        (DAILY, 'Daily digest'),
+    )
+    
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='notification_preference')
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, default=IMMEDIATE)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.user.username}: {self.get_frequency_display()}"
+
+class QueuedNotification(models.Model):
+    """A notification waiting to go out in its recipient's next email (see placements.notifications)"""
+    KIND_CHOICES = (
+        ('new_request', 'New placement request'),
+        ('awaiting_tutor', 'Placement awaiting tutor approval'),
+        ('approved', 'Placement approved'),
+        ('rejected', 'Placement rejected'),
+        ('completed', 'Placement completed'),
+        ('completed_provider', 'Student placement completed'),
+        ('report_submitted', 'Report submitted'),
+        ('message', 'New message'),
+    )
+    
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='queued_notifications')
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    placement_request = models.ForeignKey(PlacementRequest, on_delete=models.CASCADE, null=True, blank=True)
+    report = models.ForeignKey(PlacementReport, on_delete=models.CASCADE, null=True, blank=True)
+    message = models.ForeignKey(Message, on_delete=models.CASCADE, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    send_after = models.DateTimeField(null=True, blank=True, help_text="End of the digest window it belongs to")
+    sent_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0, help_text="Failed attempts to email it so far")
+    failed_at = models.DateTimeField(null=True, blank=True, help_text="When sending it was given up")
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['sent_at', 'send_after'], name='notification_due_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} for {self.recipient_id}"
@@ -0,0 +1,253 @@
+"""
+Placement notification emails, coalesced per recipient and sent in batches
+
+Signals don't send mail; they call queue_notification(), which stores a
+QueuedNotification due at the end of the recipient's digest window and
+makes sure a send_due_notifications task (placements.tasks) runs then.
+The window follows the user's NotificationPreference:
+
+    immediate   the next NOTIFICATION_COALESCE_SECONDS boundary, so a bulk
+                approval still becomes a single email per recipient
+    hourly      the top of the next hour
+    daily       the next NOTIFICATION_DIGEST_HOUR (server local time)
+
+send_due() emails everything that is due: a recipient with one pending
+notification gets the usual email for its kind, one with several gets a
+digest. Notifications are loaded NOTIFICATION_BATCH_SIZE recipients at a
+time with a single joined query, rendered to text and HTML from cached
+compiled templates (emails/<kind>.txt wrapped in emails/notification.html)
+and sent over one SMTP connection. A recipient whose email fails is tried
+again NOTIFICATION_RETRY_SECONDS later (doubling each time) and given up on
+after NOTIFICATION_MAX_ATTEMPTS; one without an email address at once.
+"""
+from datetime import datetime, timedelta
+from functools import lru_cache
+import logging
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.template.loader import get_template
+from django.utils import timezone
+
+from accounts.lookups import COURSES
+from .models import Message, NotificationPreference, QueuedNotification
+
+logger = logging.getLogger(__name__)
+
+SUBJECTS = {
+    'new_request': 'New Placement Request - {student_name}',
+    'awaiting_tutor': 'Placement Awaiting Your Approval - {student_name}',
+    'approved': 'Placement Request Approved - {company_name}',
+    'rejected': 'Placement Request Update - {company_name}',
+    'completed': 'Placement Completed - {company_name}',
+    'completed_provider': 'Student Placement Completed - {student_name}',
+    'report_submitted': 'New Report Submitted - {student_name}',
+    'message': 'New Message from {sender_name} - {message_subject}',
+}
+DIGEST_SUBJECT = 'Placement Updates - {count} notifications'
+
+# Kinds with a hand-written HTML email; the rest wrap their text in the layout
+HTML_TEMPLATES = {
+    'new_request': 'emails/new_placement_request.html',
+}
+LAYOUT_TEMPLATE = 'emails/notification.html'
+
+def digest_run_at(frequency, now=None):
+    """When the email carrying a notification queued at `now` is sent"""
+    now = timezone.localtime(now or timezone.now())
+    if frequency == NotificationPreference.DAILY:
+        hour = getattr(settings, 'NOTIFICATION_DIGEST_HOUR', 8)
+        run_at = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+        return run_at if run_at > now else run_at + timedelta(days=1)
+    if frequency == NotificationPreference.HOURLY:
+        return now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    window = getattr(settings, 'NOTIFICATION_COALESCE_SECONDS', 60)
+    if not window:
+        return now
+    timestamp = now.timestamp()
+    return datetime.fromtimestamp(timestamp - timestamp % window + window, tz=now.tzinfo)
+
+def get_frequency(user_id):
+    frequency = NotificationPreference.objects.filter(user_id=user_id).values_list('frequency', flat=True).first()
+    return frequency or NotificationPreference.IMMEDIATE
+
+def schedule_send(run_at):
+    from .tasks import send_due_notifications
+
+    # One task per window boundary, however many notifications fall due then.
+    # due_by matters with TASKS_RUN_EAGERLY, where the task runs at commit
+    # rather than at run_at and would otherwise find nothing due yet.
+    send_due_notifications.enqueue(
+        due_by=run_at.isoformat(), run_at=run_at, idempotency_key=f'notifications-due:{run_at.timestamp():.6f}',
+    )
+
+def queue_notification(recipient_id, kind, placement_request=None, report=None):
+    run_at = digest_run_at(get_frequency(recipient_id))
+    QueuedNotification.objects.create(
+        recipient_id=recipient_id, kind=kind, placement_request=placement_request, report=report, send_after=run_at,
+    )
+    schedule_send(run_at)
+
+def queue_message_notifications(message_ids):
+    """Queue a 'message' notification for each message, with one INSERT per batch"""
+    recipients = dict(Message.objects.filter(pk__in=message_ids).values_list('pk', 'recipient_id'))
+    frequencies = dict(NotificationPreference.objects.filter(
+        user_id__in=set(recipients.values())
+    ).values_list('user_id', 'frequency'))
+    now = timezone.now()
+    run_at = {frequency: digest_run_at(frequency, now) for frequency, _ in NotificationPreference.FREQUENCY_CHOICES}
+    notifications = [
+        QueuedNotification(
+            recipient_id=recipient_id, kind='message', message_id=message_id,
+            send_after=run_at[frequencies.get(recipient_id, NotificationPreference.IMMEDIATE)],
+        )
+        for message_id, recipient_id in recipients.items()
+    ]
+    QueuedNotification.objects.bulk_create(notifications, batch_size=getattr(settings, 'NOTIFICATION_BATCH_SIZE', 200))
+    for send_after in {notification.send_after for notification in notifications}:
+        schedule_send(send_after)
+    return len(notifications)
+
+# Rendering
+
+@lru_cache(maxsize=None)
+def _template(name):
+    return get_template(name)
+
+def _message_context(notification):
+    message = notification.message
+    return {
+        'recipient': notification.recipient,
+        'recipient_name': notification.recipient.get_full_name(),
+        'message': message,
+        'message_subject': message.subject,
+        'sender_name': message.sender.get_full_name() or message.sender.username,
+        'kind_display': notification.get_kind_display(),
+    }
+
+def _context(notification):
+    if notification.message_id:
+        return _message_context(notification)
+    placement_request = notification.placement_request or notification.report.placement_request
+    student = placement_request.student
+    return {
+        'recipient': notification.recipient,
+        'recipient_name': notification.recipient.get_full_name(),
+        'placement_request': placement_request,
+        'company_name': placement_request.company_name,
+        'student': student,
+        'student_name': student.user.get_full_name(),
+        'course_name': COURSES.name(student.course_id),
+        'provider': placement_request.provider,
+        'provider_name': placement_request.provider.user.get_full_name(),
+        'report': notification.report,
+        'kind_display': notification.get_kind_display(),
+    }
+
+def render_email(recipient, notifications, connection=None):
+    """EmailMultiAlternatives (text and HTML) for one or more notifications to the same recipient"""
+    if len(notifications) == 1:
+        notification = notifications[0]
+        context = _context(notification)
+        subject = SUBJECTS[notification.kind].format(**context)
+        text = _template(f'emails/{notification.kind}.txt').render(context)
+        html_template = HTML_TEMPLATES.get(notification.kind)
+    else:
+        context = {
+            'recipient': recipient,
+            'recipient_name': recipient.get_full_name(),
+            'items': [_context(notification) for notification in notifications],
+        }
+        subject = DIGEST_SUBJECT.format(count=len(notifications))
+        text = _template('emails/digest.txt').render(context)
+        html_template = None
+
+    if html_template:
+        html = _template(html_template).render(context)
+    else:
+        html = _template(LAYOUT_TEMPLATE).render({'subject': subject, 'body': text})
+
+    message = EmailMultiAlternatives(
+        subject=subject, body=text, from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[recipient.email], connection=connection,
+    )
+    message.attach_alternative(html, 'text/html')
+    return message
+
+# Sending
+
+def _due(now):
+    return QueuedNotification.objects.filter(sent_at__isnull=True, failed_at__isnull=True).exclude(send_after__gt=now)
+
+def load_due(recipient_ids, now):
+    """{recipient_id: [notifications]} with everything rendering needs, in one query"""
+    grouped = {}
+    notifications = _due(now).filter(recipient_id__in=recipient_ids).select_related(
+        'recipient',
+        'placement_request__student__user', 'placement_request__provider__user',
+        'report__placement_request__student__user', 'report__placement_request__provider__user',
+        'message__sender',
+    ).order_by('recipient_id', 'created_at')
+    for notification in notifications:
+        grouped.setdefault(notification.recipient_id, []).append(notification)
+    return grouped
+
+def _give_up(notifications, reason, **fields):
+    QueuedNotification.objects.filter(
+        pk__in=[notification.pk for notification in notifications]
+    ).update(failed_at=timezone.now(), **fields)
+    logger.error(f"Gave up on {len(notifications)} notifications for user {notifications[0].recipient_id}: {reason}")
+
+def _record_failure(notifications):
+    """Mark a failed send; returns when to try again, or None once the attempts are used up"""
+    attempts = max(notification.attempts for notification in notifications) + 1
+    if attempts >= getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 5):
+        _give_up(notifications, f"{attempts} failed attempts", attempts=attempts)
+        return None
+    delay = getattr(settings, 'NOTIFICATION_RETRY_SECONDS', 300) * 2 ** (attempts - 1)
+    retry_at = timezone.now() + timedelta(seconds=delay)
+    QueuedNotification.objects.filter(
+        pk__in=[notification.pk for notification in notifications]
+    ).update(attempts=attempts, send_after=retry_at)
+    return retry_at
+
+def send_due(now=None):
+    """
+    Email every due notification, one message per recipient; returns the
+    number of emails sent. A failed recipient never fails the batch: their
+    notifications are retried later or given up on (see the module docstring).
+    """
+    now = now or timezone.now()
+    batch_size = getattr(settings, 'NOTIFICATION_BATCH_SIZE', 200)
+    recipient_ids = list(_due(now).order_by().values_list('recipient_id', flat=True).distinct())
+    sent = 0
+    retries = set()
+
+    connection = get_connection(fail_silently=False)
+    with connection:
+        for start in range(0, len(recipient_ids), batch_size):
+            grouped = load_due(recipient_ids[start:start + batch_size], now)
+            delivered = []
+            for notifications in grouped.values():
+                recipient = notifications[0].recipient
+                if not recipient.email:
+                    _give_up(notifications, "no email address")
+                    continue
+                try:
+                    # Rendering can fail too; it must not skip marking the rest of the batch sent
+                    render_email(recipient, notifications, connection).send()
+                except Exception as e:
+                    logger.error(f"Failed to email {len(notifications)} notifications to {recipient.email}: {str(e)}")
+                    retry_at = _record_failure(notifications)
+                    if retry_at is not None:
+                        retries.add(retry_at)
+                    continue
+                delivered.extend(notification.pk for notification in notifications)
+                sent += 1
+            QueuedNotification.objects.filter(pk__in=delivered).update(sent_at=timezone.now())
+
+    # Scheduled once the batch is done: with TASKS_RUN_EAGERLY the retry runs straight away
+    for retry_at in sorted(retries):
+        schedule_send(retry_at)
+    logger.info(f"Sent {sent} notification emails to {len(recipient_ids)} recipients")
+    return sent
@@ -1,6 +1,10 @@
 from rest_framework import serializers
-from .models import PlacementRequest, VisitSchedule, PlacementReport, Message
+from .models import (
+    PlacementRequest, VisitSchedule, PlacementReport, Message, NotificationPreference, ConversationParticipant,
+)
+from . import messaging
 from accounts.models import StudentProfile, ProviderProfile, TutorProfile
+from accounts.lookups import COURSES, DEPARTMENTS
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -15,10 +19,14 @@ class UserSerializer(serializers.ModelSerializer):
 
 class StudentProfileSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
+    course_name = serializers.SerializerMethodField()
     
     class Meta:
         model = StudentProfile
-        fields = ['id', 'user', 'student_id', 'course', 'year']
+        fields = ['id', 'user', 'student_id', 'course', 'course_name', 'year']
+    
+    def get_course_name(self, obj):
+        return COURSES.name(obj.course_id)
 
 class ProviderProfileSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
@@ -29,10 +37,14 @@ class ProviderProfileSerializer(serializers.ModelSerializer):
 
 class TutorProfileSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
+    department_name = serializers.SerializerMethodField()
     
     class Meta:
         model = TutorProfile
-        fields = ['id', 'user', 'employee_id', 'department', 'designation', 'office_location']
+        fields = ['id', 'user', 'employee_id', 'department', 'department_name', 'designation', 'office_location']
+    
+    def get_department_name(self, obj):
+        return DEPARTMENTS.name(obj.department_id)
 
 class PlacementRequestSerializer(serializers.ModelSerializer):
     student = StudentProfileSerializer(read_only=True)
@@ -97,8 +109,8 @@ class MessageCreateSerializer(serializers.ModelSerializer):
         return value
     
     def create(self, validated_data):
-        validated_data['sender'] = self.context['request'].user
-        return super().create(validated_data)
+        validated_data.setdefault('sender', self.context['request'].user)
+        return messaging.send(**validated_data)
 
 class MessageListSerializer(serializers.ModelSerializer):
     sender_name = serializers.SerializerMethodField()
@@ -150,6 +162,65 @@ class MessageListSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         return request and obj.sender == request.user
 
+class BroadcastSerializer(serializers.Serializer):
+    """A message from a tutor or provider to a group of students (see messaging.broadcast_audience)"""
+    AUDIENCE_CHOICES = (
+        ('assigned_students', 'My assigned students'),
+        ('cohort', 'Placement cohort'),
+    )
+
+    audience = serializers.ChoiceField(choices=AUDIENCE_CHOICES)
+    statuses = serializers.ListField(
+        child=serializers.ChoiceField(choices=PlacementRequest.STATUS_CHOICES), required=False, allow_empty=False,
+    )
+    start_date = serializers.DateField(required=False)
+    subject = serializers.CharField(max_length=200)
+    content = serializers.CharField()
+
+class MessageBatchSerializer(serializers.Serializer):
+    """A batch action over the user's messages, picked by ids or by an up-to-id watermark"""
+    MAX_IDS = 1000
+
+    action = serializers.ChoiceField(choices=messaging.BATCH_ACTIONS)
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, allow_empty=False, max_length=MAX_IDS,
+    )
+    up_to = serializers.IntegerField(required=False, min_value=1)
+    conversation = serializers.IntegerField(required=False, min_value=1)
+
+    def validate(self, data):
+        if ('ids' in data) == ('up_to' in data):
+            raise serializers.ValidationError('Provide either ids or up_to.')
+        return data
+
+class ConversationSerializer(serializers.ModelSerializer):
+    """A conversation as one participant sees it in the inbox"""
+    id = serializers.IntegerField(source='conversation_id', read_only=True)
+    subject = serializers.CharField(source='conversation.subject', read_only=True)
+    placement_request = serializers.IntegerField(source='conversation.placement_request_id', read_only=True)
+    placement_title = serializers.SerializerMethodField()
+    participants = serializers.SerializerMethodField()
+    last_message_preview = serializers.CharField(source='conversation.last_message_preview', read_only=True)
+    last_sender_id = serializers.IntegerField(source='conversation.last_sender_id', read_only=True)
+
+    class Meta:
+        model = ConversationParticipant
+        fields = [
+            'id', 'subject', 'placement_request', 'placement_title', 'participants',
+            'last_message_preview', 'last_sender_id', 'last_message_at', 'unread_count'
+        ]
+
+    def get_placement_title(self, obj):
+        placement = obj.conversation.placement_request
+        return placement.company_name if placement else None
+
+    def get_participants(self, obj):
+        # The other participants; conversation__participants is prefetched by messaging.inbox()
+        return [
+            {'id': user.pk, 'name': f"{user.first_name} {user.last_name}".strip() or user.username}
+            for user in obj.conversation.participants.all() if user.pk != obj.user_id
+        ]
+
 # Compact serializers for list views
 class PlacementRequestListSerializer(serializers.ModelSerializer):
     student_name = serializers.SerializerMethodField()
@@ -185,3 +256,9 @@ class VisitScheduleListSerializer(serializers.ModelSerializer):
     
     def get_company_name(self, obj):
         return obj.placement_request.company_name
+
+class NotificationPreferenceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = NotificationPreference
+        fields = ['frequency', 'updated_at']
+        read_only_fields = ['updated_at']
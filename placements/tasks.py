@@ -0,0 +1,32 @@
+"""
+Email notifications sent by the background workers (see core.tasks)
+
+Scheduled by placements.notifications.queue_notification(). The task runs
+on its own queue, limited to one at a time (TASK_QUEUE_LIMITS), so two
+windows never email the same notification. Delivery errors propagate and
+the task is retried with backoff; anything already sent is marked as such.
+
+A broadcast queues its recipients' notifications from a single
+queue_broadcast_notifications task instead of once per message.
+"""
+from datetime import datetime
+
+from django.utils import timezone
+
+from core.tasks import task
+from . import notifications
+
+
+@task(queue='notifications', lease_seconds=900)
+def send_due_notifications(due_by=None):
+    """Email every due notification, coalesced per recipient, including those due by `due_by`"""
+    now = timezone.now()
+    if due_by:
+        now = max(now, datetime.fromisoformat(due_by))
+    notifications.send_due(now)
+
+
+@task(queue='default')
+def queue_broadcast_notifications(message_ids):
+    """Queue the notification emails for a broadcast (placements.messaging.broadcast)"""
+    notifications.queue_message_notifications(message_ids)
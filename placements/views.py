@@ -3,8 +3,10 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
 from core.decorators import handle_exceptions
+from core.writer import run_write
 from .models import PlacementRequest, Message
 from .forms import MessageForm
+from . import messaging
 import logging
 
 logger = logging.getLogger(__name__)
@@ -89,9 +91,10 @@ def send_message(request):
         form = MessageForm(request.POST)
         if form.is_valid():
             try:
-                message = form.save(commit=False)
-                message.sender = request.user
-                message.save()
+                data = form.cleaned_data
+                message = run_write(
+                    messaging.send, request.user, data['recipient'], data['subject'], data['content'],
+                )
                 
                 logger.info(f"Message sent from {request.user.username} to {message.recipient.username}")
                 messages.success(request, 'Message sent successfully!')
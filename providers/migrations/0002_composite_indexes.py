@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('providers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='publishopportunity',
+            index=models.Index(fields=['status', 'application_deadline'], name='opportunity_status_dl_idx'),
+        ),
+    ]
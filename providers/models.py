@@ -29,5 +29,10 @@ class PublishOpportunity(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'application_deadline'], name='opportunity_status_dl_idx'),
+        ]
+
     def __str__(self):
         return f"{self.title} ({self.provider.user.username})" 
\ No newline at end of file
@@ -2,6 +2,7 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.utils import timezone
 from core.decorators import provider_required, handle_exceptions
+from core.querycache import cached_count, cached_list
 from .models import PublishOpportunity
 from placements.models import PlacementRequest
 import logging
@@ -20,10 +21,10 @@ def dashboard(request):
     provider_profile = request.user.providerprofile
 
     # Stats for PublishOpportunity
-    total_opps = PublishOpportunity.objects.filter(provider=provider_profile).count()
-    pending_opps = PublishOpportunity.objects.filter(provider=provider_profile, status='pending').count()
-    approved_opps = PublishOpportunity.objects.filter(provider=provider_profile, status='approved').count()
-    rejected_opps = PublishOpportunity.objects.filter(provider=provider_profile, status='rejected').count()
+    total_opps = cached_count(PublishOpportunity.objects.filter(provider=provider_profile))
+    pending_opps = cached_count(PublishOpportunity.objects.filter(provider=provider_profile, status='pending'))
+    approved_opps = cached_count(PublishOpportunity.objects.filter(provider=provider_profile, status='approved'))
+    rejected_opps = cached_count(PublishOpportunity.objects.filter(provider=provider_profile, status='rejected'))
 
     # Pending placement requests for this provider's opportunities
     pending_requests = PlacementRequest.objects.filter(
@@ -32,9 +33,9 @@ def dashboard(request):
     ).select_related('student__user', 'student__course').order_by('-created_at')[:5]
 
     # Recent published opportunities (last 10)
-    recent_opportunities = PublishOpportunity.objects.filter(
+    recent_opportunities = cached_list(PublishOpportunity.objects.filter(
         provider=provider_profile
-    ).order_by('-created_at')[:10]
+    ).order_by('-created_at')[:10])
 
     context = {
         'provider_profile': provider_profile,
@@ -104,7 +105,7 @@ def placement_list(request):
     provider_profile = request.user.providerprofile
     placements = PlacementRequest.objects.filter(
         provider=provider_profile
-    ).order_by('-created_at')
+    ).select_related('student__user', 'tutor__user').order_by('-created_at')
     
     # Filter by status if provided
     status_filter = request.GET.get('status')
@@ -2,7 +2,11 @@
 """
 Database Setup Script for Placement Management System
 This script sets up the database with initial data and configurations.
-Run this after creating and applying migrations.
+db.sqlite3 is not tracked; create it with `python manage.py migrate` and
+then run this script.
+
+For benchmark-scale data (thousands of users, millions of rows) use the
+management command instead: python manage.py generate_data --help
 """
 
 import os
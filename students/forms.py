@@ -2,6 +2,7 @@ from django import forms
 from django.utils import timezone
 from placements.models import PlacementRequest, PlacementReport
 from accounts.models import ProviderProfile, TutorProfile
+from accounts.choices import apply_choices
 from core.validators import validate_future_date, validate_file_size, validate_file_extension
 
 class PlacementRequestForm(forms.ModelForm):
@@ -60,16 +61,16 @@ class PlacementRequestForm(forms.ModelForm):
             user__is_active=True
         )
         self.fields['provider'].empty_label = "Select placement provider"
-        # Customize the provider label format to show provider name
-        self.fields['provider'].label_from_instance = lambda obj: f"{obj.user.get_full_name()}"
+        # Options show the provider name; cached so rendering runs no queries
+        apply_choices(self.fields['provider'], 'providers')
         
         # Filter active tutors and set custom label format
         self.fields['tutor'].queryset = TutorProfile.objects.filter(
             user__is_active=True
         )
         self.fields['tutor'].empty_label = "Choose your tutor"
-        # Customize the label format to show name and department
-        self.fields['tutor'].label_from_instance = lambda obj: f"{obj.user.get_full_name()} - {obj.department}"
+        # Options show name and department
+        apply_choices(self.fields['tutor'], 'tutors')
 
     def clean_start_date(self):
         """Validate that start date is in the future"""
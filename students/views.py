@@ -2,8 +2,8 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.db.models import Q
 from core.decorators import student_required, handle_exceptions
+from core.querycache import cached_list
 from placements.models import PlacementRequest, PlacementReport, VisitSchedule
-from accounts.models import ProviderProfile
 from .forms import PlacementRequestForm, PlacementReportForm
 import logging
 from providers.models import PublishOpportunity
@@ -73,10 +73,9 @@ def create_placement_request(request):
     else:
         form = PlacementRequestForm()
     
-    providers = ProviderProfile.objects.all()
+    # The provider select is rendered from the form's cached choices
     return render(request, 'students/create_request.html', {
-        'form': form, 
-        'providers': providers
+        'form': form,
     })
 
 @student_required
@@ -140,7 +139,10 @@ def submit_report(request, pk):
 def opportunity_list(request):
     """Show all approved/published opportunities to students."""
     today = timezone.now().date()
-    opportunities = PublishOpportunity.objects.filter(status='approved', application_deadline__gte=today).order_by('-created_at')
+    opportunities = cached_list(
+        PublishOpportunity.objects.filter(status='approved', application_deadline__gte=today)
+        .select_related('provider__user').order_by('-created_at')
+    )
     return render(request, 'students/opportunity_list.html', {'opportunities': opportunities})
 
 @student_required
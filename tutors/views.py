@@ -2,15 +2,19 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.utils import timezone
 from django.http import HttpResponse, JsonResponse
+from django.db import transaction
 from django.db.models import Q, Count
 from django.core.paginator import Paginator
 from core.decorators import tutor_required, handle_exceptions
+from core.metrics import EXPORT_DURATION
 from placements.models import PlacementRequest, VisitSchedule, PlacementReport
 from accounts.models import StudentProfile
+from accounts.lookups import COURSES
 from .forms import VisitScheduleForm, BulkActionForm, PlacementFilterForm, ExportForm
 import logging
 import csv
 import json
+import time
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
@@ -22,12 +26,12 @@ def dashboard(request):
     # Get pending requests for approval
     pending_requests = PlacementRequest.objects.filter(
         status='approved_by_provider'
-    ).order_by('-created_at')
+    ).select_related('student__user', 'provider__user').order_by('-created_at')
     
     # Get approved requests by this tutor
     approved_requests = PlacementRequest.objects.filter(
         approved_by_tutor=request.user
-    ).order_by('-created_at')
+    ).select_related('student__user', 'provider__user').order_by('-created_at')
     
     # Get upcoming visits with detailed information
     upcoming_visits = VisitSchedule.objects.filter(
@@ -180,19 +184,22 @@ def bulk_action(request):
                 
                 try:
                     if action == 'approve':
-                        for placement in placements:
-                            placement.status = 'approved_by_tutor'
-                            placement.approved_by_tutor = request.user
-                            placement.tutor_approved_at = timezone.now()
-                            placement.save()
+                        # One transaction takes the write lock once for the whole batch
+                        with transaction.atomic():
+                            for placement in placements:
+                                placement.status = 'approved_by_tutor'
+                                placement.approved_by_tutor = request.user
+                                placement.tutor_approved_at = timezone.now()
+                                placement.save()
                         
                         logger.info(f"Bulk approval by tutor {request.user.username}: {len(placements)} placements")
                         messages.success(request, f'{len(placements)} placement requests approved successfully!')
                         
                     elif action == 'reject':
-                        for placement in placements:
-                            placement.status = 'rejected'
-                            placement.save()
+                        with transaction.atomic():
+                            for placement in placements:
+                                placement.status = 'rejected'
+                                placement.save()
                         
                         logger.info(f"Bulk rejection by tutor {request.user.username}: {len(placements)} placements")
                         messages.success(request, f'{len(placements)} placement requests rejected.')
@@ -270,7 +277,7 @@ def export_placements(request):
             # Build query
             placements = PlacementRequest.objects.filter(
                 approved_by_tutor=request.user
-            ).select_related('student__user', 'provider__user', 'student__course')
+            ).select_related('student__user', 'provider__user')
             
             if date_from:
                 placements = placements.filter(created_at__gte=date_from)
@@ -279,10 +286,13 @@ def export_placements(request):
             if status:
                 placements = placements.filter(status=status)
             
+            started = time.perf_counter()
             if export_format == 'excel':
-                return export_to_excel(placements, request.user.username)
+                response = export_to_excel(placements, request.user.username)
             else:
-                return export_to_csv(placements, request.user.username)
+                response = export_to_csv(placements, request.user.username)
+            EXPORT_DURATION.observe(time.perf_counter() - started, format=export_format)
+            return response
     else:
         form = ExportForm()
     
@@ -303,7 +313,7 @@ def export_to_csv(placements, username):
         writer.writerow([
             f"{placement.student.user.first_name} {placement.student.user.last_name}",
             placement.student.student_id,
-            placement.student.course.name,
+            COURSES.name(placement.student.course_id),
             placement.company_name,
             placement.job_title,
             placement.get_status_display(),
@@ -327,7 +337,7 @@ def export_to_excel(placements, username):
         output = BytesIO()
         
         # Create workbook and worksheet
-        workbook = xlsxwriter.Workbook(output)
+        workbook = xlsxwriter.Workbook(output, {'remove_timezone': True})
         worksheet = workbook.add_worksheet('Placements')
         
         # Define formats
@@ -374,7 +384,7 @@ def export_to_excel(placements, username):
         for row, placement in enumerate(placements, start=1):
             worksheet.write(row, 0, f"{placement.student.user.first_name} {placement.student.user.last_name}", cell_format)
             worksheet.write(row, 1, placement.student.student_id, cell_format)
-            worksheet.write(row, 2, placement.student.course.name, cell_format)
+            worksheet.write(row, 2, COURSES.name(placement.student.course_id), cell_format)
             worksheet.write(row, 3, placement.company_name, cell_format)
             worksheet.write(row, 4, placement.job_title, cell_format)
             worksheet.write(row, 5, placement.get_status_display(), cell_format)
@@ -587,7 +597,7 @@ def view_student(request, pk):
     visit_schedules = VisitSchedule.objects.filter(
         placement_request__student=student,
         tutor=request.user
-    ).order_by('-visit_date')
+    ).select_related('placement_request').order_by('-visit_date')
     
     context = {
         'student': student,
@@ -640,7 +650,8 @@ def calendar_view(request):
         'placement_request__provider__user'
     ).order_by('visit_date')
     
-    # Prepare calendar data
+    # Prepare calendar data; every visit is the signed-in tutor's own
+    tutor_name = f"{tutor.first_name} {tutor.last_name}"
     visits_data = []
     for visit in scheduled_visits:
         visits_data.append({
@@ -652,7 +663,7 @@ def calendar_view(request):
                 'student': f"{visit.placement_request.student.user.first_name} {visit.placement_request.student.user.last_name}",
                 'company': visit.placement_request.company_name,
                 'purpose': visit.purpose,
-                'tutor': f"{visit.tutor.first_name} {visit.tutor.last_name}",
+                'tutor': tutor_name,
                 'notes': visit.notes,
                 'completed': visit.completed,
                 'status': visit.placement_request.status